@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from code_analyzer import ANALYZER_VERSION
+
+def content_hash(data):
+    """文件内容的哈希值"""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+class AnalysisCache:
+    """按 (内容哈希, 语言, 分析器版本) 持久化的分析结果缓存
+
+    另外记录每个路径的 (mtime, size, 内容哈希)，文件未被修改时连读取和哈希都可以跳过。
+    version 默认取 code_analyzer.ANALYZER_VERSION；打开缓存时会删除其他分析器版本的结果，
+    分析逻辑升级后缓存自动失效。
+    """
+
+    def __init__(self, path='analysis_cache.db', version=None, commit_every=500):
+        self.version = str(ANALYZER_VERSION if version is None else version)
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS results (
+                content_hash TEXT NOT NULL,
+                language TEXT NOT NULL,
+                version TEXT NOT NULL,
+                result TEXT,
+                PRIMARY KEY (content_hash, language, version)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY,
+                mtime_ns INTEGER,
+                size INTEGER,
+                content_hash TEXT
+            );
+        ''')
+        self.conn.execute('DELETE FROM results WHERE version != ?', (self.version,))
+        self.conn.commit()
+
+    def lookup_file(self, path, language):
+        """返回 (内容哈希, 缓存的分析结果或 None)；文件无法读取时抛出 OSError"""
+        stat = os.stat(path)
+        with self._lock:
+            row = self.conn.execute('SELECT mtime_ns, size, content_hash FROM files WHERE path = ?',
+                                    (path,)).fetchone()
+        if row is not None and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            digest = row[2]
+        else:
+            with open(path, 'rb') as f:
+                digest = content_hash(f.read())
+            with self._lock:
+                self.conn.execute('INSERT OR REPLACE INTO files (path, mtime_ns, size, content_hash) VALUES (?, ?, ?, ?)',
+                                  (path, stat.st_mtime_ns, stat.st_size, digest))
+                self._maybe_commit()
+        return digest, self.get(digest, language)
+
+    def get(self, digest, language):
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT result FROM results WHERE content_hash = ? AND language = ? AND version = ?',
+                (digest, language, self.version)).fetchone()
+            self.stats['hits' if row else 'misses'] += 1
+        return json.loads(row[0]) if row else None
+
+    def put(self, digest, language, result):
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO results (content_hash, language, version, result) VALUES (?, ?, ?, ?)',
+                (digest, language, self.version, json.dumps(result)))
+            self._maybe_commit()
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.conn.commit()
+            self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
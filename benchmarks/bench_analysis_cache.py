@@ -0,0 +1,61 @@
+"""对比完整分析与使用 AnalysisCache 的增量分析（1% 文件变更）的耗时"""
+import os
+import random
+import shutil
+import sys
+import sysconfig
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from analysis_cache import AnalysisCache
+from code_analyzer import CodeAnalyzer
+
+
+def build_corpus(target, limit):
+    """从本机标准库复制 limit 个 Python 文件作为语料"""
+    count = 0
+    for dirpath, _, filenames in os.walk(sysconfig.get_paths()['stdlib']):
+        for filename in filenames:
+            if filename.endswith('.py') and count < limit:
+                shutil.copyfile(os.path.join(dirpath, filename), os.path.join(target, f"{count:06d}_{filename}"))
+                count += 1
+    return count
+
+
+def run(analyzer, root, cache=None):
+    start = time.perf_counter()
+    results = list(analyzer.analyze_tree(root, cache=cache))
+    return time.perf_counter() - start, results
+
+
+def main(limit=3000, change_rate=0.01):
+    analyzer = CodeAnalyzer()
+    with tempfile.TemporaryDirectory() as tmp:
+        root = os.path.join(tmp, 'corpus')
+        os.makedirs(root)
+        n_files = build_corpus(root, limit)
+        cache = AnalysisCache(os.path.join(tmp, 'cache.db'))
+
+        full, _ = run(analyzer, root)
+        cold, _ = run(analyzer, root, cache)
+        warm, _ = run(analyzer, root, cache)
+
+        changed = random.Random(0).sample(sorted(os.listdir(root)), max(1, int(n_files * change_rate)))
+        for name in changed:
+            with open(os.path.join(root, name), 'a', encoding='utf-8') as f:
+                f.write('\n\ndef _benchmark_change():\n    return 1\n')
+        incremental, results = run(analyzer, root, cache)
+        reanalyzed = sum(not result.get('cached') for result in results)
+        cache.close()
+
+    print(f"files: {n_files}, changed: {len(changed)}")
+    print(f"full run (no cache):     {full:6.2f}s")
+    print(f"cold cache run:          {cold:6.2f}s")
+    print(f"unchanged rerun:         {warm:6.2f}s ({warm / full:.1%} of full)")
+    print(f"1% changed rerun:        {incremental:6.2f}s ({incremental / full:.1%} of full, {reanalyzed} re-analyzed)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""对比 collect_database_data 一次性读取与 stream_database_data 分块读取的耗时和峰值内存"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from db_pool import SQLiteConnectionPool
+from enhanced_data_collector import EnhancedDataCollector
+
+
+def build_database(path, n_rows):
+    """生成包含 n_rows 行的测试数据库"""
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE prices (id INTEGER PRIMARY KEY, symbol TEXT, price REAL, volume INTEGER)')
+    batch = 100000
+    for offset in range(0, n_rows, batch):
+        rows = ((i, f"SYM{i % 500}", i * 0.01, i % 10000) for i in range(offset, min(offset + batch, n_rows)))
+        conn.executemany('INSERT INTO prices VALUES (?, ?, ?, ?)', rows)
+    conn.commit()
+    conn.close()
+
+
+def measure(label, func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    rows = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<28} {rows:>9} rows {elapsed:6.2f}s  peak {peak / 1e6:8.1f} MB")
+
+
+def main(n_rows=2000000):
+    collector = EnhancedDataCollector()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        build_database(path, n_rows)
+        collector.sqlite_pool = SQLiteConnectionPool(path)
+        query = 'SELECT * FROM prices'
+
+        measure("collect_database_data", lambda: len(collector.collect_database_data(query)))
+        measure("stream (DataFrame chunks)",
+                lambda: sum(len(chunk) for chunk in collector.stream_database_data(query, chunksize=50000)))
+        measure("stream (Arrow batches)",
+                lambda: sum(batch.num_rows for batch in
+                            collector.stream_database_data(query, chunksize=50000, as_arrow=True)))
+        collector.sqlite_pool.close()
+
+
+if __name__ == "__main__":
+    main()
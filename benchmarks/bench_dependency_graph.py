@@ -0,0 +1,72 @@
+"""DependencyGraph 在大规模合成语料上的构建、单文件增量更新和查询耗时
+
+模块按包分层，每个模块导入若干同包或底层包中的模块，并调用被导入模块中的函数；
+少量同包内向上的导入会形成包内的导入环。
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from code_analyzer import DependencyGraph
+
+ROOT = '/corpus'
+
+
+def make_result(index, count, rng, imports_per_file=6, back_edge_rate=0.01):
+    targets = set()
+    for _ in range(imports_per_file):
+        if index and rng.random() > back_edge_rate:
+            # 大部分导入指向编号更小（更底层）的模块，偏向邻近模块
+            target = max(0, index - int(rng.expovariate(1 / 200)) - 1)
+        else:
+            # 少量同包内的任意导入，形成包内的导入环
+            package_start = index // 1000 * 1000
+            target = rng.randrange(package_start, min(package_start + 1000, count))
+        targets.add(target)
+    imports = [f"pkg{target // 1000}.mod{target}.func{target}" for target in targets]
+    calls = [f"func{target}" for target in targets]
+    return {
+        'path': os.path.join(ROOT, f"pkg{index // 1000}", f"mod{index}.py"),
+        'language': 'python',
+        'analysis': {'functions': [{'name': f"func{index}", 'calls': calls}], 'imports': imports}
+    }
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"{label:<34} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def main(count=100_000, seed=0):
+    rng = random.Random(seed)
+    results = [make_result(index, count, rng) for index in range(count)]
+    graph = DependencyGraph(ROOT)
+    timed(f"build ({count} files)", lambda: graph.update_many(results))
+    print(f"import edges: {graph.imports.number_of_edges()}, call edges: {graph.calls.number_of_edges()}")
+    cycles = timed("cycles (first, full SCC pass)", graph.cycles)
+    print(f"import cycles: {len(cycles)}, largest: {max(map(len, cycles), default=0)} modules")
+
+    middle = count // 2
+    module = f"pkg{middle // 1000}.mod{middle}"
+    timed("dependents (reverse deps)", lambda: graph.dependents(module), repeat=1000)
+    impact = timed("impact (transitive dependents)", lambda: graph.impact(module), repeat=10)
+    print(f"modules impacted by {module}: {len(impact)}")
+    timed("callers", lambda: graph.callers(module, f"func{middle}"), repeat=1000)
+
+    timed("update one file (same imports)", lambda: graph.update(results[middle]), repeat=100)
+    timed("cycles after it", graph.cycles)
+    changed = make_result(middle, count, rng)
+    timed("update one file (new imports)", lambda: graph.update(changed))
+    timed("cycles after it", graph.cycles)
+    timed("cycle_of", lambda: graph.cycle_of(module), repeat=1000)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
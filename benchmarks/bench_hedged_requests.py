@@ -0,0 +1,61 @@
+"""注入慢响应的本地服务器上，对比普通请求与对冲请求的尾延迟"""
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from local_server import LocalServer
+from request_scheduler import RequestScheduler
+
+
+def make_slow_route(slow_ratio, fast_delay, slow_delay, seed=0):
+    """大部分请求 fast_delay 秒返回，slow_ratio 比例的请求 slow_delay 秒返回"""
+    rng = random.Random(seed)
+
+    def route(handler):
+        time.sleep(slow_delay if rng.random() < slow_ratio else fast_delay)
+        return 200, {}, b'ok'
+
+    return route
+
+
+def run(scheduler, url, n_requests, clients=8):
+    def timed(_):
+        start = time.perf_counter()
+        scheduler.get(url, deadline=5)
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        latencies = sorted(pool.map(timed, range(n_requests)))
+    return latencies
+
+
+def percentile(latencies, q):
+    return latencies[min(int(len(latencies) * q), len(latencies) - 1)] * 1000
+
+
+def main(n_requests=1000):
+    """客户端为闭环负载：对冲消除慢请求后吞吐量上升，服务器与客户端在同一进程中竞争，
+    多客户端时 p50 会随之升高；单客户端的结果反映对冲本身的开销。"""
+    route = make_slow_route(slow_ratio=0.03, fast_delay=0.005, slow_delay=0.5)
+    with LocalServer({'/api': route}) as server:
+        url = server.url('/api')
+        for clients in (1, 8):
+            for label, hedge in (("no hedging", False), ("hedge at p95", True)):
+                scheduler = RequestScheduler(concurrency=8, hedge=hedge, hedge_percentile=0.95)
+                # 预热，积累延迟样本
+                run(scheduler, url, 50, clients)
+                start = time.perf_counter()
+                latencies = run(scheduler, url, n_requests, clients)
+                throughput = n_requests / (time.perf_counter() - start)
+                stats = next(iter(scheduler.stats().values()))
+                print(f"{clients} client(s), {label:<14} p50 {percentile(latencies, 0.5):6.1f} ms  "
+                      f"p99 {percentile(latencies, 0.99):6.1f} ms  {throughput:6.0f} req/s  hedged {stats['hedged']}")
+                scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
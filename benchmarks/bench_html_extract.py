@@ -0,0 +1,51 @@
+"""对比 BeautifulSoup 全树解析与 HTMLExtractor 流式提取的吞吐量"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from html_extractor import HTMLExtractor
+
+
+def build_fixture(n_sections=10000, seed=0):
+    """生成一个较大的本地HTML页面"""
+    rng = random.Random(seed)
+    words = ['data', 'market', 'code', 'python', 'stream', 'parser', 'analysis', 'token']
+    parts = ['<html><head><title>Fixture</title><style>p{color:red}</style></head><body>']
+    for i in range(n_sections):
+        text = ' '.join(rng.choice(words) for _ in range(20))
+        parts.append(f'<div class="section" id="s{i}"><h2>Section {i}</h2>'
+                     f'<p>{text} <a href="/page/{i}">more</a></p>'
+                     f'<script>var x{i} = {i};</script></div>')
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+
+def measure(label, func, html):
+    start = time.perf_counter()
+    func(html)
+    elapsed = time.perf_counter() - start
+    # 单独运行一次统计峰值内存，避免 tracemalloc 影响计时
+    tracemalloc.start()
+    func(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size_mb = len(html.encode('utf-8')) / 1e6
+    print(f"{label:<32} {elapsed:6.2f}s {size_mb / elapsed:7.1f} MB/s  peak {peak / 1e6:7.1f} MB")
+
+
+def main():
+    html = build_fixture()
+    print(f"fixture size: {len(html) / 1e6:.1f} MB")
+    measure("BeautifulSoup html.parser text", lambda h: BeautifulSoup(h, 'html.parser').get_text(), html)
+    measure("HTMLExtractor text", HTMLExtractor('text').extract, html)
+    measure("BeautifulSoup select", lambda h: [a['href'] for a in BeautifulSoup(h, 'html.parser').select('a')], html)
+    measure("HTMLExtractor selectors", HTMLExtractor({'links': 'a@href', 'headings': 'div.section > h2'}).extract, html)
+
+
+if __name__ == "__main__":
+    main()
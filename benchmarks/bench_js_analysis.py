@@ -0,0 +1,91 @@
+"""对比多次正则扫描的旧实现与单次词法扫描的 analyze_javascript_code
+
+语料为生成的压缩风格 JavaScript 包（无换行、大量字符串和模板字符串），也可传入真实的 bundle 路径。
+"""
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from js_scanner import scan_javascript
+
+LEGACY_COMPLEXITY_PATTERNS = [r'\bif\b', r'\bfor\b', r'\bwhile\b', r'\bswitch\b', r'\bcatch\b', r'\bfunction\b', r'=>']
+
+
+def legacy_analyze(code_str):
+    """原实现：两次函数扫描、一次类扫描、两次导入扫描和七次复杂度扫描"""
+    functions = [{'name': m.group(1), 'type': 'function'}
+                 for m in re.finditer(r'function\s+(\w+)\s*\([^)]*\)', code_str)]
+    functions += [{'name': m.group(1), 'type': 'arrow_function'}
+                  for m in re.finditer(r'(?:const|let|var)?\s*(\w+)\s*=\s*\([^)]*\)\s*=>', code_str)]
+    classes = [{'name': m.group(1), 'extends': m.group(2)}
+               for m in re.finditer(r'class\s+(\w+)(?:\s+extends\s+(\w+))?\s*{', code_str)]
+    imports = [{'module': m.group(1), 'type': 'es6'}
+               for m in re.finditer(r'import\s+(?:{[^}]+}|[^;]+)\s+from\s+[\'"]([^\'"]+)[\'"]', code_str)]
+    imports += [{'module': m.group(1), 'type': 'require'}
+                for m in re.finditer(r'(?:const|let|var)\s+\w+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)', code_str)]
+    complexity = 1 + sum(len(re.findall(pattern, code_str)) for pattern in LEGACY_COMPLEXITY_PATTERNS)
+    return {'functions': functions, 'classes': classes, 'imports': imports, 'complexity': complexity}
+
+
+def make_module(rng, index):
+    name = f"m{index}"
+    parts = [
+        f'import {{a{index} as b{index}}} from "./dep{index % 50}";',
+        f'const r{index}=require("pkg{index % 30}");',
+        # 注释和字符串中的关键字不应被统计
+        f'/* function fake{index}() {{ if (x) {{}} }} */',
+        f'const s{index}="class Str{index} extends X {{ while(1) }}";',
+        f'const t{index}=`function tpl{index}() ${{n{index}.map(v=>v*2)}} for`;',
+        f'const re{index}=/if\\/(for)[{{}}]/g;',
+        f'function {name}(a,b){{if(a>b){{for(let i=0;i<a;i++){{b+=i/2}}}}return a?b:{index}}}',
+        f'class C{index} extends B{index % 10}{{run(x){{try{{return x()}}catch(e){{return null}}}}}}',
+        f'const f{index}=(x,y)=>x+y;',
+        f'var g{index}=async q=>{{switch(q){{case 1:return 1;default:while(q--){{}}}}}};',
+    ]
+    rng.shuffle(parts)
+    return "".join(parts)
+
+
+def make_bundle(target_bytes, seed=0):
+    rng = random.Random(seed)
+    modules, size, index = [], 0, 0
+    while size < target_bytes:
+        module = make_module(rng, index)
+        modules.append(module)
+        size += len(module)
+        index += 1
+    return "".join(modules)
+
+
+def measure(label, func, bundle, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(bundle)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<22} {len(bundle) / best / 1e6:7.2f} MB/s  ({best:.3f}s)  "
+          f"functions={len(result['functions'])} classes={len(result['classes'])} "
+          f"imports={len(result['imports'])} complexity={result['complexity']}")
+
+
+def main(paths=None, sizes_mb=(1, 4, 8)):
+    if paths:
+        bundles = []
+        for path in paths:
+            with open(path, encoding='utf-8', errors='replace') as f:
+                bundles.append((path, f.read()))
+    else:
+        bundles = [(f"synthetic {size} MB", make_bundle(size * 1_000_000)) for size in sizes_mb]
+    for label, bundle in bundles:
+        print(f"{label}: {len(bundle) / 1e6:.1f} MB")
+        measure("legacy (11 regex)", legacy_analyze, bundle)
+        measure("scan_javascript", scan_javascript, bundle)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or None)
@@ -0,0 +1,94 @@
+"""NearDuplicateIndex 的查询延迟随语料规模的变化，以及对植入近重复片段的召回率
+
+语料为本机 Python 标准库中的函数定义；每个规模下植入若干改动过一两行的副本，
+与逐个计算 shingle Jaccard 相似度的暴力扫描对比。
+"""
+import ast
+import os
+import random
+import sys
+import sysconfig
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from near_duplicates import NearDuplicateIndex, normalize_tokens
+
+
+def load_functions(root, limit):
+    functions = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [name for name in dirnames if name not in ('site-packages', 'dist-packages')]
+        for filename in filenames:
+            if not filename.endswith('.py'):
+                continue
+            try:
+                with open(os.path.join(dirpath, filename), encoding='utf-8') as f:
+                    source = f.read()
+                tree = ast.parse(source)
+                lines = source.splitlines()
+            except (OSError, UnicodeDecodeError, SyntaxError, ValueError):
+                continue
+            for node in ast.walk(tree):
+                if isinstance(node, ast.FunctionDef) and (node.end_lineno or 0) - node.lineno >= 8:
+                    functions.append('\n'.join(lines[node.lineno - 1:node.end_lineno]))
+                    if len(functions) >= limit:
+                        return functions
+    return functions
+
+
+def mutate(code, rng):
+    lines = code.splitlines()
+    line = rng.randrange(1, len(lines))
+    lines[line] = lines[line] + '  # reviewed'
+    lines.insert(rng.randrange(1, len(lines)), '    pass')
+    return '\n'.join(lines)
+
+
+def shingle_set(code, size=5):
+    tokens = normalize_tokens(code, 'python')
+    return {tuple(tokens[i:i + size]) for i in range(max(1, len(tokens) - size + 1))}
+
+
+def jaccard(first, second):
+    return len(first & second) / len(first | second)
+
+
+def main(sizes=(1000, 5000, 20000), queries=200, threshold=0.8, seed=0):
+    rng = random.Random(seed)
+    functions = load_functions(sysconfig.get_paths()['stdlib'], max(sizes))
+    print(f"functions loaded: {len(functions)}")
+    for size in sizes:
+        corpus = functions[:size]
+        index = NearDuplicateIndex(':memory:', threshold=threshold)
+        start = time.perf_counter()
+        for number, code in enumerate(corpus):
+            index.add(str(number), code, 'python')
+        index.flush()
+        build = time.perf_counter() - start
+
+        targets = rng.sample(range(len(corpus)), min(queries, len(corpus)))
+        probes = [mutate(corpus[target], rng) for target in targets]
+        start = time.perf_counter()
+        found = [str(target) in dict(index.query(probe, 'python')) for target, probe in zip(targets, probes)]
+        lsh_latency = (time.perf_counter() - start) / len(probes)
+        # 召回率只统计与原片段的精确 Jaccard 相似度确实达到阈值的探针
+        sets = [shingle_set(code) for code in corpus]
+        relevant = [jaccard(shingle_set(probe), sets[target]) >= threshold for target, probe in zip(targets, probes)]
+        recall = sum(hit and wanted for hit, wanted in zip(found, relevant)) / max(1, sum(relevant))
+
+        # 暴力扫描：与全部文档计算精确的 Jaccard 相似度
+        brute_probes = probes[:20]
+        start = time.perf_counter()
+        for probe in brute_probes:
+            probe_set = shingle_set(probe)
+            [other for other in sets if jaccard(probe_set, other) >= threshold]
+        brute_latency = (time.perf_counter() - start) / len(brute_probes)
+
+        print(f"{size:>6} docs: build {size / build:7.0f} docs/s | LSH query {lsh_latency * 1000:6.2f} ms, "
+              f"recall {recall:.3f} ({sum(relevant)} probes) | brute force {brute_latency * 1000:8.2f} ms/query")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""SymbolIndex 在百万级符号上的写盘、打开和查询耗时
+
+符号名由常见编程词汇随机组合成 camelCase / snake_case / PascalCase 名称。
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from symbol_index import SymbolIndex
+
+WORDS = ('get set load save parse build create update delete find fetch read write open close init run '
+         'handle process render compute validate check convert format encode decode send receive start stop '
+         'user file config request response data item list map node tree graph cache index token value key '
+         'http json xml sql query result error event message stream buffer socket client server session '
+         'manager service factory handler controller model view adapter provider builder').split()
+MODULES = ['os', 'os.path', 'sys', 're', 'json', 'numpy', 'pandas', 'requests', 'logging', 'typing',
+           'collections', 'itertools', 'functools', 'datetime', 'threading', 'asyncio', 'sqlite3']
+
+
+def make_name(rng, style):
+    words = rng.sample(WORDS, rng.randint(2, 4))
+    if style == 'camel':
+        return words[0] + ''.join(word.title() for word in words[1:])
+    if style == 'pascal':
+        return ''.join(word.title() for word in words)
+    return '_'.join(words)
+
+
+def make_result(index, rng, symbols_per_file):
+    functions = [{'name': make_name(rng, rng.choice(('camel', 'snake'))), 'line_number': line * 10 + 1}
+                 for line in range(symbols_per_file - 3)]
+    classes = [{'name': make_name(rng, 'pascal'), 'bases': [make_name(rng, 'pascal')], 'line_number': 1}]
+    imports = rng.sample(MODULES, 2)
+    return {'path': f"/corpus/pkg{index // 1000}/module{index}.py", 'language': 'python',
+            'analysis': {'functions': functions, 'classes': classes, 'imports': imports}}
+
+
+def timed(label, func, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeat
+    unit, scale = ('us', 1e6) if elapsed < 1e-3 else ('ms', 1e3)
+    print(f"{label:<36} {elapsed * scale:10.1f} {unit}")
+    return result
+
+
+def main(files=50_000, symbols_per_file=20, seed=0):
+    rng = random.Random(seed)
+    path = os.path.join(tempfile.mkdtemp(), 'symbol_index.bin')
+    index = SymbolIndex(path)
+    timed(f"add {files} files to delta", lambda: index.update_many(
+        make_result(number, rng, symbols_per_file) for number in range(files)))
+    timed("save (merge to segment)", index.save)
+    print(f"symbols: {len(index)}, file size: {os.path.getsize(path) / 1e6:.1f} MB")
+    index.close()
+    index = timed("open (mmap)", lambda: SymbolIndex(path))
+
+    sample = [index.symbol(rng.randrange(len(index)))['name'] for _ in range(200)]
+    names = iter(sample * 10)
+    timed("lookup (exact name, limit 10)", lambda: index.lookup(next(names), limit=10), repeat=1000)
+    timed("prefix 'loadUser' (limit 10)", lambda: index.prefix('loadUser', limit=10), repeat=1000)
+    timed("search 'parse response' (limit 10)", lambda: index.search('parse response', limit=10), repeat=200)
+    typos = iter([name[:3] + name[4:] for name in sample] * 10)
+    timed("fuzzy (distance 1, limit 10)", lambda: index.fuzzy(next(typos), limit=10), repeat=200)
+    timed("importers('os.path') (limit 100)", lambda: index.importers('os.path'), repeat=200)
+
+    changed = iter(make_result(number, rng, symbols_per_file) for number in range(1000))
+    timed("update one file (delta)", lambda: index.update(next(changed)), repeat=1000)
+    timed("lookup after updates", lambda: index.lookup(next(names), limit=10), repeat=1000)
+    # 第一次模糊查询建立增量部分的模糊查找表，之后随更新增量维护
+    timed("first fuzzy after updates", lambda: index.fuzzy(next(typos), limit=10))
+    timed("fuzzy after updates", lambda: index.fuzzy(next(typos), limit=10), repeat=200)
+    timed("fuzzy (distance 2, trigram)", lambda: index.fuzzy(next(typos), max_distance=2, limit=10), repeat=20)
+    index.close()
+
+
+if __name__ == "__main__":
+    main()
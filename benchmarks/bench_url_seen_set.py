@@ -0,0 +1,69 @@
+"""对比 Python set 与 SeenURLSet 在大量URL下的内存占用和查询吞吐量"""
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from url_seen_set import SeenURLSet
+
+
+def make_url(i):
+    return f"https://github.com/owner{i % 50000}/repo{i // 50000}/blob/HEAD/src/module_{i}.py"
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def bench_set(n):
+    start = time.perf_counter()
+    seen = set()
+    for i in range(n):
+        seen.add(make_url(i))
+    insert = time.perf_counter() - start
+    start = time.perf_counter()
+    hits = sum(make_url(i) in seen for i in range(0, 2 * n, 20))
+    lookup = time.perf_counter() - start
+    return insert, lookup, hits
+
+
+def bench_seen_set(n, path, batch=10000):
+    start = time.perf_counter()
+    seen = SeenURLSet(path, expected_items=n)
+    for offset in range(0, n, batch):
+        seen.add_many(make_url(i) for i in range(offset, min(offset + batch, n)))
+    seen.close()
+    insert = time.perf_counter() - start
+
+    start = time.perf_counter()
+    seen = SeenURLSet(path, expected_items=n)
+    reopen = time.perf_counter() - start
+    start = time.perf_counter()
+    hits = sum(make_url(i) in seen for i in range(0, 2 * n, 20))
+    lookup = time.perf_counter() - start
+    seen.close()
+    return insert, lookup, hits, reopen
+
+
+def main(n=10000000):
+    n_lookups = len(range(0, 2 * n, 20))
+    print(f"URLs: {n:,}, lookups: {n_lookups:,} (half hits, half misses)")
+    baseline = max_rss_mb()
+    # 先运行 SeenURLSet，进程峰值RSS的增量分别反映两者的内存占用
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'seen')
+        insert, lookup, hits, reopen = bench_seen_set(n, path)
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        seen_rss = max_rss_mb()
+        print(f"SeenURLSet: insert {insert:7.1f}s  lookup {n_lookups / lookup:10,.0f}/s  hits {hits:,}  "
+              f"peak RSS +{seen_rss - baseline:7.1f} MB  on disk {size / 1e6:7.1f} MB  reopen {reopen * 1000:.1f} ms")
+    insert, lookup, hits = bench_set(n)
+    print(f"set():      insert {insert:7.1f}s  lookup {n_lookups / lookup:10,.0f}/s  hits {hits:,}  "
+          f"peak RSS +{max_rss_mb() - seen_rss:7.1f} MB")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10000000)
@@ -0,0 +1,34 @@
+"""对比逐个 collect_web_data 与并发 collect_web_data_many 的耗时"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data_collector import DataCollector
+from local_server import LocalServer
+
+
+def main(n_urls=200, delay=0.02):
+    collector = DataCollector()
+    with LocalServer(delay=delay) as server:
+        urls = [server.url(f"/page/{i}") for i in range(n_urls)]
+
+        start = time.perf_counter()
+        serial = [collector.collect_web_data(url) for url in urls]
+        serial_time = time.perf_counter() - start
+
+        # 与逐个请求使用不同的URL，避免命中HTTP缓存
+        urls = [server.url(f"/page/{i}?batch") for i in range(n_urls)]
+        start = time.perf_counter()
+        batched = list(collector.collect_web_data_many(urls, concurrency=50, per_host=50))
+        batch_time = time.perf_counter() - start
+
+    print(f"URLs: {n_urls}, simulated latency: {delay * 1000:.0f} ms")
+    print(f"serial loop:          {serial_time:.2f}s ({sum(s is not None for s in serial)} ok)")
+    print(f"collect_web_data_many: {batch_time:.2f}s ({sum(s is not None for _, s in batched)} ok)")
+    print(f"speedup: {serial_time / batch_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""基准测试用的本地HTTP替身服务器"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class LocalServer:
+    """在后台线程中运行的本地HTTP服务器
+
+    routes: {path: body} 或 {path: callable(handler) -> (status, headers, body)}
+    delay: 每个请求的人工延迟(秒)，模拟网络延迟
+    """
+
+    def __init__(self, routes=None, delay=0.0, default_body=b"<html><body><p>ok</p></body></html>"):
+        self.routes = routes or {}
+        self.delay = delay
+        self.default_body = default_body
+        self.request_count = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # 头部和正文一起发送，避免 keep-alive 连接上的延迟确认等待
+            wbufsize = 64 * 1024
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                with server._lock:
+                    server.request_count += 1
+                if server.delay:
+                    time.sleep(server.delay)
+                route = server.routes.get(self.path.split('?')[0], server.default_body)
+                if callable(route):
+                    status, headers, body = route(self)
+                else:
+                    status, headers, body = 200, {}, route
+                if isinstance(body, str):
+                    body = body.encode('utf-8')
+                self.send_response(status)
+                headers = dict(headers)
+                headers.setdefault('Content-Type', 'text/html; charset=utf-8')
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # POST 与 GET 使用同一路由表，路由函数可从 handler.rfile 读取请求体
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
@@ -0,0 +1,137 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from contextlib import contextmanager
+from html_extractor import HTMLExtractor
+from config import CONFIG
+import logging
+import queue
+import re
+import threading
+
+# 常见前端框架的空挂载点
+_EMPTY_MOUNT_RE = re.compile(r'<div[^>]+id=["\'](?:root|app|__next|__nuxt)["\'][^>]*>\s*</div>', re.I)
+_NOSCRIPT_HINT_RE = re.compile(r'<noscript[^>]*>[^<]*(?:enable|requires?)\s+javascript', re.I)
+
+def default_driver_factory():
+    """创建无头Chrome浏览器"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_page_load_timeout(CONFIG["data_collection"]["request_timeout"])
+    return driver
+
+def needs_javascript(html, min_text_length=200):
+    """粗略判断静态HTML是否需要执行JavaScript才能得到内容"""
+    if _EMPTY_MOUNT_RE.search(html) or _NOSCRIPT_HINT_RE.search(html):
+        return True
+    text = HTMLExtractor('text').extract(html)['text']
+    return len(text) < min_text_length and '<script' in html.lower()
+
+
+class BrowserPool:
+    """可复用的无头浏览器会话池
+
+    最多同时存在 size 个浏览器；每个会话处理 max_pages 个页面后回收重建，
+    健康检查失败或使用中抛出异常的会话会被丢弃并在下次借出时重新创建。
+    """
+
+    def __init__(self, size=4, max_pages=50, driver_factory=None):
+        self.logger = logging.getLogger(__name__)
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_factory = driver_factory or default_driver_factory
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {'created': 0, 'recycled': 0, 'crashed': 0, 'checkouts': 0}
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """借出一个浏览器会话，用完自动归还"""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("No browser session available")
+        session = None
+        try:
+            session = self._acquire_session()
+            yield session['driver']
+            session['pages'] += 1
+        except Exception:
+            if session is not None:
+                self._discard(session, crashed=True)
+                session = None
+            raise
+        finally:
+            if session is not None:
+                self._release_session(session)
+            self._slots.release()
+
+    def fetch(self, url, timeout=None):
+        """用池中的浏览器加载页面并返回页面源代码"""
+        with self.checkout(timeout=timeout) as driver:
+            driver.get(url)
+            return driver.page_source
+
+    def close(self):
+        """关闭所有空闲会话"""
+        self._closed = True
+        while True:
+            try:
+                session = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._quit(session)
+
+    def _acquire_session(self):
+        session = None
+        while session is None:
+            try:
+                candidate = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if self._is_alive(candidate):
+                session = candidate
+            else:
+                self._discard(candidate, crashed=True)
+        if session is None:
+            session = {'driver': self.driver_factory(), 'pages': 0}
+            with self._lock:
+                self.stats['created'] += 1
+        with self._lock:
+            self.stats['checkouts'] += 1
+        return session
+
+    def _release_session(self, session):
+        if self._closed:
+            self._quit(session)
+        elif session['pages'] >= self.max_pages:
+            with self._lock:
+                self.stats['recycled'] += 1
+            self._quit(session)
+        else:
+            self._idle.put(session)
+
+    def _is_alive(self, session):
+        try:
+            session['driver'].current_url
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, session, crashed=False):
+        if crashed:
+            with self._lock:
+                self.stats['crashed'] += 1
+        self._quit(session)
+
+    def _quit(self, session):
+        try:
+            session['driver'].quit()
+        except Exception as e:
+            self.logger.debug(f"Browser quit error: {str(e)}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
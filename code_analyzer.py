@@ -1,9 +1,154 @@
-import re
 import ast
 import logging
-from collections import Counter
+import os
+import itertools
+import posixpath
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
 import networkx as nx
 from datetime import datetime
+from js_scanner import scan_javascript
+from symbol_index import SymbolIndex
+
+# 分析逻辑变化时递增，使持久化的分析缓存失效
+ANALYZER_VERSION = '5'
+
+# 支持分析的文件扩展名
+LANGUAGE_BY_EXTENSION = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.mjs': 'javascript',
+    '.cjs': 'javascript',
+    '.jsx': 'javascript'
+}
+
+# analyze_tree 默认跳过的目录
+EXCLUDED_DIRS = {'.git', '.hg', '.svn', '__pycache__', 'node_modules', '.venv', 'venv', '.tox'}
+
+# 会产生分支的语句/表达式，计入圈复杂度
+_DECISION_NODES = (ast.If, ast.While, ast.For, ast.AsyncFor, ast.IfExp, ast.ExceptHandler, ast.comprehension)
+# 增加嵌套深度的代码块
+_BLOCK_NODES = (ast.If, ast.While, ast.For, ast.AsyncFor, ast.With, ast.AsyncWith, ast.Try)
+if hasattr(ast, 'TryStar'):
+    _BLOCK_NODES += (ast.TryStar,)
+if hasattr(ast, 'match_case'):
+    _DECISION_NODES += (ast.match_case,)
+
+
+def _dotted_name(node):
+    """把 Name/Attribute 链转换为 a.b.c 形式，其他表达式返回 None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+class PythonAnalysisVisitor(ast.NodeVisitor):
+    """一次遍历同时收集函数、类、导入和复杂度信息"""
+
+    def __init__(self):
+        self.functions = []
+        self.classes = []
+        self.imports = []
+        # 模块整体复杂度：1 + 分支数 + 函数与类的数量
+        self.complexity = 1
+        self._function_stack = []
+        self._depth = 0
+
+    def _add_decisions(self, count):
+        self.complexity += count
+        if self._function_stack:
+            self._function_stack[-1]['complexity'] += count
+
+    def _visit_function(self, node):
+        self.complexity += 1
+        record = {
+            'name': node.name,
+            'args': [arg.arg for arg in node.args.posonlyargs + node.args.args + node.args.kwonlyargs],
+            'line_number': node.lineno,
+            'is_async': isinstance(node, ast.AsyncFunctionDef),
+            'complexity': 1,
+            'nesting_depth': 0,
+            'line_count': (node.end_lineno or node.lineno) - node.lineno + 1,
+            'calls': []
+        }
+        self.functions.append(record)
+        self._function_stack.append(record)
+        outer_depth, self._depth = self._depth, 0
+        self.generic_visit(node)
+        self._depth = outer_depth
+        self._function_stack.pop()
+
+    visit_FunctionDef = _visit_function
+    visit_AsyncFunctionDef = _visit_function
+
+    def visit_ClassDef(self, node):
+        self.complexity += 1
+        self.classes.append({
+            'name': node.name,
+            'bases': [base.id for base in node.bases if isinstance(base, ast.Name)],
+            'methods': [n.name for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))],
+            'line_number': node.lineno
+        })
+        self.generic_visit(node)
+
+    def visit_Import(self, node):
+        for name in node.names:
+            self.imports.append(name.name)
+
+    def visit_ImportFrom(self, node):
+        # 相对导入保留前导点号，例如 from ..pkg import x 记为 "..pkg.x"
+        module = '.' * node.level + (node.module or '')
+        for name in node.names:
+            self.imports.append(f"{module}.{name.name}" if node.module else f"{module}{name.name}")
+
+    def visit_Call(self, node):
+        # 记录调用的名称（f 或 a.b.f），供跨文件调用图使用
+        if self._function_stack:
+            name = _dotted_name(node.func)
+            if name is not None:
+                self._function_stack[-1]['calls'].append(name)
+        self.generic_visit(node)
+
+    def visit_BoolOp(self, node):
+        # a and b and c 产生两个额外分支
+        self._add_decisions(len(node.values) - 1)
+        self.generic_visit(node)
+
+    def visit_If(self, node):
+        # elif 与开头的 if 位于同一层：else 中只有一个 If 时，该 If 在当前深度访问
+        if len(node.orelse) == 1 and isinstance(node.orelse[0], ast.If):
+            self._add_decisions(1)
+            self._enter_block()
+            self.visit(node.test)
+            for statement in node.body:
+                self.visit(statement)
+            self._depth -= 1
+            self.visit(node.orelse[0])
+        else:
+            self.generic_visit(node)
+
+    def _enter_block(self):
+        self._depth += 1
+        if self._function_stack:
+            record = self._function_stack[-1]
+            record['nesting_depth'] = max(record['nesting_depth'], self._depth)
+
+    def generic_visit(self, node):
+        if isinstance(node, _DECISION_NODES):
+            self._add_decisions(1 + (len(node.ifs) if isinstance(node, ast.comprehension) else 0))
+        if isinstance(node, _BLOCK_NODES):
+            self._enter_block()
+            super().generic_visit(node)
+            self._depth -= 1
+        else:
+            super().generic_visit(node)
+
 
 class CodeAnalyzer:
     def __init__(self):
@@ -24,11 +169,13 @@ class CodeAnalyzer:
         """分析Python代码"""
         try:
             tree = ast.parse(code_str)
+            visitor = PythonAnalysisVisitor()
+            visitor.visit(tree)
             analysis = {
-                'functions': self._get_functions(tree),
-                'classes': self._get_classes(tree),
-                'imports': self._get_imports(tree),
-                'complexity': self._calculate_complexity(tree)
+                'functions': visitor.functions,
+                'classes': visitor.classes,
+                'imports': visitor.imports,
+                'complexity': visitor.complexity
             }
             return analysis
         except Exception as e:
@@ -36,138 +183,470 @@ class CodeAnalyzer:
             return None
 
     def analyze_javascript_code(self, code_str):
-        """分析JavaScript代码"""
+        """分析JavaScript代码（单次词法扫描，跳过注释、字符串和模板字符串）"""
         try:
-            analysis = {
-                'functions': self._find_js_functions(code_str),
-                'classes': self._find_js_classes(code_str),
-                'imports': self._find_js_imports(code_str),
-                'complexity': self._estimate_js_complexity(code_str)
-            }
-            return analysis
+            return scan_javascript(code_str)
         except Exception as e:
             self.logger.error(f"JavaScript code analysis error: {str(e)}")
             return None
 
-    def _get_functions(self, tree):
-        """获取Python函数信息"""
-        functions = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.FunctionDef):
-                functions.append({
-                    'name': node.name,
-                    'args': [arg.arg for arg in node.args.args],
-                    'line_number': node.lineno
-                })
-        return functions
-
-    def _get_classes(self, tree):
-        """获取Python类信息"""
-        classes = []
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                classes.append({
-                    'name': node.name,
-                    'bases': [base.id for base in node.bases if isinstance(base, ast.Name)],
-                    'methods': [n.name for n in node.body if isinstance(n, ast.FunctionDef)],
-                    'line_number': node.lineno
-                })
-        return classes
-
-    def _get_imports(self, tree):
-        """获取Python导入信息"""
-        imports = []
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.Import, ast.ImportFrom)):
-                if isinstance(node, ast.Import):
-                    for name in node.names:
-                        imports.append(name.name)
+    def analyze_code(self, code_str, language):
+        """按语言分析代码字符串"""
+        if language == 'python':
+            return self.analyze_python_code(code_str)
+        if language == 'javascript':
+            return self.analyze_javascript_code(code_str)
+        self.logger.error(f"Unsupported language: {language}")
+        return None
+
+    def analyze_file(self, path):
+        """分析单个文件，返回 {'path', 'language', 'analysis', 'error'}"""
+        language = LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+        result = {'path': path, 'language': language, 'analysis': None, 'error': None}
+        if language is None:
+            result['error'] = 'unsupported file type'
+            return result
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                code_str = f.read()
+            result['analysis'] = self.analyze_code(code_str, language)
+            if result['analysis'] is None:
+                result['error'] = 'analysis failed'
+        except Exception as e:
+            result['error'] = str(e)
+        return result
+
+    def analyze_many(self, paths, workers=None, chunksize=64, cache=None):
+        """用进程池并行分析多个文件，按完成顺序产出结果
+
+        文件按 chunksize 分块提交以摊薄进程间通信开销，同时只保留有限个在途分块；
+        单个文件失败只会体现在该文件结果的 error 字段中，不会中断整个批次。
+        工作进程出错或崩溃导致整个分块失败时，分块中的文件逐个重新分析，每个文件都有结果。
+        提供 cache (AnalysisCache) 时，内容未变的文件直接返回缓存结果，不再提交分析。
+        """
+        workers = workers or os.cpu_count() or 1
+        digests = {}
+        cached_results = []
+        if cache is not None:
+            paths = self._filter_cached(paths, cache, digests, cached_results)
+        chunks = iter(lambda it=iter(paths): list(itertools.islice(it, chunksize)), [])
+        executor = ProcessPoolExecutor(max_workers=workers)
+        # 在途分块：future -> 路径列表，分块失败时据此找回其中的文件
+        in_flight = {}
+        # 失败分块中的文件，逐个单独重新分析
+        isolated = []
+        try:
+            while True:
+                if isolated:
+                    # 单独运行时没有其他在途分块，进程崩溃也只影响导致崩溃的文件
+                    pending = [[isolated.pop()]] if not in_flight else []
                 else:
-                    module = node.module if node.module else ''
-                    for name in node.names:
-                        imports.append(f"{module}.{name.name}")
-        return imports
-
-    def _calculate_complexity(self, tree):
-        """计算代码复杂度"""
-        complexity = 1
-        for node in ast.walk(tree):
-            if isinstance(node, (ast.If, ast.While, ast.For, ast.FunctionDef, ast.ClassDef)):
-                complexity += 1
-        return complexity
-
-    def _find_js_functions(self, code_str):
-        """查找JavaScript函数"""
-        function_pattern = r'function\s+(\w+)\s*\([^)]*\)'
-        arrow_pattern = r'(?:const|let|var)?\s*(\w+)\s*=\s*\([^)]*\)\s*=>'
-        functions = []
-        
-        # 查找普通函数
-        for match in re.finditer(function_pattern, code_str):
-            functions.append({
-                'name': match.group(1),
-                'type': 'function'
-            })
-            
-        # 查找箭头函数
-        for match in re.finditer(arrow_pattern, code_str):
-            functions.append({
-                'name': match.group(1),
-                'type': 'arrow_function'
-            })
-            
-        return functions
-
-    def _find_js_classes(self, code_str):
-        """查找JavaScript类"""
-        class_pattern = r'class\s+(\w+)(?:\s+extends\s+(\w+))?\s*{'
-        classes = []
-        
-        for match in re.finditer(class_pattern, code_str):
-            classes.append({
-                'name': match.group(1),
-                'extends': match.group(2) if match.group(2) else None
-            })
-            
-        return classes
-
-    def _find_js_imports(self, code_str):
-        """查找JavaScript导入"""
-        import_pattern = r'import\s+(?:{[^}]+}|[^;]+)\s+from\s+[\'"]([^\'"]+)[\'"]'
-        require_pattern = r'(?:const|let|var)\s+\w+\s*=\s*require\([\'"]([^\'"]+)[\'"]\)'
-        
-        imports = []
-        
-        # 查找ES6导入
-        for match in re.finditer(import_pattern, code_str):
-            imports.append({
-                'module': match.group(1),
-                'type': 'es6'
-            })
-            
-        # 查找require导入
-        for match in re.finditer(require_pattern, code_str):
-            imports.append({
-                'module': match.group(1),
-                'type': 'require'
-            })
-            
-        return imports
-
-    def _estimate_js_complexity(self, code_str):
-        """估算JavaScript代码复杂度"""
-        complexity = 1
-        patterns = [
-            r'\bif\b',
-            r'\bfor\b',
-            r'\bwhile\b',
-            r'\bswitch\b',
-            r'\bcatch\b',
-            r'\bfunction\b',
-            r'=>'
-        ]
-        
-        for pattern in patterns:
-            complexity += len(re.findall(pattern, code_str))
-            
-        return complexity
\ No newline at end of file
+                    pending = itertools.islice(chunks, max(workers * 2 - len(in_flight), 0))
+                for chunk in pending:
+                    try:
+                        future = executor.submit(_analyze_paths, chunk)
+                    except BrokenProcessPool:
+                        # 工作进程异常退出后进程池不可再用，换一个新的进程池
+                        executor.shutdown(wait=False)
+                        executor = ProcessPoolExecutor(max_workers=workers)
+                        future = executor.submit(_analyze_paths, chunk)
+                    in_flight[future] = chunk
+                # 缓存命中的结果直接产出
+                while cached_results:
+                    yield cached_results.pop()
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        if len(chunk) > 1:
+                            isolated.extend(reversed(chunk))
+                            continue
+                        self.logger.error(f"Analysis worker error for {chunk[0]}: {str(e)}")
+                        language = LANGUAGE_BY_EXTENSION.get(os.path.splitext(chunk[0])[1].lower())
+                        results = [{'path': chunk[0], 'language': language, 'analysis': None,
+                                    'error': f"worker error: {str(e) or type(e).__name__}"}]
+                    for result in results:
+                        digest = digests.pop(result['path'], None)
+                        if digest is not None and result['analysis'] is not None:
+                            cache.put(digest, result['language'], result['analysis'])
+                        yield result
+        finally:
+            executor.shutdown()
+        if cache is not None:
+            cache.flush()
+
+    def _filter_cached(self, paths, cache, digests, cached_results):
+        """产出需要重新分析的路径；命中缓存的结果放入 cached_results，其余路径记录内容哈希"""
+        for path in paths:
+            language = LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1].lower())
+            if language is None:
+                yield path
+                continue
+            try:
+                digest, analysis = cache.lookup_file(path, language)
+            except OSError:
+                yield path
+                continue
+            if analysis is not None:
+                cached_results.append({'path': path, 'language': language, 'analysis': analysis,
+                                       'error': None, 'cached': True})
+            else:
+                digests[path] = digest
+                yield path
+
+    def analyze_tree(self, root, workers=None, chunksize=64, exclude_dirs=EXCLUDED_DIRS, cache=None):
+        """并行分析目录树中所有支持的源文件"""
+        return self.analyze_many(self._iter_source_files(root, exclude_dirs), workers, chunksize, cache)
+
+    def build_dependency_graph(self, root, workers=None, chunksize=64, exclude_dirs=EXCLUDED_DIRS, cache=None):
+        """分析目录树并构建跨文件的导入/调用图（见 DependencyGraph）"""
+        graph = DependencyGraph(root)
+        for result in self.analyze_tree(root, workers, chunksize, exclude_dirs, cache):
+            if result['analysis'] is not None:
+                graph.update(result)
+        return graph
+
+    def update_dependency_graph(self, graph, paths, cache=None):
+        """重新分析修改过的文件并增量更新图，已删除的文件从图中移除"""
+        graph.update_many(self._reanalyze(paths, cache))
+        return graph
+
+    def build_symbol_index(self, root, path='symbol_index.bin', workers=None, chunksize=64,
+                           exclude_dirs=EXCLUDED_DIRS, cache=None):
+        """分析目录树，把函数、类和导入写入持久化的符号倒排索引（见 SymbolIndex）"""
+        index = SymbolIndex(path)
+        for result in self.analyze_tree(root, workers, chunksize, exclude_dirs, cache):
+            if result['analysis'] is not None:
+                index.update(result)
+        index.save()
+        return index
+
+    def update_symbol_index(self, index, paths, cache=None, save=False):
+        """重新分析修改过的文件并增量更新符号索引，save 为 True 时合并写盘"""
+        index.update_many(self._reanalyze(paths, cache))
+        if save:
+            index.save()
+        return index
+
+    def _reanalyze(self, paths, cache=None):
+        """重新分析给定文件；已删除的文件产出 analysis 为 None 的结果"""
+        existing = []
+        for path in paths:
+            if os.path.exists(path):
+                existing.append(path)
+            else:
+                yield {'path': path, 'language': None, 'analysis': None, 'error': 'file not found'}
+        if len(existing) > 1 and cache is not None:
+            yield from self.analyze_many(existing, workers=1, cache=cache)
+        elif cache is not None:
+            # 单个文件不值得启动进程池，直接在当前进程中分析
+            yield from self._analyze_inline(existing, cache)
+        else:
+            yield from (self.analyze_file(path) for path in existing)
+
+    def _analyze_inline(self, paths, cache):
+        """在当前进程中逐个分析，内容未变的文件使用缓存结果"""
+        digests, cached_results = {}, []
+        for path in self._filter_cached(paths, cache, digests, cached_results):
+            result = self.analyze_file(path)
+            digest = digests.pop(path, None)
+            if digest is not None and result['analysis'] is not None:
+                cache.put(digest, result['language'], result['analysis'])
+            yield result
+        yield from cached_results
+        cache.flush()
+
+    def _iter_source_files(self, root, exclude_dirs):
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [name for name in dirnames if name not in exclude_dirs]
+            for filename in filenames:
+                if os.path.splitext(filename)[1].lower() in LANGUAGE_BY_EXTENSION:
+                    yield os.path.join(dirpath, filename)
+
+
+class DependencyGraph:
+    """跨文件的模块导入图和函数调用图，按文件增量更新
+
+    节点为模块名：Python 文件为 pkg.mod（__init__.py 为包名），JavaScript 文件为去掉扩展名的相对路径
+    （index.js 为目录路径）。imports 图中 a -> b 表示 a 导入 b，只包含能解析到语料内文件的导入；
+    calls 图的节点为 "模块:函数"，调用边按名称尽力解析（本模块定义、from 导入的函数、模块.函数），
+    目前只有 Python 提供调用信息。
+
+    更新一个文件只重新解析该文件的导入与调用，以及受其影响的文件（等待该模块名的导入方、导入该模块的调用方）。
+    networkx 的 DiGraph 同时维护正向和反向邻接表，反向依赖和传递影响范围直接在邻接表上遍历；
+    导入环（强连通分量）按需计算，只重新计算被修改过的文件所在的分量。
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self.imports = nx.DiGraph()
+        self.calls = nx.DiGraph()
+        self._files = {}
+        self._modules = {}
+        # 候选模块名 -> 可能导入它的模块；该名称的文件出现或消失时，这些模块需要重新解析导入
+        self._importers_by_candidate = defaultdict(set)
+        # 模块 -> 所在的导入环（只记录大小大于 1 的强连通分量）
+        self._component_of = {}
+        self._dirty = set()
+        self._components_ready = False
+
+    def module_name(self, path):
+        """文件路径对应的模块名"""
+        relative = os.path.relpath(os.path.abspath(path), self.root)
+        stem, extension = os.path.splitext(relative)
+        parts = stem.split(os.sep)
+        if LANGUAGE_BY_EXTENSION.get(extension.lower()) == 'python':
+            if parts[-1] == '__init__':
+                parts = parts[:-1]
+            return '.'.join(parts)
+        if parts[-1] == 'index' and len(parts) > 1:
+            parts = parts[:-1]
+        return '/'.join(parts)
+
+    def update(self, result):
+        """用 CodeAnalyzer.analyze_file 的结果添加或替换一个文件"""
+        path = os.path.abspath(result['path'])
+        if result.get('analysis') is None:
+            self.remove(path)
+            return
+        analysis = result['analysis']
+        language = result['language']
+        module = self.module_name(path)
+        replacing = path in self._files
+        if replacing:
+            # 同一文件的新版本：模块名不变，其他文件对它的导入解析也不变，只替换本文件的数据
+            previous = self._files[path]
+            self._unregister_candidates(previous)
+            self.calls.remove_nodes_from([f"{module}:{name}" for name in previous['functions']])
+        elif module in self._modules:
+            # 同名模块（如 a.js 与 a/index.js）只保留后加入的文件
+            self._remove(self._modules[module])
+        record = {
+            'path': path,
+            'module': module,
+            'language': language,
+            'functions': {function['name']: function.get('calls', []) for function in analysis.get('functions', [])},
+            'import_candidates': [],
+            'aliases': {},
+            'symbols': {}
+        }
+        is_package = os.path.basename(path).startswith('__init__.')
+        for entry in analysis.get('imports', []):
+            name = entry['module'] if isinstance(entry, dict) else entry
+            candidates = self._import_candidates(module, name, language, is_package, path)
+            if candidates:
+                record['import_candidates'].append(candidates)
+                for candidate in candidates:
+                    self._importers_by_candidate[candidate].add(module)
+        self._files[path] = record
+        self._modules[module] = path
+        self.imports.add_node(module, path=path, language=language)
+        self.calls.add_nodes_from(f"{module}:{name}" for name in record['functions'])
+
+        self._resolve_imports(module)
+        if not replacing:
+            # 之前导入此模块名（或更长名称、但只能解析到更短前缀）的模块现在可以解析到本文件
+            for importer in list(self._importers_by_candidate.get(module, ())):
+                if importer != module:
+                    self._resolve_imports(importer)
+        self._resolve_calls(module)
+        for importer in list(self.imports.predecessors(module)):
+            self._resolve_calls(importer)
+
+    def update_many(self, results):
+        for result in results:
+            self.update(result)
+
+    def remove(self, path):
+        """从图中删除一个文件"""
+        path = os.path.abspath(path)
+        if path in self._files:
+            self._remove(path)
+
+    def _remove(self, path):
+        record = self._files.pop(path)
+        module = record['module']
+        importers = list(self.imports.predecessors(module))
+        self._unregister_candidates(record)
+        del self._modules[module]
+        self.calls.remove_nodes_from([f"{module}:{name}" for name in record['functions']])
+        self._mark_dirty(module)
+        self.imports.remove_node(module)
+        # 导入过此模块的文件可能改为解析到更短的前缀
+        for importer in importers:
+            if importer != module:
+                self._resolve_imports(importer)
+                self._resolve_calls(importer)
+
+    def _unregister_candidates(self, record):
+        for candidates in record['import_candidates']:
+            for candidate in candidates:
+                waiting = self._importers_by_candidate.get(candidate)
+                if waiting is not None:
+                    waiting.discard(record['module'])
+                    if not waiting:
+                        del self._importers_by_candidate[candidate]
+
+    def _import_candidates(self, module, name, language, is_package, path):
+        """导入名称可能对应的模块名，按优先级排列"""
+        if language == 'python':
+            if name.startswith('.'):
+                level = len(name) - len(name.lstrip('.'))
+                base = module.split('.') if module else []
+                if not is_package:
+                    base = base[:-1]
+                if level > 1:
+                    base = base[:len(base) - (level - 1)] if level - 1 <= len(base) else []
+                name = '.'.join(base + [name.lstrip('.')]) if name.lstrip('.') else '.'.join(base)
+            parts = [part for part in name.split('.') if part]
+            return ['.'.join(parts[:index]) for index in range(len(parts), 0, -1)]
+        if name.startswith('.'):
+            directory = posixpath.dirname(os.path.relpath(path, self.root).replace(os.sep, '/'))
+            target = posixpath.normpath(posixpath.join(directory, name))
+            stem, extension = posixpath.splitext(target)
+            if LANGUAGE_BY_EXTENSION.get(extension.lower()) == 'javascript':
+                target = stem
+            if posixpath.basename(target) == 'index' and '/' in target:
+                target = posixpath.dirname(target)
+            return [target]
+        return [name]
+
+    def _resolve_imports(self, module):
+        record = self._files[self._modules[module]]
+        targets, aliases, symbols = set(), {}, {}
+        for candidates in record['import_candidates']:
+            target = next((candidate for candidate in candidates if candidate in self._modules), None)
+            if target is None or target == module:
+                continue
+            targets.add(target)
+            aliases[target] = target
+            aliases.setdefault(target.rsplit('.', 1)[-1].rsplit('/', 1)[-1], target)
+            # from pkg.mod import func 解析到 pkg.mod 时，func 是该模块中的名称
+            if candidates[0] != target and candidates[0].startswith(target + '.'):
+                symbols[candidates[0][len(target) + 1:]] = target
+        record['aliases'] = aliases
+        record['symbols'] = symbols
+        current = set(self.imports.successors(module))
+        if targets != current:
+            self.imports.remove_edges_from([(module, target) for target in current - targets])
+            self.imports.add_edges_from((module, target) for target in targets - current)
+            self._mark_dirty(module)
+
+    def _resolve_calls(self, module):
+        """按名称尽力解析模块中各函数的调用"""
+        record = self._files[self._modules[module]]
+        for name, called in record['functions'].items():
+            caller = f"{module}:{name}"
+            self.calls.remove_edges_from(list(self.calls.out_edges(caller)))
+            for callee in called:
+                if '.' in callee:
+                    prefix, callee_name = callee.rsplit('.', 1)
+                    target = record['aliases'].get(prefix)
+                else:
+                    callee_name = callee
+                    target = module if callee in record['functions'] else record['symbols'].get(callee)
+                if target is not None and callee_name in self._files[self._modules[target]]['functions']:
+                    self.calls.add_edge(caller, f"{target}:{callee_name}")
+
+    def _mark_dirty(self, module):
+        if self._components_ready:
+            self._dirty.add(module)
+
+    def dependencies(self, module):
+        """module 直接导入的模块"""
+        return set(self.imports.successors(module)) if module in self.imports else set()
+
+    def dependents(self, module):
+        """直接导入 module 的模块（反向依赖）"""
+        return set(self.imports.predecessors(module)) if module in self.imports else set()
+
+    def transitive_dependencies(self, module):
+        return nx.descendants(self.imports, module) if module in self.imports else set()
+
+    def impact(self, module):
+        """module 变化时受影响的所有模块（传递反向依赖）"""
+        return nx.ancestors(self.imports, module) if module in self.imports else set()
+
+    def impact_of_path(self, path):
+        return self.impact(self.module_name(path))
+
+    def callers(self, module, function):
+        node = f"{module}:{function}"
+        return set(self.calls.predecessors(node)) if node in self.calls else set()
+
+    def callees(self, module, function):
+        node = f"{module}:{function}"
+        return set(self.calls.successors(node)) if node in self.calls else set()
+
+    def cycle_of(self, module):
+        """module 所在的导入环中的全部模块，不在环中时返回空集合"""
+        self._refresh_components()
+        return set(self._component_of.get(module, ()))
+
+    def cycles(self):
+        """所有导入环（大小大于 1 的强连通分量）"""
+        self._refresh_components()
+        return [set(component) for component in set(self._component_of.values())]
+
+    def _refresh_components(self):
+        if not self._components_ready or len(self._dirty) > max(len(self.imports) // 20, 1000):
+            self._component_of = {}
+            self._assign_components(nx.strongly_connected_components(self.imports))
+            self._components_ready = True
+            self._dirty.clear()
+            return
+        while self._dirty:
+            self._refresh_component(self._dirty.pop())
+
+    def _refresh_component(self, module):
+        """只重新计算受 module 出边变化影响的强连通分量
+
+        修改后 module 所在的分量等于它的后代与祖先的交集；原分量只可能拆分，
+        因此只需在这两部分涉及的分量范围内重新计算。
+        """
+        affected = {module}
+        if module in self.imports and self.imports.in_degree(module) and self.imports.out_degree(module):
+            affected.update(self._cycle_members(module))
+        # 扩展到涉及的已有分量的全部成员，保证各分量互不重叠
+        pending = list(affected)
+        while pending:
+            for member in self._component_of.get(pending.pop(), ()):
+                if member not in affected:
+                    affected.add(member)
+                    pending.append(member)
+        for member in affected:
+            self._component_of.pop(member, None)
+        affected.intersection_update(self.imports)
+        self._assign_components(nx.strongly_connected_components(self.imports.subgraph(affected)))
+
+    def _cycle_members(self, module):
+        """与 module 处于同一强连通分量的模块：先求后代，再只在后代范围内反向搜索"""
+        descendants = nx.descendants(self.imports, module)
+        members, pending = set(), [module]
+        while pending:
+            for predecessor in self.imports.predecessors(pending.pop()):
+                if predecessor in descendants and predecessor not in members:
+                    members.add(predecessor)
+                    pending.append(predecessor)
+        return members
+
+    def _assign_components(self, components):
+        for component in components:
+            if len(component) > 1:
+                component = frozenset(component)
+                for member in component:
+                    self._component_of[member] = component
+
+
+_worker_analyzer = None
+
+def _analyze_paths(paths):
+    """进程池工作函数：每个进程复用一个 CodeAnalyzer"""
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = CodeAnalyzer()
+    return [_worker_analyzer.analyze_file(path) for path in paths]
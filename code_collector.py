@@ -5,6 +5,38 @@ import json
 from datetime import datetime
 import re
 import os
+import base64
+import tarfile
+import html
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from http_cache import get_shared_cache
+from rate_limit import TokenBucket
+from corpus_store import CorpusStore
+from package_index import PackageIndex
+from near_duplicates import NearDuplicateIndex
+from code_search import CodeSearchIndex
+
+# Stack Overflow 正文中的代码块
+CODE_BLOCK_RE = re.compile(r'<pre[^>]*>\s*<code[^>]*>(.*?)</code>\s*</pre>', re.S)
+
+# 文件扩展名到语言的映射
+LANGUAGE_BY_EXTENSION = {
+    '.py': 'python',
+    '.js': 'javascript',
+    '.mjs': 'javascript',
+    '.cjs': 'javascript',
+    '.jsx': 'javascript',
+    '.ts': 'typescript',
+    '.java': 'java',
+    '.c': 'c',
+    '.h': 'c',
+    '.cpp': 'cpp',
+    '.go': 'go',
+    '.rs': 'rust',
+    '.rb': 'ruby'
+}
 
 class CodeCollector:
     def __init__(self):
@@ -13,6 +45,15 @@ class CodeCollector:
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.http_cache = get_shared_cache()
+        self.github_api = 'https://api.github.com'
+        self.gitlab_api = 'https://gitlab.com/api/v4'
+        self.stackexchange_api = 'https://api.stackexchange.com/2.3'
+        self._stackexchange_not_before = 0.0
+        self._stackexchange_lock = threading.Lock()
+        self.corpus_store = None
+        self.package_index = None
+        self.github_bucket = TokenBucket(rate=10, capacity=10)
         
     def setup_logging(self):
         logging.basicConfig(
@@ -27,8 +68,8 @@ class CodeCollector:
     def collect_github_code(self, owner, repo, path=""):
         """从GitHub收集代码"""
         try:
-            api_url = f"https://api.github.com/repos/{owner}/{repo}/contents/{path}"
-            response = requests.get(api_url, headers=self.headers)
+            api_url = f"{self.github_api}/repos/{owner}/{repo}/contents/{path}"
+            response = self.http_cache.get(api_url, headers=self.headers)
             if response.status_code == 200:
                 contents = response.json()
                 if isinstance(contents, list):
@@ -42,17 +83,133 @@ class CodeCollector:
             self.logger.error(f"GitHub collection error: {str(e)}")
             return None
 
+    def collect_github_repository(self, owner, repo, ref='HEAD', extensions=None, max_size=1024 * 1024,
+                                  concurrency=8):
+        """收集整个GitHub仓库的代码，按下载完成顺序产出 (path, content)
+
+        通过一次递归 trees 请求获取完整文件树，再并发下载 blob；
+        所有请求经过令牌桶限速，速率根据 X-RateLimit-* 响应头动态调整。
+        """
+        tree = self._github_get(f"{self.github_api}/repos/{owner}/{repo}/git/trees/{ref}",
+                                params={'recursive': '1'})
+        if tree is None:
+            return
+        if tree.get('truncated'):
+            self.logger.warning(f"GitHub tree for {owner}/{repo} is truncated")
+        blobs = [item for item in tree.get('tree', [])
+                 if item['type'] == 'blob' and item.get('size', 0) <= max_size
+                 and (extensions is None or os.path.splitext(item['path'])[1] in extensions)]
+
+        pending = iter(blobs)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = {}
+            for item in pending:
+                futures[executor.submit(self._fetch_github_blob, owner, repo, item)] = item['path']
+                if len(futures) >= concurrency:
+                    break
+            while futures:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = futures.pop(future)
+                    item = next(pending, None)
+                    if item is not None:
+                        futures[executor.submit(self._fetch_github_blob, owner, repo, item)] = item['path']
+                    content = future.result()
+                    if content is not None:
+                        yield path, content
+
+    def _github_get(self, api_url, params=None):
+        """经过令牌桶限速的GitHub API请求"""
+        self.github_bucket.acquire()
+        try:
+            response = self.http_cache.get(api_url, params=params, headers=self.headers)
+            self.github_bucket.update_from_headers(response.headers)
+            if response.status_code == 200:
+                return response.json()
+            self.logger.error(f"GitHub API request failed: {api_url} {response.status_code}")
+            return None
+        except Exception as e:
+            self.logger.error(f"GitHub API request error: {str(e)}")
+            return None
+
+    def _fetch_github_blob(self, owner, repo, item):
+        blob = self._github_get(f"{self.github_api}/repos/{owner}/{repo}/git/blobs/{item['sha']}")
+        if blob is None:
+            return None
+        try:
+            data = base64.b64decode(blob['content']) if blob.get('encoding') == 'base64' else blob['content'].encode('utf-8')
+            return data.decode('utf-8')
+        except (UnicodeDecodeError, KeyError, ValueError):
+            self.logger.debug(f"Skipping non-text blob: {item['path']}")
+            return None
+
+    def iter_repository_archive(self, source, project, ref='HEAD', extensions=None, max_size=1024 * 1024):
+        """下载仓库归档并在内存中流式解压，产出 (path, content)
+
+        source 为 'github'（project 为 "owner/repo"）或 'gitlab'（project 为项目ID）。
+        归档以 tarfile 流模式读取，只解压匹配扩展名且不超过 max_size 的文件，不写入磁盘。
+        下载失败、连接中断或归档损坏/被截断时记录日志后重新抛出，调用方可以区分不完整的结果和正常结束。
+        """
+        if source == 'github':
+            archive_url = f"{self.github_api}/repos/{project}/tarball/{ref}"
+            params = None
+        elif source == 'gitlab':
+            archive_url = f"{self.gitlab_api}/projects/{project}/repository/archive.tar.gz"
+            params = {'sha': ref}
+        else:
+            raise ValueError(f"Unsupported archive source: {source}")
+        extensions = set(LANGUAGE_BY_EXTENSION) if extensions is None else set(extensions)
+        try:
+            with self.http_cache.scheduler.get(archive_url, params=params, headers=self.headers,
+                                               stream=True, timeout=60) as response:
+                if response.status_code != 200:
+                    raise requests.HTTPError(f"Failed to download archive {archive_url}: {response.status_code}",
+                                             response=response)
+                with tarfile.open(fileobj=response.raw, mode='r|*') as archive:
+                    for member in archive:
+                        if not member.isfile() or member.size > max_size:
+                            continue
+                        # 去掉归档顶层的 "<repo>-<sha>/" 目录
+                        path = member.name.split('/', 1)[-1]
+                        if os.path.splitext(path)[1] not in extensions:
+                            continue
+                        data = archive.extractfile(member).read()
+                        try:
+                            yield path, data.decode('utf-8')
+                        except UnicodeDecodeError:
+                            self.logger.debug(f"Skipping non-text file: {path}")
+        except Exception as e:
+            self.logger.error(f"Archive collection error: {str(e)}")
+            raise
+
+    def collect_repository_archive(self, source, project, analysis_queue, ref='HEAD', extensions=None,
+                                   max_size=1024 * 1024):
+        """把仓库归档中的代码文件直接放入分析队列，返回入队的文件数
+
+        归档下载或解压失败时抛出异常（此前已入队的文件保留在队列中），不会把部分结果当作成功返回。
+        """
+        count = 0
+        for path, content in self.iter_repository_archive(source, project, ref, extensions, max_size):
+            analysis_queue.put({
+                'code': content,
+                'language': LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1], 'unknown'),
+                'url': f"{source}:{project}@{ref}/{path}",
+                'path': path
+            })
+            count += 1
+        return count
+
     def collect_stackoverflow_code(self, tag, limit=10):
         """从Stack Overflow收集代码示例"""
         try:
-            api_url = f"https://api.stackexchange.com/2.3/questions"
+            api_url = f"{self.stackexchange_api}/questions"
             params = {
                 'tagged': tag,
                 'sort': 'votes',
                 'site': 'stackoverflow',
                 'pagesize': limit
             }
-            response = requests.get(api_url, params=params)
+            response = self.http_cache.get(api_url, params=params)
             if response.status_code == 200:
                 return response.json()['items']
             else:
@@ -62,12 +219,116 @@ class CodeCollector:
             self.logger.error(f"Stack Overflow collection error: {str(e)}")
             return None
 
+    def harvest_stackoverflow_code(self, tag, target=1000, concurrency=4, pagesize=100,
+                                   checkpoint_path=None, min_quota=10):
+        """分页并发收集Stack Overflow问题中的代码块，逐个产出代码片段
+
+        每一轮并发请求 concurrency 个页面，遵守API返回的 backoff 和 quota_remaining；
+        通过 'withbody' 过滤器获取问题正文并提取 <pre><code> 代码块。
+        提供 checkpoint_path 时记录下一页页码和已产出片段的ID（问题ID:代码块序号），
+        每轮结束时以及生成器结束、出错或被关闭时写入，中断后继续时不会重复产出。
+        """
+        state = {'tag': tag, 'next_page': 1, 'harvested': 0, 'seen': []}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('tag') == tag:
+                state.update(saved)
+                state.setdefault('seen', [])
+        seen = set(state['seen'])
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                while state['harvested'] < target:
+                    pages = range(state['next_page'], state['next_page'] + concurrency)
+                    results = list(executor.map(lambda page: self._fetch_stackoverflow_page(tag, page, pagesize), pages))
+                    has_more = True
+                    for page, data in zip(pages, results):
+                        if data is None:
+                            has_more = False
+                            break
+                        for snippet in self._extract_stackoverflow_snippets(data.get('items', [])):
+                            snippet_id = f"{snippet['question_id']}:{snippet['index']}"
+                            if snippet_id in seen:
+                                continue
+                            if state['harvested'] >= target:
+                                # 本页还有未产出的片段，下次从本页继续
+                                has_more = False
+                                break
+                            # 先记录再产出：调用方拿到片段后中断也不会在续传时重复
+                            seen.add(snippet_id)
+                            state['seen'].append(snippet_id)
+                            state['harvested'] += 1
+                            yield snippet
+                        if not has_more:
+                            break
+                        state['next_page'] = page + 1
+                        if not data.get('has_more') or data.get('quota_remaining', min_quota) < min_quota:
+                            has_more = False
+                            break
+                    if checkpoint_path:
+                        self._save_checkpoint(checkpoint_path, state)
+                    if not has_more:
+                        break
+        finally:
+            if checkpoint_path:
+                self._save_checkpoint(checkpoint_path, state)
+
+    def _fetch_stackoverflow_page(self, tag, page, pagesize):
+        """请求一页问题，等待此前响应要求的 backoff 时间"""
+        with self._stackexchange_lock:
+            delay = self._stackexchange_not_before - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        params = {
+            'tagged': tag,
+            'sort': 'votes',
+            'site': 'stackoverflow',
+            'pagesize': pagesize,
+            'page': page,
+            'filter': 'withbody'
+        }
+        try:
+            # 不使用缓存：每轮都需要最新的 backoff、quota_remaining 和问题列表
+            response = self.http_cache.get(f"{self.stackexchange_api}/questions", params=params, no_store=True)
+            data = response.json()
+            if data.get('backoff'):
+                with self._stackexchange_lock:
+                    self._stackexchange_not_before = max(self._stackexchange_not_before,
+                                                         time.monotonic() + data['backoff'])
+            if response.status_code != 200:
+                self.logger.error(f"Stack Overflow page {page} failed: {data.get('error_message', response.status_code)}")
+                return None
+            return data
+        except Exception as e:
+            self.logger.error(f"Stack Overflow harvest error: {str(e)}")
+            return None
+
+    def _extract_stackoverflow_snippets(self, items):
+        for item in items:
+            for index, match in enumerate(CODE_BLOCK_RE.finditer(item.get('body', ''))):
+                yield {
+                    'question_id': item.get('question_id'),
+                    'title': html.unescape(item.get('title', '')),
+                    'link': item.get('link'),
+                    'score': item.get('score'),
+                    'tags': item.get('tags', []),
+                    'index': index,
+                    'code': html.unescape(match.group(1))
+                }
+
+    def _save_checkpoint(self, checkpoint_path, state):
+        tmp_path = checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, checkpoint_path)
+
     def collect_gitlab_code(self, project_id, branch='main'):
         """从GitLab收集代码"""
         try:
-            api_url = f"https://gitlab.com/api/v4/projects/{project_id}/repository/tree"
+            api_url = f"{self.gitlab_api}/projects/{project_id}/repository/tree"
             params = {'ref': branch}
-            response = requests.get(api_url, params=params, headers=self.headers)
+            response = self.http_cache.get(api_url, params=params, headers=self.headers)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -78,35 +339,113 @@ class CodeCollector:
             return None
 
     def collect_npm_package_code(self, package_name):
-        """从NPM收集包信息和代码"""
+        """从NPM收集包信息和代码（优先读取本地包索引）"""
         try:
-            api_url = f"https://registry.npmjs.org/{package_name}"
-            response = requests.get(api_url)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                self.logger.error(f"Failed to collect NPM package info: {response.status_code}")
-                return None
+            package = self.get_package_index().get('npm', package_name)
+            if package is not None:
+                return package['data']
+            self.logger.error(f"Failed to collect NPM package info: {package_name}")
+            return None
         except Exception as e:
             self.logger.error(f"NPM collection error: {str(e)}")
             return None
 
     def collect_pypi_package_code(self, package_name):
-        """从PyPI收集包信息和代码"""
+        """从PyPI收集包信息和代码（优先读取本地包索引）"""
         try:
-            api_url = f"https://pypi.org/pypi/{package_name}/json"
-            response = requests.get(api_url)
-            if response.status_code == 200:
-                return response.json()
-            else:
-                self.logger.error(f"Failed to collect PyPI package info: {response.status_code}")
-                return None
+            package = self.get_package_index().get('pypi', package_name)
+            if package is not None:
+                return package['data']
+            self.logger.error(f"Failed to collect PyPI package info: {package_name}")
+            return None
         except Exception as e:
             self.logger.error(f"PyPI collection error: {str(e)}")
             return None
 
-    def save_code(self, code_data, file_path):
-        """保存收集到的代码"""
+    def get_package_index(self):
+        """获取（必要时创建）本地包元数据索引"""
+        if self.package_index is None:
+            self.package_index = PackageIndex()
+        return self.package_index
+
+    def sync_package_index(self, registry=None):
+        """从注册表变更源增量同步本地包索引
+
+        索引不会自行同步，需定期调用（例如与其他收集任务一起每小时一次），
+        使已变更的包在下次查询时重新获取；两次同步之间的条目最长使用 package_max_age 秒。
+        """
+        try:
+            return self.get_package_index().sync(registry)
+        except Exception as e:
+            self.logger.error(f"Package index sync error: {str(e)}")
+            return None
+
+    def store_code(self, code_data):
+        """把代码保存到按内容哈希寻址的语料库，返回内容摘要；重复内容不会重复存储"""
+        try:
+            if self.corpus_store is None:
+                self.corpus_store = CorpusStore()
+            return self.corpus_store.put(code_data)
+        except Exception as e:
+            self.logger.error(f"Corpus store error: {str(e)}")
+            return None
+
+    def find_clones(self, threshold=0.8, index_path=':memory:', **kwargs):
+        """扫描语料库，返回近重复代码簇报告（见 NearDuplicateIndex.clone_report）
+
+        语料中的字典记录使用其 'code' 和 'language' 字段，簇中的键为语料摘要。
+        """
+        try:
+            if self.corpus_store is None:
+                self.corpus_store = CorpusStore()
+            index = NearDuplicateIndex(index_path, threshold=threshold, **kwargs)
+            try:
+                for digest, code_data in self.corpus_store.scan():
+                    if isinstance(code_data, dict):
+                        code, language = code_data.get('code'), code_data.get('language')
+                    else:
+                        code, language = code_data, None
+                    if isinstance(code, str):
+                        index.add(digest, code, language)
+                return index.clone_report()
+            finally:
+                index.close()
+        except Exception as e:
+            self.logger.error(f"Clone detection error: {str(e)}")
+            return None
+
+    def build_search_index(self, path='code_search.npz', encoder=None, **kwargs):
+        """用语料库中的全部代码批量构建相似代码检索索引（见 CodeSearchIndex）并保存
+
+        键为语料摘要；encoder 为 None 时使用哈希 TF-IDF 向量。失败返回 None。
+        """
+        try:
+            if self.corpus_store is None:
+                self.corpus_store = CorpusStore()
+            documents = []
+            for digest, code_data in self.corpus_store.scan():
+                if isinstance(code_data, dict):
+                    code, language = code_data.get('code'), code_data.get('language')
+                else:
+                    code, language = code_data, None
+                if isinstance(code, str):
+                    documents.append((digest, code, language))
+            # 不加载 path 处的旧索引：重建会丢弃原有内容，旧文件的编码器也可能与本次不同
+            index = CodeSearchIndex(None, encoder=encoder, **kwargs)
+            index.build(documents)
+            index.save(path)
+            return index
+        except Exception as e:
+            self.logger.error(f"Search index build error: {str(e)}")
+            return None
+
+    def save_code(self, code_data, file_path=None):
+        """保存收集到的代码
+
+        未指定 file_path 时写入语料库（见 store_code），成功返回 True。
+        """
+        if file_path is None:
+            return self.store_code(code_data) is not None
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 if isinstance(code_data, dict):
@@ -1,8 +1,12 @@
 from learning_engine import CodeLearningEngine
+from code_collector import CodeCollector, LANGUAGE_BY_EXTENSION
+from url_seen_set import SeenURLSet
+from near_duplicates import NearDuplicateIndex
 import requests
 import logging
 from datetime import datetime
 import threading
+import time
 import queue
 import json
 import os
@@ -13,7 +17,20 @@ class CodeMonster:
         self.setup_logging()
         self.learning_engine = CodeLearningEngine()
         self.code_queue = queue.Queue()
-        self.processed_urls = set()
+        self._stopping = threading.Event()
+        self._threads = []
+        # 持久化的已处理URL集合，重启后无需重新学习
+        self.processed_urls = SeenURLSet('code_monster_urls')
+        # 同一段代码常在多个来源重复出现，近重复的代码不再重复学习
+        self.near_duplicates = NearDuplicateIndex('code_monster_dedup.db')
+        self.skipped_duplicates = 0
+        # 所有请求经由 CodeCollector 提交给共享的 RequestScheduler
+        self.code_collector = CodeCollector()
+        self.sources = {
+            'github': [],         # "owner/repo"
+            'gitlab': [],         # 项目ID
+            'stackoverflow': []   # 标签
+        }
         
     def setup_logging(self):
         logging.basicConfig(
@@ -33,20 +50,68 @@ class CodeMonster:
         
         collector_thread.start()
         processor_thread.start()
+        self._threads = [collector_thread, processor_thread]
+
+    def close(self, timeout=None):
+        """停止收集，等待处理线程处理完队列中的代码，再把已处理URL和近重复索引写入磁盘"""
+        self._stopping.set()
+        self.code_queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self.processed_urls.close()
+        self.near_duplicates.close()
         
     def _collect_code(self):
         """收集代码的线程"""
-        while True:
+        while not self._stopping.is_set():
             try:
                 # 从多个源收集代码
                 self._collect_from_github()
                 self._collect_from_gitlab()
                 self._collect_from_stackoverflow()
                 # 等待一段时间再继续收集
-                time.sleep(3600)  # 每小时收集一次
+                self._stopping.wait(3600)  # 每小时收集一次
             except Exception as e:
                 self.logger.error(f"Code collection error: {str(e)}")
                 
+    def _collect_from_github(self):
+        """从配置的GitHub仓库收集代码"""
+        for project in self.sources['github']:
+            owner, repo = project.split('/', 1)
+            for path, content in self.code_collector.collect_github_repository(
+                    owner, repo, extensions=LANGUAGE_BY_EXTENSION):
+                if self._stopping.is_set():
+                    return
+                self._enqueue_code(f"https://github.com/{project}/blob/HEAD/{path}", path, content)
+
+    def _collect_from_gitlab(self):
+        """从配置的GitLab项目归档收集代码"""
+        for project_id in self.sources['gitlab']:
+            try:
+                for path, content in self.code_collector.iter_repository_archive('gitlab', project_id):
+                    if self._stopping.is_set():
+                        return
+                    self._enqueue_code(f"gitlab:{project_id}/{path}", path, content)
+            except Exception as e:
+                # 归档中断时已入队的文件保留，下一轮收集时重新下载该项目，其余项目继续
+                self.logger.error(f"GitLab archive error for {project_id}: {str(e)}")
+
+    def _collect_from_stackoverflow(self):
+        """从配置的Stack Overflow标签收集代码片段"""
+        for tag in self.sources['stackoverflow']:
+            for snippet in self.code_collector.harvest_stackoverflow_code(tag, target=100):
+                if self._stopping.is_set():
+                    return
+                url = f"{snippet['link']}#{snippet['index']}"
+                if url not in self.processed_urls:
+                    self.code_queue.put({'code': snippet['code'], 'language': tag, 'url': url})
+
+    def _enqueue_code(self, url, path, content):
+        if url in self.processed_urls:
+            return
+        language = LANGUAGE_BY_EXTENSION.get(os.path.splitext(path)[1], 'unknown')
+        self.code_queue.put({'code': content, 'language': language, 'url': url})
+
     def _process_code(self):
         """处理代码的线程"""
         while True:
@@ -54,17 +119,29 @@ class CodeMonster:
                 # 从队列获取代码
                 code_data = self.code_queue.get()
                 if code_data is None:
+                    if self._stopping.is_set():
+                        return
                     continue
                     
-                # 学习代码模式
-                self.learning_engine.learn_from_code(
-                    code_data['code'],
-                    code_data['language']
-                )
+                duplicate = self.near_duplicates.add_if_unique(
+                    code_data['url'], code_data['code'], code_data['language'])
+                if duplicate is not None:
+                    self.skipped_duplicates += 1
+                    self.logger.debug(f"Skipping {code_data['url']}: near-duplicate of {duplicate[0]}")
+                else:
+                    # 学习代码模式
+                    self.learning_engine.learn_from_code(
+                        code_data['code'],
+                        code_data['language']
+                    )
                 
                 # 标记URL为已处理
                 self.processed_urls.add(code_data['url'])
-                
+                # 队列处理空（一批代码处理完）时落盘，进程退出或崩溃时最多重新学习当前这一批
+                if self.code_queue.empty():
+                    self.processed_urls.flush()
+                    self.near_duplicates.flush()
+
             except Exception as e:
                 self.logger.error(f"Code processing error: {str(e)}")
                 
@@ -89,6 +166,7 @@ class CodeMonster:
         """获取学习状态"""
         return {
             'processed_urls': len(self.processed_urls),
+            'skipped_duplicates': self.skipped_duplicates,
             'knowledge_base_size': len(self.learning_engine.code_patterns),
             'supported_languages': list(self.learning_engine.knowledge_base.keys())
         }
\ No newline at end of file
@@ -0,0 +1,433 @@
+import json
+import math
+import os
+import zlib
+from functools import lru_cache
+import numpy as np
+from near_duplicates import normalize_tokens
+from symbol_index import split_identifier
+
+# 一次参与矩阵乘法的向量行数，限制 (chunk x nlist) 中间矩阵的大小
+_CHUNK = 4096
+_FORMAT_VERSION = 1
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_hash(feature):
+    return zlib.crc32(feature.encode('utf-8'))
+
+
+def code_features(code, language=None):
+    """提取代码的词袋特征：标识符和字符串中的小写子词，以及相邻子词组成的二元组
+
+    注释、数字和标点被丢弃，因此 load_user_config 与 loadUserConfig 得到相同的特征。
+    """
+    words = []
+    for token in normalize_tokens(code, language):
+        head = token[0]
+        if head.isalpha() or head in '_$' or head in '"\'`':
+            words.extend(split_identifier(token))
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def _normalize_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return (matrix / norms).astype(np.float32, copy=False)
+
+
+class HashingEncoder:
+    """特征哈希 + TF-IDF 编码器
+
+    特征经 crc32 映射到 dim 个桶中（最高位决定符号，使冲突的期望贡献为零），
+    词频取 log(1 + tf) 后乘以 fit 时统计的 IDF，最后做 L2 归一化，内积即余弦相似度。
+    不需要词表，未见过的标识符也能编码；fit 之前所有桶的 IDF 都为 1。
+    """
+
+    name = 'hashing'
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.documents = 0
+        self.df = np.zeros(dim, dtype=np.float64)
+        self.idf = np.ones(dim, dtype=np.float32)
+
+    def _buckets(self, code, language):
+        hashes = np.fromiter((_feature_hash(feature) for feature in code_features(code, language)),
+                             dtype=np.uint32)
+        signs = np.where(hashes >> np.uint32(31), -1.0, 1.0)
+        return (hashes % np.uint32(self.dim)).astype(np.intp), signs
+
+    def _term_frequencies(self, codes, languages):
+        languages = languages or [None] * len(codes)
+        matrix = np.zeros((len(codes), self.dim), dtype=np.float32)
+        for row, (code, language) in enumerate(zip(codes, languages)):
+            buckets, signs = self._buckets(code, language)
+            if len(buckets):
+                counts = np.bincount(buckets, weights=signs, minlength=self.dim)
+                matrix[row] = np.sign(counts) * np.log1p(np.abs(counts))
+        return matrix
+
+    def fit(self, codes, languages=None):
+        """按文档频率计算 IDF；之后编码的向量都使用这组权重"""
+        self.fit_encode(codes, languages)
+        return self
+
+    def fit_encode(self, codes, languages=None):
+        """fit 后编码同一批文档，每个文档只切分一次"""
+        matrix = self._term_frequencies(codes, languages)
+        self.df = np.count_nonzero(matrix, axis=0).astype(np.float64)
+        self.documents = len(codes)
+        self._update_idf()
+        return _normalize_rows(matrix * self.idf)
+
+    def _update_idf(self):
+        self.idf = (np.log((1 + self.documents) / (1 + self.df)) + 1).astype(np.float32)
+
+    def encode(self, codes, languages=None):
+        return _normalize_rows(self._term_frequencies(codes, languages) * self.idf)
+
+    def state(self):
+        return {'dim': np.array(self.dim), 'documents': np.array(self.documents), 'df': self.df}
+
+    @classmethod
+    def from_state(cls, state):
+        encoder = cls(int(state['dim']))
+        encoder.documents = int(state['documents'])
+        encoder.df = np.asarray(state['df'], dtype=np.float64)
+        encoder._update_idf()
+        return encoder
+
+
+class LearningEngineEncoder:
+    """用 CodeLearningEngine 的 GPT-2 模型编码：最后一层隐藏状态按注意力掩码取平均
+
+    比哈希向量更能捕捉语义，但编码速度慢几个数量级；模型未能加载时构造即报错。
+    """
+
+    name = 'learning_engine'
+
+    def __init__(self, engine, max_length=256, batch_size=16):
+        if getattr(engine, 'model', None) is None:
+            raise ValueError("CodeLearningEngine model is not available")
+        self.engine = engine
+        self.max_length = max_length
+        self.batch_size = batch_size
+        self.dim = engine.model.config.n_embd
+        # GPT-2 没有填充符，批量编码时用结束符代替（填充位置会被注意力掩码排除）
+        if engine.tokenizer.pad_token is None:
+            engine.tokenizer.pad_token = engine.tokenizer.eos_token
+
+    def fit(self, codes, languages=None):
+        return self
+
+    def fit_encode(self, codes, languages=None):
+        return self.encode(codes, languages)
+
+    def encode(self, codes, languages=None):
+        import torch
+
+        rows = []
+        with torch.no_grad():
+            for start in range(0, len(codes), self.batch_size):
+                inputs = self.engine.tokenizer(list(codes[start:start + self.batch_size]), return_tensors='pt',
+                                               padding=True, truncation=True, max_length=self.max_length)
+                hidden = self.engine.model.transformer(**inputs).last_hidden_state
+                mask = inputs['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                rows.append(((hidden * mask).sum(1) / mask.sum(1).clamp(min=1)).numpy())
+        if not rows:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return _normalize_rows(np.concatenate(rows).astype(np.float32))
+
+    def state(self):
+        return {'dim': np.array(self.dim)}
+
+
+def _nearest(vectors, centroids):
+    """每个向量内积最大的质心编号，分块计算以限制内存"""
+    assignment = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), _CHUNK):
+        assignment[start:start + _CHUNK] = np.argmax(vectors[start:start + _CHUNK] @ centroids.T, axis=1)
+    return assignment
+
+
+def _spherical_kmeans(data, k, iterations, rng):
+    """球面 k-means：质心归一化，距离用内积；空簇用随机样本重新播种"""
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = _nearest(data, centroids)
+        order = np.argsort(assignment, kind='stable')
+        counts = np.bincount(assignment, minlength=k)
+        occupied = np.flatnonzero(counts)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[occupied]
+        sums = np.zeros_like(centroids)
+        sums[occupied] = np.add.reduceat(data[order], starts, axis=0)
+        empty = np.flatnonzero(counts == 0)
+        sums[empty] = data[rng.choice(len(data), len(empty), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+def _top_k(scores, k):
+    if len(scores) > k:
+        selected = np.argpartition(-scores, k - 1)[:k]
+    else:
+        selected = np.arange(len(scores))
+    return selected[np.argsort(-scores[selected], kind='stable')]
+
+
+class CodeSearchIndex:
+    """相似代码检索索引：代码片段编码为归一化向量，用倒排文件 (IVF) 做近似最近邻搜索
+
+    向量先经球面 k-means 聚成 nlist 个簇，每个簇维护一个向量编号列表；查询时只扫描与查询
+    最接近的 nprobe 个簇，候选向量的相似度用一次矩阵乘法算出。向量数不足 train_threshold
+    时不建簇，直接精确扫描；增量插入的向量分配到最近的簇，向量数增长到上次训练时的
+    retrain_factor 倍后自动重新聚类，保持各簇大小均衡。
+
+    默认使用 HashingEncoder，也可以传入 LearningEngineEncoder 等带 name、dim、fit_encode、encode、
+    state 的编码器。save() 把向量、质心和编码器状态写入单个 .npz 文件，构造时自动加载。
+    """
+
+    def __init__(self, path='code_search.npz', encoder=None, nlist=None, nprobe=None, train_threshold=1000,
+                 retrain_factor=4, kmeans_iterations=10, seed=1):
+        self.path = path
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_threshold = train_threshold
+        self.retrain_factor = retrain_factor
+        self.kmeans_iterations = kmeans_iterations
+        self._rng = np.random.default_rng(seed)
+        self.encoder = encoder
+        self._reset(encoder.dim if encoder is not None else 0)
+        if path and os.path.exists(path):
+            self._load()
+        elif self.encoder is None:
+            self.encoder = HashingEncoder()
+            self._reset(self.encoder.dim)
+
+    def _reset(self, dim):
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._assignment = np.zeros(0, dtype=np.int32)
+        self._count = 0
+        self._keys = []
+        self._ids = {}
+        self._centroids = None
+        self._lists = []
+        self._list_sizes = np.zeros(0, dtype=np.int64)
+        self._trained_on = 0
+
+    def _load(self):
+        with np.load(self.path, allow_pickle=False) as data:
+            meta = json.loads(str(data['meta']))
+            if meta['version'] != _FORMAT_VERSION:
+                raise ValueError(f"Unsupported code search index version: {meta['version']}")
+            state = {name[len('encoder_'):]: data[name] for name in data.files if name.startswith('encoder_')}
+            if self.encoder is None:
+                if meta['encoder'] != HashingEncoder.name:
+                    raise ValueError(f"Index was built with the '{meta['encoder']}' encoder; pass it explicitly")
+                self.encoder = HashingEncoder.from_state(state)
+            elif self.encoder.name != meta['encoder'] or self.encoder.dim != int(state['dim']):
+                raise ValueError(f"Encoder mismatch: index was built with '{meta['encoder']}' "
+                                 f"(dim {int(state['dim'])})")
+            self._reset(self.encoder.dim)
+            self._keys = [str(key) for key in data['keys']]
+            self._ids = {key: number for number, key in enumerate(self._keys)}
+            self._count = len(self._keys)
+            self._vectors = np.array(data['vectors'], dtype=np.float32)
+            self._alive = np.ones(self._count, dtype=bool)
+            self._assignment = np.array(data['assignment'], dtype=np.int32)
+            self._trained_on = meta['trained_on']
+            if len(data['centroids']):
+                self._centroids = np.array(data['centroids'], dtype=np.float32)
+                self._rebuild_lists()
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    @property
+    def trained(self):
+        return self._centroids is not None
+
+    def build(self, documents):
+        """批量构建：documents 为 (key, code[, language]) 序列，先拟合编码器再编码、聚类
+
+        原有内容被丢弃。
+        """
+        keys, codes, languages = [], [], []
+        for document in documents:
+            keys.append(document[0])
+            codes.append(document[1])
+            languages.append(document[2] if len(document) > 2 else None)
+        vectors = self.encoder.fit_encode(codes, languages)
+        self._reset(self.encoder.dim)
+        self._append(keys, vectors, assign=False)
+        if len(self) >= self.train_threshold:
+            self.train()
+        return len(self)
+
+    def add(self, key, code, language=None):
+        self.add_many([(key, code, language)])
+
+    def add_many(self, documents, batch_size=1024):
+        """增量插入，编码器保持不变；已存在的键被新内容替换"""
+        batch = []
+        for document in documents:
+            batch.append(document)
+            if len(batch) >= batch_size:
+                self._add_batch(batch)
+                batch = []
+        if batch:
+            self._add_batch(batch)
+
+    def _add_batch(self, batch):
+        latest = {}
+        for document in batch:
+            latest[document[0]] = document
+        documents = list(latest.values())
+        for key, *_ in documents:
+            self.remove(key)
+        codes = [document[1] for document in documents]
+        languages = [document[2] if len(document) > 2 else None for document in documents]
+        self._append([document[0] for document in documents], self.encoder.encode(codes, languages),
+                     assign=True)
+        if (not self.trained and len(self) >= self.train_threshold) or \
+                (self.trained and len(self) >= self.retrain_factor * self._trained_on):
+            self.train()
+
+    def _append(self, keys, vectors, assign):
+        needed = self._count + len(keys)
+        if needed > len(self._vectors):
+            capacity = max(needed, 2 * len(self._vectors), 64)
+            self._vectors = np.resize(self._vectors, (capacity, self.encoder.dim))
+            self._alive = np.resize(self._alive, capacity)
+            self._assignment = np.resize(self._assignment, capacity)
+        ids = np.arange(self._count, needed)
+        self._vectors[ids] = vectors
+        self._alive[ids] = True
+        self._assignment[ids] = -1
+        for key, number in zip(keys, ids.tolist()):
+            self._keys.append(key)
+            self._ids[key] = number
+        self._count = needed
+        if assign and self.trained:
+            assignment = _nearest(vectors, self._centroids)
+            self._assignment[ids] = assignment
+            for cluster, number in zip(assignment.tolist(), ids.tolist()):
+                self._push(cluster, number)
+
+    def _push(self, cluster, number):
+        size = self._list_sizes[cluster]
+        members = self._lists[cluster]
+        if size == len(members):
+            members = self._lists[cluster] = np.resize(members, max(8, 2 * len(members)))
+        members[size] = number
+        self._list_sizes[cluster] = size + 1
+
+    def remove(self, key):
+        """删除一个键；向量留在原位并标记为失效，save() 时压缩"""
+        number = self._ids.pop(key, None)
+        if number is None:
+            return False
+        self._alive[number] = False
+        return True
+
+    def train(self, nlist=None):
+        """对现有向量重新做 k-means 聚类并重建倒排列表
+
+        nlist 默认为 4 * sqrt(n)；聚类只用至多 64 * nlist 个随机样本，分配覆盖全部向量。
+        """
+        self._compact()
+        count = self._count
+        if count == 0:
+            return
+        nlist = min(count, nlist or self.nlist or max(1, int(4 * math.sqrt(count))))
+        vectors = self._vectors[:count]
+        sample = vectors[self._rng.choice(count, min(count, 64 * nlist), replace=False)]
+        self._centroids = _spherical_kmeans(sample, nlist, self.kmeans_iterations, self._rng)
+        self._assignment[:count] = _nearest(vectors, self._centroids)
+        self._trained_on = count
+        self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        assignment = self._assignment[:self._count]
+        nlist = len(self._centroids)
+        order = np.argsort(assignment, kind='stable')
+        self._list_sizes = np.bincount(assignment, minlength=nlist).astype(np.int64)
+        self._lists = np.split(order, np.cumsum(self._list_sizes)[:-1])
+
+    def _compact(self):
+        """丢弃已删除的向量并重新编号"""
+        alive = self._alive[:self._count]
+        if alive.all():
+            return
+        keep = np.flatnonzero(alive)
+        self._vectors = self._vectors[keep]
+        self._assignment = self._assignment[keep]
+        self._alive = np.ones(len(keep), dtype=bool)
+        self._keys = [self._keys[number] for number in keep.tolist()]
+        self._ids = {key: number for number, key in enumerate(self._keys)}
+        self._count = len(keep)
+        if self.trained:
+            self._rebuild_lists()
+
+    def encode(self, codes, languages=None):
+        return self.encoder.encode(list(codes), languages)
+
+    def search(self, code, k=10, language=None, nprobe=None):
+        """返回与 code 最相似的至多 k 个 (key, 余弦相似度)，按相似度降序"""
+        return self.search_vectors(self.encode([code], [language]), k, nprobe)[0]
+
+    def search_many(self, codes, k=10, languages=None, nprobe=None):
+        return self.search_vectors(self.encode(codes, languages), k, nprobe)
+
+    def search_vectors(self, queries, k=10, nprobe=None):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        if not self.trained:
+            return self.exact_search_vectors(queries, k)
+        nprobe = min(len(self._centroids), nprobe or self.nprobe or max(8, len(self._centroids) // 16))
+        probes = np.argpartition(-(queries @ self._centroids.T), nprobe - 1, axis=1)[:, :nprobe]
+        results = []
+        for query, clusters in zip(queries, probes):
+            candidates = np.concatenate([self._lists[cluster][:self._list_sizes[cluster]] for cluster in clusters])
+            candidates = candidates[self._alive[candidates]]
+            scores = self._vectors[candidates] @ query
+            results.append([(self._keys[candidates[index]], float(scores[index]))
+                            for index in _top_k(scores, k)])
+        return results
+
+    def exact_search(self, code, k=10, language=None):
+        """逐个比较全部向量的精确检索，作为近似结果的对照"""
+        return self.exact_search_vectors(self.encode([code], [language]), k)[0]
+
+    def exact_search_vectors(self, queries, k=10):
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        vectors = self._vectors[:self._count]
+        dead = np.flatnonzero(~self._alive[:self._count])
+        results = []
+        for start in range(0, len(queries), 64):
+            scores = queries[start:start + 64] @ vectors.T
+            scores[:, dead] = -np.inf
+            for row in scores:
+                results.append([(self._keys[index], float(row[index])) for index in _top_k(row, min(k, len(self)))])
+        return results
+
+    def save(self, path=None):
+        """压缩后写入 .npz 文件（先写临时文件再替换，写入中断不会损坏旧索引）
+
+        指定 path 时之后的 save() 也写入该路径。
+        """
+        path = self.path = path or self.path
+        self._compact()
+        meta = {'version': _FORMAT_VERSION, 'encoder': self.encoder.name, 'trained_on': self._trained_on}
+        arrays = {'encoder_' + name: value for name, value in self.encoder.state().items()}
+        centroids = self._centroids if self.trained else np.zeros((0, self.encoder.dim), np.float32)
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as f:
+            np.savez_compressed(f, meta=np.array(json.dumps(meta)), keys=np.array(self._keys, dtype=str),
+                                vectors=self._vectors[:self._count], assignment=self._assignment[:self._count],
+                                centroids=centroids, **arrays)
+        os.replace(temp_path, path)
@@ -6,6 +6,13 @@ CONFIG = {
     },
     "data_collection": {
         "cache_duration": 3600,  # 1小时
-        "retry_attempts": 3
+        "retry_attempts": 3,
+        "request_timeout": 30,  # 单次请求超时(秒)
+        "package_max_age": 86400,  # 包索引条目的最长使用时间(秒)，超过后查询时重新获取
+        "host_rate_limit": None,  # 默认的每主机请求速率(次/秒)，None 表示不限速
+        # 已知API的每主机请求速率(次/秒)，例如 Stack Exchange 对单个IP的限制为 30 次/秒
+        "host_rate_limits": {
+            "api.stackexchange.com": 25
+        }
     }
 }
\ No newline at end of file
@@ -0,0 +1,263 @@
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+# 记录头：摘要(32) + 类型(1) + 原始长度(8) + 压缩长度(8)
+_RECORD_HEADER = struct.Struct('<32sBQQ')
+# 索引头：魔数 + 槽位数 + 已用槽位数 + 已建索引的位置(包文件编号 + 该包内的结束偏移)
+_INDEX_HEADER = struct.Struct('<8sQQIQ')
+# 索引槽：摘要(32) + 包文件编号(4) + 偏移(8)，编号为0表示空槽
+_INDEX_SLOT = struct.Struct('<32sIQ')
+_INDEX_MAGIC = b'CORPIDX2'
+
+KIND_TEXT = 0
+KIND_JSON = 1
+KIND_BYTES = 2
+
+def _encode(code_data):
+    if isinstance(code_data, (dict, list)):
+        return KIND_JSON, json.dumps(code_data, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    if isinstance(code_data, bytes):
+        return KIND_BYTES, code_data
+    return KIND_TEXT, str(code_data).encode('utf-8')
+
+def _decode(kind, data):
+    if kind == KIND_JSON:
+        return json.loads(data.decode('utf-8'))
+    if kind == KIND_BYTES:
+        return data
+    return data.decode('utf-8', errors='replace')
+
+def _digest(kind, raw):
+    """摘要覆盖类型和内容：编码相同但类型不同的数据（如 JSON 文本与同内容的字典）不会合并为一条记录"""
+    return hashlib.sha256(bytes((kind,)) + raw).digest()
+
+
+class CorpusStore:
+    """按内容哈希寻址的压缩代码语料库
+
+    记录以 zlib 压缩后追加到大的包文件中，相同内容只保存一次；
+    内存映射的开放寻址哈希索引把 SHA-256 摘要映射到 (包文件, 偏移)，查找为 O(1)。
+    包文件是唯一的事实来源：索引头记录已建索引的包文件位置，打开时补建此后写入的记录；
+    索引缺失、损坏或与包文件不一致时从包文件重建。
+    """
+
+    def __init__(self, root='corpus', pack_size=256 * 1024 * 1024, initial_capacity=1 << 16, compress_level=6):
+        self.root = root
+        self.pack_size = pack_size
+        self.compress_level = compress_level
+        os.makedirs(root, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index_path = os.path.join(root, 'index.bin')
+        tmp_path = self._index_path + '.tmp'
+        if os.path.exists(tmp_path):
+            # 扩容中途崩溃留下的临时索引，原索引未被替换，仍然完整
+            os.remove(tmp_path)
+        if self._open_index():
+            self._catch_up()
+        else:
+            self._rebuild_index(initial_capacity)
+        packs = self._pack_ids()
+        self._pack_id = packs[-1] if packs else 1
+        self._pack_file = open(self._pack_path(self._pack_id), 'ab')
+
+    def put(self, code_data):
+        """保存数据并返回其十六进制摘要；内容已存在时不重复写入"""
+        kind, raw = _encode(code_data)
+        digest = _digest(kind, raw)
+        with self._lock:
+            if self._find_slot(digest)[1] is not None:
+                return digest.hex()
+            if self._pack_file.tell() >= self.pack_size:
+                self._pack_file.close()
+                self._pack_id += 1
+                self._pack_file = open(self._pack_path(self._pack_id), 'ab')
+            compressed = zlib.compress(raw, self.compress_level)
+            offset = self._pack_file.tell()
+            self._pack_file.write(_RECORD_HEADER.pack(digest, kind, len(raw), len(compressed)))
+            self._pack_file.write(compressed)
+            self._pack_file.flush()
+            self._insert(digest, self._pack_id, offset)
+            self._mark_indexed(self._pack_id, self._pack_file.tell())
+        return digest.hex()
+
+    def get(self, key, default=None):
+        """按摘要读取数据"""
+        digest = bytes.fromhex(key)
+        with self._lock:
+            location = self._find_slot(digest)[1]
+        if location is None:
+            return default
+        pack_id, offset = location
+        with open(self._pack_path(pack_id), 'rb') as f:
+            f.seek(offset)
+            _, kind, _, length = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            return _decode(kind, zlib.decompress(f.read(length)))
+
+    def __contains__(self, key):
+        with self._lock:
+            return self._find_slot(bytes.fromhex(key))[1] is not None
+
+    def __len__(self):
+        return self._count
+
+    def scan(self, raw=False):
+        """按写入顺序顺序扫描所有包文件，产出 (摘要, 数据)"""
+        with self._lock:
+            self._pack_file.flush()
+        for pack_id in self._pack_ids():
+            with open(self._pack_path(pack_id), 'rb', buffering=1024 * 1024) as f:
+                while True:
+                    header = f.read(_RECORD_HEADER.size)
+                    if len(header) < _RECORD_HEADER.size:
+                        break
+                    digest, kind, _, length = _RECORD_HEADER.unpack(header)
+                    data = zlib.decompress(f.read(length))
+                    yield digest.hex(), data if raw else _decode(kind, data)
+
+    def close(self):
+        with self._lock:
+            self._pack_file.close()
+            self._index.flush()
+            self._close_index()
+
+    def _pack_path(self, pack_id):
+        return os.path.join(self.root, f"pack-{pack_id:05d}.dat")
+
+    def _pack_ids(self):
+        return sorted(int(name[5:10]) for name in os.listdir(self.root)
+                      if name.startswith('pack-') and name.endswith('.dat'))
+
+    def _create_index(self, path, capacity):
+        with open(path, 'wb') as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, capacity, 0, 0, 0))
+            f.truncate(_INDEX_HEADER.size + capacity * _INDEX_SLOT.size)
+
+    def _open_index(self, path=None):
+        """映射索引文件，文件缺失、损坏或指向不存在的包文件位置时返回 False"""
+        path = path or self._index_path
+        if not os.path.exists(path) or os.path.getsize(path) < _INDEX_HEADER.size:
+            return False
+        self._index_file = open(path, 'r+b')
+        self._index = mmap.mmap(self._index_file.fileno(), 0)
+        magic, self._capacity, self._count, pack_id, end = _INDEX_HEADER.unpack_from(self._index, 0)
+        self._indexed = (pack_id, end)
+        valid = (magic == _INDEX_MAGIC and self._capacity > 0 and self._count < self._capacity
+                 and len(self._index) == _INDEX_HEADER.size + self._capacity * _INDEX_SLOT.size)
+        if valid and end:
+            # 索引声称覆盖的记录必须仍在包文件中
+            pack_path = self._pack_path(pack_id)
+            valid = os.path.exists(pack_path) and os.path.getsize(pack_path) >= end
+        if not valid:
+            self._close_index()
+        return valid
+
+    def _close_index(self):
+        self._index.close()
+        self._index_file.close()
+
+    def _rebuild_index(self, capacity):
+        """丢弃现有索引，按写入顺序重新索引所有包文件中的记录"""
+        if os.path.exists(self._index_path):
+            os.remove(self._index_path)
+        self._create_index(self._index_path, capacity)
+        self._open_index()
+        self._catch_up()
+
+    def _catch_up(self):
+        """索引索引头位置之后的记录；包文件末尾不完整或损坏的记录（写入中途崩溃）被截掉"""
+        indexed_pack, indexed_end = self._indexed
+        for pack_id in self._pack_ids():
+            if pack_id < indexed_pack:
+                continue
+            offset = indexed_end if pack_id == indexed_pack else 0
+            with open(self._pack_path(pack_id), 'r+b') as f:
+                f.seek(offset)
+                while True:
+                    header = f.read(_RECORD_HEADER.size)
+                    if not header:
+                        break
+                    record = self._read_record(f, header)
+                    if record is None:
+                        f.truncate(offset)
+                        break
+                    digest, end = record, f.tell()
+                    if self._find_slot(digest)[1] is None:
+                        self._insert(digest, pack_id, offset)
+                    self._mark_indexed(pack_id, end)
+                    offset = end
+
+    @staticmethod
+    def _read_record(f, header):
+        """读取并校验一条记录，返回其摘要；记录不完整或内容与摘要不符时返回 None"""
+        if len(header) < _RECORD_HEADER.size:
+            return None
+        digest, kind, raw_length, length = _RECORD_HEADER.unpack(header)
+        compressed = f.read(length)
+        if len(compressed) < length:
+            return None
+        try:
+            raw = zlib.decompress(compressed)
+        except zlib.error:
+            return None
+        # 旧版记录的摘要只覆盖内容
+        if len(raw) != raw_length or digest not in (_digest(kind, raw), hashlib.sha256(raw).digest()):
+            return None
+        return digest
+
+    def _find_slot(self, digest):
+        """线性探测，返回 (槽位号, (包文件, 偏移) 或 None)"""
+        slot = int.from_bytes(digest[:8], 'little') % self._capacity
+        while True:
+            position = _INDEX_SLOT.size * slot + _INDEX_HEADER.size
+            stored, pack_id, offset = _INDEX_SLOT.unpack_from(self._index, position)
+            if pack_id == 0:
+                return slot, None
+            if stored == digest:
+                return slot, (pack_id, offset)
+            slot = (slot + 1) % self._capacity
+
+    def _write_header(self):
+        _INDEX_HEADER.pack_into(self._index, 0, _INDEX_MAGIC, self._capacity, self._count, *self._indexed)
+
+    def _mark_indexed(self, pack_id, end):
+        self._indexed = (pack_id, end)
+        self._write_header()
+
+    def _insert(self, digest, pack_id, offset):
+        # 负载因子超过0.7时扩容
+        if (self._count + 1) * 10 > self._capacity * 7:
+            self._grow()
+        self._place(digest, pack_id, offset)
+        self._write_header()
+
+    def _place(self, digest, pack_id, offset):
+        slot, _ = self._find_slot(digest)
+        _INDEX_SLOT.pack_into(self._index, _INDEX_HEADER.size + slot * _INDEX_SLOT.size, digest, pack_id, offset)
+        self._count += 1
+
+    def _grow(self):
+        entries = []
+        for slot in range(self._capacity):
+            entry = _INDEX_SLOT.unpack_from(self._index, _INDEX_HEADER.size + slot * _INDEX_SLOT.size)
+            if entry[1]:
+                entries.append(entry)
+        indexed = self._indexed
+        self._close_index()
+        # 先在临时文件中建好完整的新索引再原子替换，崩溃时原索引保持不变
+        tmp_path = self._index_path + '.tmp'
+        self._create_index(tmp_path, self._capacity * 2)
+        self._open_index(tmp_path)
+        self._indexed = indexed
+        self._count = 0
+        for digest, pack_id, offset in entries:
+            self._place(digest, pack_id, offset)
+        self._write_header()
+        self._index.flush()
+        self._close_index()
+        os.replace(tmp_path, self._index_path)
+        self._open_index()
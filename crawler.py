@@ -0,0 +1,221 @@
+import heapq
+import io
+import itertools
+import logging
+import math
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from email.utils import parsedate_to_datetime
+from datetime import datetime
+from urllib.parse import urljoin, urldefrag, urlsplit
+from urllib.robotparser import RobotFileParser
+from feed_stream import iter_feed_items
+from html_extractor import HTMLExtractor, charset_from_content_type
+from http_cache import get_shared_cache
+
+# urllib.robotparser 只接受整数的 Crawl-delay，小数值向上取整后再交给它解析
+_FRACTIONAL_DELAY_RE = re.compile(r'^(\s*crawl-delay\s*:\s*)(\d*\.\d+)', re.I)
+
+def _robots_lines(text):
+    return [_FRACTIONAL_DELAY_RE.sub(lambda m: m.group(1) + str(math.ceil(float(m.group(2)))), line)
+            for line in text.splitlines()]
+
+def _lastmod_timestamp(value):
+    """解析 sitemap 的 lastmod，失败时返回 0"""
+    if not value:
+        return 0.0
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except ValueError:
+        try:
+            return parsedate_to_datetime(value).timestamp()
+        except (TypeError, ValueError):
+            return 0.0
+
+
+class Crawler:
+    """在页面预算内并发抓取站点
+
+    从种子URL和 sitemap 出发，提取页面链接并放入优先级队列；优先级依次为
+    深度、主机已抓取页数（主机间公平）、sitemap 中的 lastmod（越新越先）。
+    遵守 robots.txt 的 Disallow 和 Crawl-delay / Request-rate（同一主机的请求间隔
+    至少为声明的秒数，上限 max_crawl_delay），抓取到的页面按完成顺序产出。
+    """
+
+    _EXTRACT_SPEC = {'links': 'a@href', 'title': 'title'}
+
+    def __init__(self, http_cache=None, max_pages=100, max_depth=3, concurrency=8, same_host=True,
+                 user_agent='*', use_sitemaps=True, timeout=30, max_crawl_delay=60):
+        self.logger = logging.getLogger(__name__)
+        self.http_cache = http_cache or get_shared_cache()
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.concurrency = concurrency
+        self.same_host = same_host
+        self.user_agent = user_agent
+        self.use_sitemaps = use_sitemaps
+        self.timeout = timeout
+        self.max_crawl_delay = max_crawl_delay
+        self._frontier = []
+        self._sequence = itertools.count()
+        self._seen = set()
+        self._host_counts = {}
+        self._robots = {}
+        self._next_fetch = {}
+        self._allowed_hosts = set()
+        self._lock = threading.Lock()
+
+    def crawl(self, seeds):
+        """抓取种子URL所在站点，逐页产出 {'url', 'depth', 'title', 'text', 'links'}"""
+        for seed in seeds:
+            seed = self._normalize(seed)
+            if seed is None:
+                continue
+            self._allowed_hosts.add(urlsplit(seed).netloc)
+            self._push(seed, 0)
+            if self.use_sitemaps:
+                for url, lastmod in self._sitemap_urls(seed):
+                    self._push(url, 1, lastmod)
+
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            in_flight = {}
+            while True:
+                while self._frontier and len(in_flight) < self.concurrency and fetched + len(in_flight) < self.max_pages:
+                    _, _, _, _, url, depth = heapq.heappop(self._frontier)
+                    host = urlsplit(url).netloc
+                    self._host_counts[host] = self._host_counts.get(host, 0) + 1
+                    in_flight[executor.submit(self._fetch, url)] = (url, depth)
+                if not in_flight:
+                    break
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    url, depth = in_flight.pop(future)
+                    page = future.result()
+                    if page is None:
+                        continue
+                    fetched += 1
+                    page['depth'] = depth
+                    if depth < self.max_depth:
+                        for link in page['links']:
+                            self._push(link, depth + 1)
+                    yield page
+
+    def _push(self, url, depth, lastmod=None):
+        with self._lock:
+            if url in self._seen:
+                return
+            self._seen.add(url)
+        if self.same_host and urlsplit(url).netloc not in self._allowed_hosts:
+            return
+        if not self._allowed_by_robots(url):
+            return
+        host = urlsplit(url).netloc
+        priority = (depth, self._host_counts.get(host, 0), -_lastmod_timestamp(lastmod), next(self._sequence))
+        heapq.heappush(self._frontier, priority + (url, depth))
+
+    def _fetch(self, url):
+        try:
+            self._wait_for_crawl_delay(url)
+            response = self.http_cache.get(url, timeout=self.timeout)
+            if response.status_code != 200 or 'html' not in response.headers.get('Content-Type', 'text/html'):
+                return None
+            charset = charset_from_content_type(response.headers.get('Content-Type'))
+            fields = HTMLExtractor(self._EXTRACT_SPEC).extract(response.content, charset)
+            text = HTMLExtractor('text').extract(response.content, charset)['text']
+            links = []
+            for href in fields['links']:
+                link = self._normalize(urljoin(url, href))
+                if link is not None:
+                    links.append(link)
+            return {
+                'url': url,
+                'title': fields['title'][0] if fields['title'] else '',
+                'text': text,
+                'links': links
+            }
+        except Exception as e:
+            self.logger.error(f"Crawl fetch error for {url}: {str(e)}")
+            return None
+
+    def _normalize(self, url):
+        url, _ = urldefrag(url.strip())
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            return None
+        return parts._replace(path=parts.path or '/').geturl()
+
+    def _robots_for(self, url):
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        with self._lock:
+            if origin in self._robots:
+                return self._robots[origin]
+        parser = RobotFileParser(origin + '/robots.txt')
+        try:
+            response = self.http_cache.get(origin + '/robots.txt', timeout=self.timeout)
+            if response.status_code == 200:
+                parser.parse(_robots_lines(response.text))
+            elif response.status_code in (401, 403):
+                parser.disallow_all = True
+            else:
+                parser.allow_all = True
+        except Exception as e:
+            self.logger.warning(f"robots.txt unavailable for {origin}: {str(e)}")
+            parser.allow_all = True
+        with self._lock:
+            self._robots[origin] = parser
+        return parser
+
+    def _crawl_delay(self, url):
+        parser = self._robots_for(url)
+        delay = float(parser.crawl_delay(self.user_agent) or 0)
+        rate = parser.request_rate(self.user_agent)
+        if rate is not None and rate.requests:
+            delay = max(delay, rate.seconds / rate.requests)
+        return min(delay, self.max_crawl_delay)
+
+    def _wait_for_crawl_delay(self, url):
+        """为同一主机的请求预约间隔 crawl-delay 的时间片，必要时等待"""
+        delay = self._crawl_delay(url)
+        if delay <= 0:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_fetch.get(host, now))
+            self._next_fetch[host] = slot + delay
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _allowed_by_robots(self, url):
+        return self._robots_for(url).can_fetch(self.user_agent, url)
+
+    def _sitemap_urls(self, seed):
+        """读取 robots.txt 中声明的 sitemap（默认 /sitemap.xml），支持 sitemap 索引"""
+        parts = urlsplit(seed)
+        pending = self._robots_for(seed).site_maps() or [f"{parts.scheme}://{parts.netloc}/sitemap.xml"]
+        visited = set()
+        while pending:
+            sitemap_url = pending.pop()
+            if sitemap_url in visited:
+                continue
+            visited.add(sitemap_url)
+            try:
+                response = self.http_cache.get(sitemap_url, timeout=self.timeout)
+                if response.status_code != 200:
+                    continue
+                for tag, record in iter_feed_items(io.BytesIO(response.content), with_tag=True):
+                    loc = record.get('loc')
+                    if not loc:
+                        continue
+                    if tag == 'sitemap':
+                        pending.append(loc)
+                        continue
+                    url = self._normalize(loc)
+                    if url is not None:
+                        yield url, record.get('lastmod')
+            except Exception as e:
+                self.logger.warning(f"Sitemap error for {sitemap_url}: {str(e)}")
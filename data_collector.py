@@ -2,12 +2,23 @@ import requests
 from bs4 import BeautifulSoup
 import pandas as pd
 import logging
+import asyncio
+import functools
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+from urllib.parse import urlsplit
+from http_cache import get_shared_cache
+from crawler import Crawler
+from html_extractor import HTMLExtractor, charset_from_content_type
+from stock_store import StockStore
 
 class DataCollector:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.setup_logging()
+        self.http_cache = get_shared_cache()
+        self.stock_store = None
         
     def setup_logging(self):
         logging.basicConfig(
@@ -19,11 +30,19 @@ class DataCollector:
             ]
         )
     
-    def collect_web_data(self, url):
-        """从网页收集数据"""
+    def collect_web_data(self, url, extract=None, deadline=None):
+        """从网页收集数据
+
+        extract 为 None 时返回 BeautifulSoup 对象；为 'text' 或 {字段: 选择器} 时
+        使用 HTMLExtractor 只返回提取出的字段，不构建完整DOM。
+        deadline 为包括排队与重试在内的总秒数上限。
+        """
         try:
-            response = requests.get(url)
+            response = self.http_cache.get(url, deadline=deadline)
             if response.status_code == 200:
+                if extract is not None:
+                    charset = charset_from_content_type(response.headers.get('Content-Type'))
+                    return HTMLExtractor(extract).extract(response.content, charset)
                 return BeautifulSoup(response.text, 'html.parser')
             else:
                 self.logger.error(f"Failed to collect data from {url}, status code: {response.status_code}")
@@ -31,13 +50,77 @@ class DataCollector:
         except Exception as e:
             self.logger.error(f"Error collecting data from {url}: {str(e)}")
             return None
-            
+
+    def collect_web_data_many(self, urls, concurrency=20, per_host=4, timeout=30):
+        """并发批量收集网页数据，按完成顺序产出 (url, soup)"""
+        loop = asyncio.new_event_loop()
+        results = self.collect_web_data_many_async(urls, concurrency, per_host, timeout)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    break
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    async def collect_web_data_many_async(self, urls, concurrency=20, per_host=4, timeout=30):
+        """异步批量收集网页数据
+
+        请求经由共享的 HTTP 缓存和 RequestScheduler 发出（与 collect_web_data 相同），
+        受每主机限速、重试与调度器统计约束；per_host 限制每个主机同时在途的请求数，
+        timeout 为单个网页包括排队与重试在内的总秒数上限。
+        """
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        host_slots = defaultdict(lambda: asyncio.Semaphore(per_host))
+        pending = iter(urls)
+
+        async def fetch(url):
+            async with host_slots[urlsplit(url).netloc]:
+                soup = await loop.run_in_executor(executor, functools.partial(self.collect_web_data, url,
+                                                                              deadline=timeout))
+            return url, soup
+
+        # 只保持 concurrency 个任务在途，避免一次性为上千个URL创建任务
+        tasks = set()
+        for url in pending:
+            tasks.add(asyncio.ensure_future(fetch(url)))
+            if len(tasks) >= concurrency:
+                break
+        try:
+            while tasks:
+                done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    next_url = next(pending, None)
+                    if next_url is not None:
+                        tasks.add(asyncio.ensure_future(fetch(next_url)))
+                    yield task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def crawl(self, seeds, max_pages=100, max_depth=3, concurrency=8, **kwargs):
+        """在页面预算内抓取站点，逐页产出页面记录（见 Crawler）"""
+        crawler = Crawler(self.http_cache, max_pages=max_pages, max_depth=max_depth,
+                          concurrency=concurrency, **kwargs)
+        return crawler.crawl(seeds)
+
     def collect_stock_data(self, symbol):
-        """收集股票数据"""
+        """收集股票数据（最近一个月）"""
+        end = pd.Timestamp.now().normalize() + pd.Timedelta(days=1)
+        start = end - pd.DateOffset(months=1)
+        data = self.collect_stock_data_many([symbol], start, end)
+        return data.get(symbol) if data else None
+
+    def collect_stock_data_many(self, symbols, start, end):
+        """批量收集股票数据，优先读取本地存储，只请求缺失的日期区间"""
         try:
-            import yfinance as yf
-            stock = yf.Ticker(symbol)
-            return stock.history(period="1mo")
+            if self.stock_store is None:
+                self.stock_store = StockStore()
+            return self.stock_store.get_many(symbols, start, end)
         except Exception as e:
-            self.logger.error(f"Error collecting stock data for {symbol}: {str(e)}")
+            self.logger.error(f"Error collecting stock data for {symbols}: {str(e)}")
             return None
\ No newline at end of file
@@ -0,0 +1,50 @@
+import sqlite3
+import queue
+import threading
+from contextlib import contextmanager
+
+class SQLiteConnectionPool:
+    """SQLite连接池，复用连接而不是每次查询都重新打开数据库"""
+
+    def __init__(self, path, size=4):
+        self.path = path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """借出一个连接，用完自动归还
+
+        使用方抛出异常或提前放弃（例如生成器被关闭）时先回滚未提交的事务再归还；
+        回滚失败的连接被关闭而不放回池中。
+        """
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No connection available for {self.path}")
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+            try:
+                yield conn
+            except BaseException:
+                try:
+                    conn.rollback()
+                except sqlite3.Error:
+                    conn.close()
+                    conn = None
+                raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def close(self):
+        """关闭所有空闲连接"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
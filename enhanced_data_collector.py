@@ -4,14 +4,21 @@ import pandas as pd
 import json
 import xml.etree.ElementTree as ET
 import sqlite3
+import pyarrow as pa
 import pymongo
 import redis
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 import logging
-import aiohttp
 import asyncio
+import functools
+import threading
 from datetime import datetime
+from http_cache import get_shared_cache
+from crawler import Crawler
+from html_extractor import HTMLExtractor, charset_from_content_type
+from browser_pool import BrowserPool, needs_javascript
+from feed_stream import iter_feed_items, record_guid, SeenIndex
+from db_pool import SQLiteConnectionPool
+from tiered_cache import TieredCache
 
 class EnhancedDataCollector:
     def __init__(self):
@@ -19,6 +26,10 @@ class EnhancedDataCollector:
         self.setup_logging()
         self.mongo_client = None
         self.redis_client = None
+        self.http_cache = get_shared_cache()
+        self.browser_pool = None
+        self._browser_pool_lock = threading.Lock()
+        self.sqlite_pool = SQLiteConnectionPool('your_database.db')
         self.setup_database_connections()
         
     def setup_logging(self):
@@ -40,49 +51,107 @@ class EnhancedDataCollector:
             self.redis_client = redis.Redis(host='localhost', port=6379, db=0)
         except Exception as e:
             self.logger.error(f"Database connection error: {str(e)}")
+        self.cache = TieredCache(self.redis_client)
     
     async def collect_api_data(self, api_url, headers=None):
-        """异步收集API数据"""
+        """异步收集API数据
+
+        请求在线程池中经由共享的 HTTP 缓存和 RequestScheduler 发出，受每主机限速、
+        重试和 CONFIG 中 request_timeout 的约束，不阻塞事件循环。
+        """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(api_url, headers=headers) as response:
-                    return await response.json()
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, functools.partial(self.http_cache.get, api_url,
+                                                                          headers=headers))
+            return response.json()
         except Exception as e:
             self.logger.error(f"API data collection error: {str(e)}")
             return None
 
-    def collect_dynamic_web_data(self, url):
-        """使用Selenium收集动态网页数据"""
+    def collect_dynamic_web_data(self, url, extract=None, static_first=False):
+        """使用Selenium收集动态网页数据
+
+        extract 为 'text' 或 {字段: 选择器} 时只返回提取出的字段，不构建完整DOM。
+        static_first 为 True 时先尝试普通HTTP请求，只有页面需要JavaScript时才使用浏览器。
+        """
         try:
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')
-            driver = webdriver.Chrome(options=chrome_options)
-            driver.get(url)
-            content = driver.page_source
-            driver.quit()
-            return BeautifulSoup(content, 'html.parser')
+            content, charset = None, None
+            if static_first:
+                response = self.http_cache.get(url)
+                if response.status_code == 200 and not needs_javascript(response.text):
+                    content = response.content
+                    charset = charset_from_content_type(response.headers.get('Content-Type'))
+            if content is None:
+                content = self.get_browser_pool().fetch(url)
+            if extract is not None:
+                return HTMLExtractor(extract).extract(content, charset)
+            return BeautifulSoup(content, 'html.parser', from_encoding=charset)
         except Exception as e:
             self.logger.error(f"Dynamic web data collection error: {str(e)}")
             return None
 
-    def parse_xml_feed(self, xml_url):
-        """解析XML/RSS源"""
+    def get_browser_pool(self):
+        """获取（必要时创建）浏览器会话池"""
+        with self._browser_pool_lock:
+            if self.browser_pool is None:
+                self.browser_pool = BrowserPool()
+            return self.browser_pool
+
+    def crawl(self, seeds, max_pages=100, max_depth=3, concurrency=8, **kwargs):
+        """在页面预算内抓取站点，逐页产出页面记录（见 Crawler）"""
+        crawler = Crawler(self.http_cache, max_pages=max_pages, max_depth=max_depth,
+                          concurrency=concurrency, **kwargs)
+        return crawler.crawl(seeds)
+
+    def parse_xml_feed(self, xml_url, stream=False, seen_index=None):
+        """解析XML/RSS源
+
+        stream 为 True 时返回逐条产出条目记录的生成器，见 stream_xml_feed。
+        """
+        if stream:
+            return self.stream_xml_feed(xml_url, seen_index=seen_index)
         try:
-            response = requests.get(xml_url)
+            response = self.http_cache.get(xml_url)
             root = ET.fromstring(response.content)
             return root
         except Exception as e:
             self.logger.error(f"XML parsing error: {str(e)}")
             return None
 
+    def stream_xml_feed(self, xml_url, seen_index=None, timeout=60):
+        """流式解析XML/RSS源，逐条产出条目记录
+
+        使用 iterparse 直接读取响应流，不在内存中保留整个文档。
+        提供 seen_index (SeenIndex) 时只产出此前轮询中未出现过的条目；条目在调用方取下一条
+        （即处理完本条）后才记为已见，处理中崩溃或提前关闭生成器时，未处理完的条目下次轮询时重新产出。
+        下载或解析出错（例如源被截断）时记录日志后重新抛出，调用方可以区分不完整的结果和正常结束。
+        """
+        try:
+            with self.http_cache.scheduler.get(xml_url, stream=True, timeout=timeout) as response:
+                response.raise_for_status()
+                response.raw.decode_content = True
+                for record in iter_feed_items(response.raw):
+                    if seen_index is None:
+                        yield record
+                        continue
+                    guid = record_guid(record)
+                    if (xml_url, guid) in seen_index:
+                        continue
+                    yield record
+                    seen_index.add(xml_url, guid)
+        except Exception as e:
+            self.logger.error(f"XML streaming error: {str(e)}")
+            raise
+        finally:
+            if seen_index is not None:
+                seen_index.flush()
+
     def collect_database_data(self, query, db_type='sqlite'):
         """从数据库收集数据"""
         try:
             if db_type == 'sqlite':
-                conn = sqlite3.connect('your_database.db')
-                data = pd.read_sql_query(query, conn)
-                conn.close()
-                return data
+                with self.sqlite_pool.connection() as conn:
+                    return pd.read_sql_query(query, conn)
             elif db_type == 'mongodb':
                 if self.mongo_client:
                     db = self.mongo_client['your_database']
@@ -91,10 +160,105 @@ class EnhancedDataCollector:
             self.logger.error(f"Database data collection error: {str(e)}")
             return None
 
-    def cache_data(self, key, data):
-        """缓存数据到Redis"""
+    def stream_database_data(self, query, db_type='sqlite', chunksize=10000, as_arrow=False, params=None,
+                             schema=None):
+        """分块读取数据库数据，逐块产出 DataFrame（as_arrow=True 时为 Arrow RecordBatch）
+
+        SQLite 查询使用连接池中的连接并通过游标分批读取，MongoDB 使用批量游标，
+        整个结果集不会同时驻留在内存中。Arrow 模式下后续块沿用之前的 schema：未指定时
+        取第一块推断出的结果，之后某列全为 NULL 的块也不会得到不兼容的 null 类型；
+        之前的块中全为 NULL 的列（null 类型）在出现数据时按数据推断的类型提升，
+        合并这类块时使用 pa.concat_tables(..., promote_options='default')，需要所有块 schema 完全一致时传入 schema。
+        读取出错时记录日志后重新抛出，调用方可以区分结果被截断和正常结束。
+        """
+        try:
+            if db_type == 'sqlite':
+                with self.sqlite_pool.connection() as conn:
+                    cursor = conn.execute(query, params or ())
+                    try:
+                        columns = [column[0] for column in cursor.description]
+                        while True:
+                            rows = cursor.fetchmany(chunksize)
+                            if not rows:
+                                break
+                            chunk = self._rows_to_chunk(rows, columns, as_arrow, schema)
+                            if as_arrow:
+                                schema = chunk.schema
+                            yield chunk
+                    finally:
+                        cursor.close()
+            elif db_type == 'mongodb':
+                if self.mongo_client:
+                    db = self.mongo_client['your_database']
+                    cursor = db.your_collection.find(query, batch_size=chunksize)
+                    try:
+                        batch = []
+                        for document in cursor:
+                            document['_id'] = str(document['_id'])
+                            batch.append(document)
+                            if len(batch) >= chunksize:
+                                chunk = self._records_to_chunk(batch, as_arrow, schema)
+                                if as_arrow:
+                                    schema = chunk.schema
+                                yield chunk
+                                batch = []
+                        if batch:
+                            yield self._records_to_chunk(batch, as_arrow, schema)
+                    finally:
+                        cursor.close()
+        except Exception as e:
+            self.logger.error(f"Database streaming error: {str(e)}")
+            raise
+
+    def _rows_to_chunk(self, rows, columns, as_arrow, schema=None):
+        if as_arrow:
+            column_values = list(zip(*rows))
+            if schema is None:
+                return pa.RecordBatch.from_arrays([pa.array(values) for values in column_values], names=columns)
+            # 之前全为 NULL 的列（null 类型）按本块的数据推断类型
+            arrays = [pa.array(values) if pa.types.is_null(field.type) else pa.array(values, type=field.type)
+                      for values, field in zip(column_values, schema)]
+            schema = pa.schema([field.with_type(array.type) for field, array in zip(schema, arrays)],
+                               metadata=schema.metadata)
+            return pa.RecordBatch.from_arrays(arrays, schema=schema)
+        return pd.DataFrame.from_records(rows, columns=columns)
+
+    def _records_to_chunk(self, records, as_arrow, schema=None):
+        if as_arrow:
+            if schema is not None and any(pa.types.is_null(field.type) for field in schema):
+                inferred = pa.RecordBatch.from_pylist(records).schema
+                schema = pa.schema([inferred.field(field.name)
+                                    if pa.types.is_null(field.type) and field.name in inferred.names else field
+                                    for field in schema], metadata=schema.metadata)
+            return pa.RecordBatch.from_pylist(records, schema=schema)
+        return pd.DataFrame.from_records(records)
+
+    def cache_data(self, key, data, ttl=None):
+        """缓存数据（本地LRU + Redis）"""
+        try:
+            self.cache.set(key, data, ttl=ttl)
+        except Exception as e:
+            self.logger.error(f"Data caching error: {str(e)}")
+
+    def get_cached_data(self, key, default=None):
+        """读取缓存数据"""
+        try:
+            return self.cache.get(key, default)
+        except Exception as e:
+            self.logger.error(f"Cache read error: {str(e)}")
+            return default
+
+    def cache_data_many(self, mapping, ttl=None):
+        """批量缓存数据，Redis写入通过pipeline完成"""
+        try:
+            self.cache.set_many(mapping, ttl=ttl)
+        except Exception as e:
+            self.logger.error(f"Data caching error: {str(e)}")
+
+    def get_cached_data_many(self, keys):
+        """批量读取缓存数据"""
         try:
-            if self.redis_client:
-                self.redis_client.setex(key, 3600, json.dumps(data))  # 1小时过期
+            return self.cache.get_many(keys)
         except Exception as e:
-            self.logger.error(f"Data caching error: {str(e)}")
\ No newline at end of file
+            self.logger.error(f"Cache read error: {str(e)}")
+            return {}
\ No newline at end of file
@@ -0,0 +1,96 @@
+import xml.etree.ElementTree as ET
+import hashlib
+import json
+import sqlite3
+import threading
+
+# RSS <item>、Atom <entry> 与 sitemap <url>/<sitemap> 都视为一条记录
+ITEM_TAGS = {'item', 'entry', 'url', 'sitemap'}
+GUID_FIELDS = ('guid', 'id', 'link', 'loc')
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1] if isinstance(tag, str) else ''
+
+def _element_record(element):
+    """把条目元素转换为 {字段: 文本} 字典"""
+    record = {}
+    for child in element:
+        name = _local_name(child.tag)
+        value = (child.text or '').strip()
+        if not value and child.get('href'):
+            value = child.get('href')
+        if name in record:
+            if not isinstance(record[name], list):
+                record[name] = [record[name]]
+            record[name].append(value)
+        else:
+            record[name] = value
+    return record
+
+def record_guid(record):
+    """获取条目的唯一标识，缺失时使用内容哈希"""
+    for field in GUID_FIELDS:
+        value = record.get(field)
+        if value:
+            return value if isinstance(value, str) else value[0]
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+def iter_feed_items(source, with_tag=False):
+    """增量解析XML流，逐条产出记录并释放已处理的元素
+
+    source 为文件对象或路径。条目处理后立即从父元素中移除，
+    因此内存占用与单个条目大小相关，而与整个源的大小无关。
+    with_tag 为 True 时产出 (标签名, 记录)。
+    """
+    stack = []
+    for event, element in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            stack.append(element)
+            continue
+        stack.pop()
+        if _local_name(element.tag) in ITEM_TAGS and len(element):
+            record = _element_record(element)
+            yield (_local_name(element.tag), record) if with_tag else record
+            if stack:
+                stack[-1].remove(element)
+            else:
+                element.clear()
+
+
+class SeenIndex:
+    """持久化的已见GUID索引，用于多次轮询之间去重"""
+
+    def __init__(self, path='feed_seen.db', commit_every=1000):
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen (feed TEXT, guid TEXT, PRIMARY KEY (feed, guid))')
+        self.conn.commit()
+
+    def add(self, feed, guid):
+        """记录GUID，若此前未见过返回 True"""
+        with self._lock:
+            cursor = self.conn.execute('INSERT OR IGNORE INTO seen (feed, guid) VALUES (?, ?)', (feed, guid))
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self.conn.commit()
+                self._pending = 0
+            return cursor.rowcount == 1
+
+    def __contains__(self, key):
+        feed, guid = key
+        with self._lock:
+            row = self.conn.execute('SELECT 1 FROM seen WHERE feed = ? AND guid = ?', (feed, guid)).fetchone()
+        return row is not None
+
+    def flush(self):
+        with self._lock:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
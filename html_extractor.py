@@ -0,0 +1,239 @@
+from lxml import etree
+import codecs
+import itertools
+import re
+
+# 文本模式下忽略这些标签中的内容
+SKIP_TEXT_TAGS = {'script', 'style', 'noscript', 'template'}
+# 行内标签结束时不插入分隔空格
+INLINE_TAGS = {'a', 'abbr', 'b', 'code', 'em', 'i', 'small', 'span', 'strong', 'sub', 'sup', 'u'}
+# 块级标签开始和结束时插入换行，相邻段落、列表项的文本不会连在一起
+BLOCK_TAGS = {
+    'address', 'article', 'aside', 'blockquote', 'body', 'br', 'dd', 'details', 'div', 'dl', 'dt',
+    'fieldset', 'figcaption', 'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+    'hr', 'li', 'main', 'nav', 'ol', 'p', 'pre', 'section', 'summary', 'table', 'title', 'tr', 'ul'
+}
+
+# 只在文档开头查找编码声明（HTML 规范要求 <meta charset> 出现在前 1024 字节内，这里放宽一些）
+_SNIFF_BYTES = 4096
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+?charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_CONTENT_TYPE_CHARSET_RE = re.compile(r'charset\s*=\s*["\']?\s*([\w.:-]+)', re.I)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+_COMPOUND_RE = re.compile(r'([a-zA-Z][\w-]*|\*)?((?:[.#][\w-]+)*)')
+
+def _known_encoding(name):
+    try:
+        codecs.lookup(name)
+        return name
+    except LookupError:
+        return None
+
+def charset_from_content_type(content_type):
+    """从 Content-Type 响应头中取出 charset，没有声明或无法识别时返回 None"""
+    match = _CONTENT_TYPE_CHARSET_RE.search(content_type or '')
+    return _known_encoding(match.group(1)) if match else None
+
+def sniff_encoding(data):
+    """根据 BOM 或文档开头的 <meta charset> / http-equiv 声明判断字节串的编码"""
+    for bom, name in _BOMS:
+        if data.startswith(bom):
+            return name
+    match = _META_CHARSET_RE.search(data[:_SNIFF_BYTES])
+    return _known_encoding(match.group(1).decode('ascii')) if match else None
+
+def _decode_chunks(chunks, encoding):
+    """增量解码字节块（多字节字符可能跨块），无法解码的字节替换为 U+FFFD"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in chunks:
+        yield decoder.decode(chunk)
+    yield decoder.decode(b'', final=True)
+
+def _parse_compound(token):
+    """解析 tag.class#id 形式的简单选择器"""
+    match = _COMPOUND_RE.fullmatch(token)
+    if not match:
+        raise ValueError(f"Unsupported selector: {token}")
+    tag = match.group(1)
+    parts = re.findall(r'([.#])([\w-]+)', match.group(2))
+    return {
+        'tag': None if tag in (None, '*') else tag.lower(),
+        'id': next((name for kind, name in parts if kind == '#'), None),
+        'classes': {name for kind, name in parts if kind == '.'}
+    }
+
+def parse_selector(selector):
+    """把选择器解析为 (复合选择器列表, 组合符列表, 属性名)
+
+    支持标签、.class、#id、后代(空格)、子代(>)、相邻兄弟(+)与后续兄弟(~)组合符，
+    以及 "a@href" 形式的属性提取。组合符列表比复合选择器列表少一项，
+    combinators[i] 连接 compounds[i] 与 compounds[i + 1]。
+    """
+    attr = None
+    if '@' in selector:
+        selector, attr = selector.rsplit('@', 1)
+    tokens = re.sub(r'([>+~])', r' \1 ', selector).split()
+    compounds, combinators = [], []
+    combinator = None
+    for token in tokens:
+        if token in ('>', '+', '~'):
+            if not compounds or combinator is not None:
+                raise ValueError(f"Unsupported selector: {selector}")
+            combinator = token
+        else:
+            if compounds:
+                # 显式组合符取代默认的后代组合符
+                combinators.append(combinator or ' ')
+            compounds.append(_parse_compound(token))
+            combinator = None
+    if not compounds:
+        raise ValueError(f"Empty selector: {selector}")
+    if combinator is not None:
+        raise ValueError(f"Unsupported selector: {selector}")
+    return compounds, combinators, attr
+
+def _matches_compound(compound, element):
+    tag, element_id, classes = element
+    if compound['tag'] and compound['tag'] != tag:
+        return False
+    if compound['id'] and compound['id'] != element_id:
+        return False
+    return compound['classes'] <= classes
+
+def _matches(compounds, combinators, ancestors, siblings, index):
+    """当前元素为 siblings[index]（siblings 为同一父元素下已开始的子元素），
+    ancestors 为从根到父元素的 (siblings, index) 位置栈"""
+    if not _matches_compound(compounds[-1], siblings[index]):
+        return False
+    if len(compounds) == 1:
+        return True
+    combinator = combinators[-1]
+    compounds, combinators = compounds[:-1], combinators[:-1]
+    if combinator == '>':
+        return bool(ancestors) and _matches(compounds, combinators, ancestors[:-1], *ancestors[-1])
+    if combinator == '+':
+        return index > 0 and _matches(compounds, combinators, ancestors, siblings, index - 1)
+    if combinator == '~':
+        return any(_matches(compounds, combinators, ancestors, siblings, i) for i in range(index - 1, -1, -1))
+    for i in range(len(ancestors) - 1, -1, -1):
+        if _matches(compounds, combinators, ancestors[:i], *ancestors[i]):
+            return True
+    return False
+
+
+class _ExtractionTarget:
+    """lxml 解析器目标：只处理事件，不构建DOM"""
+
+    def __init__(self, fields, text_only):
+        self.fields = fields
+        self.text_only = text_only
+        # 打开的元素在父元素子列表中的位置 (siblings, index)；children 为各层已开始的子元素
+        self.stack = []
+        self.children = [[]]
+        self.open_captures = []
+        self.skip_depth = 0
+        self.text_parts = []
+        self.results = {name: [] for name in fields}
+
+    def start(self, tag, attrib):
+        tag = tag.lower() if isinstance(tag, str) else ''
+        element = (tag, attrib.get('id'), set(attrib.get('class', '').split()))
+        siblings = self.children[-1]
+        siblings.append(element)
+        position = (siblings, len(siblings) - 1)
+        captures = []
+        for name, selectors in self.fields.items():
+            for compounds, combinators, attr in selectors:
+                if _matches(compounds, combinators, self.stack, *position):
+                    if attr is not None:
+                        if attr in attrib:
+                            self.results[name].append(attrib[attr])
+                    else:
+                        captures.append((name, []))
+                    break
+        self.stack.append(position)
+        self.children.append([])
+        self.open_captures.append(captures)
+        if tag in SKIP_TEXT_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.data('\n')
+
+    def end(self, tag):
+        if not self.stack:
+            return
+        siblings, index = self.stack.pop()
+        self.children.pop()
+        element = siblings[index]
+        for name, parts in self.open_captures.pop():
+            self.results[name].append(' '.join(''.join(parts).split()))
+        if element[0] in SKIP_TEXT_TAGS:
+            self.skip_depth -= 1
+        elif element[0] in BLOCK_TAGS:
+            self.data('\n')
+        elif element[0] not in INLINE_TAGS:
+            self.data(' ')
+
+    def data(self, data):
+        if self.skip_depth:
+            return
+        if self.text_only:
+            self.text_parts.append(data)
+        for captures in self.open_captures:
+            for _, parts in captures:
+                parts.append(data)
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        if self.text_only:
+            lines = (' '.join(line.split()) for line in ''.join(self.text_parts).split('\n'))
+            return {'text': '\n'.join(line for line in lines if line)}
+        return self.results
+
+
+class HTMLExtractor:
+    """声明式HTML提取器
+
+    spec 为 'text'（仅提取可见文本）或 {字段名: CSS选择器} 字典，例如
+    {'title': 'title', 'links': 'a@href', 'headings': 'h1, h2'}。
+    基于 lxml 的事件解析器，边解析边提取，不构建完整的DOM树。
+    文本模式下每个块级元素单独成行，行内的连续空白合并为一个空格。
+    """
+
+    def __init__(self, spec='text', chunk_size=64 * 1024):
+        self.chunk_size = chunk_size
+        self.text_only = spec == 'text'
+        self.fields = {}
+        if not self.text_only:
+            for name, selector in spec.items():
+                self.fields[name] = [parse_selector(s.strip()) for s in selector.split(',')]
+
+    def extract(self, html, encoding=None):
+        """从字符串、字节串或分块可迭代对象中提取字段
+
+        字节输入按 encoding（通常取自 HTTP 响应头的 charset）解码；未指定时依次使用
+        BOM 和文档开头（分块输入时为第一块）的 <meta charset> 声明，都没有时交给 lxml 自行判断。
+        """
+        target = _ExtractionTarget(self.fields, self.text_only)
+        parser = etree.HTMLParser(target=target)
+        if isinstance(html, (str, bytes)):
+            chunks = (html[i:i + self.chunk_size] for i in range(0, len(html), self.chunk_size))
+        else:
+            chunks = iter(html)
+            first = next(chunks, None)
+            chunks = itertools.chain([] if first is None else [first], chunks)
+            html = first
+        if isinstance(html, bytes):
+            encoding = encoding or sniff_encoding(html)
+            if encoding is not None:
+                chunks = _decode_chunks(chunks, encoding)
+        fed = False
+        for chunk in chunks:
+            if chunk:
+                parser.feed(chunk)
+                fed = True
+        if not fed:
+            return target.close()
+        return parser.close()
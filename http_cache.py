@@ -0,0 +1,160 @@
+import requests
+from requests.structures import CaseInsensitiveDict
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlencode
+from config import CONFIG
+from request_scheduler import get_shared_scheduler
+
+# 影响响应表示的请求头，计入缓存键（例如同一URL的 JSON 与 HTML 表示、不同用户的授权结果）
+KEY_HEADERS = ('Accept', 'Accept-Language', 'Authorization')
+# 304 响应中携带时更新到缓存条目的响应头
+REVALIDATION_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+class HTTPCache:
+    """所有收集器共享的磁盘HTTP缓存
+
+    保存响应正文以及 ETag/Last-Modified 校验信息。未过期的条目直接返回，
+    不访问网络；过期条目通过 If-None-Match/If-Modified-Since 条件请求重新验证，
+    服务器返回304时只更新时间戳和新的校验信息而不重新下载正文。
+    缓存键包含 URL、查询参数和 KEY_HEADERS 中的请求头；响应的 Vary 头列出的其他请求头
+    以摘要形式记录在条目中，请求时取值不同视为未命中。
+    """
+
+    def __init__(self, cache_dir='.http_cache', cache_duration=None, scheduler=None):
+        self.logger = logging.getLogger(__name__)
+        self.cache_dir = cache_dir
+        self.cache_duration = CONFIG["data_collection"]["cache_duration"] if cache_duration is None else cache_duration
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # 网络请求统一交给调度器，由其负责限速与重试
+        self.scheduler = scheduler or get_shared_scheduler()
+        self.stats = {'hits': 0, 'misses': 0, 'revalidations': 0}
+        self._lock = threading.Lock()
+
+    def get(self, url, params=None, headers=None, no_store=False, **kwargs):
+        """带缓存的GET请求，返回 requests.Response
+
+        no_store 为 True 时不读取也不写入缓存，直接经由调度器请求，用于配额、backoff 等
+        每次都需要最新值的响应。其余关键字参数（如 timeout、priority）传给 RequestScheduler。
+        """
+        if no_store:
+            self._count('misses')
+            return self.scheduler.get(url, params=params, headers=headers, **kwargs)
+        key = self._cache_key(url, params, headers)
+        entry = self._load(key)
+        if entry is not None and entry.get('vary', {}) != self._vary(entry.get('vary', {}), headers):
+            entry = None
+        if entry is not None and time.time() - entry['stored_at'] < self.cache_duration:
+            self._count('hits')
+            return self._build_response(url, entry)
+
+        request_headers = dict(headers or {})
+        if entry is not None:
+            if entry['headers'].get('ETag'):
+                request_headers['If-None-Match'] = entry['headers']['ETag']
+            if entry['headers'].get('Last-Modified'):
+                request_headers['If-Modified-Since'] = entry['headers']['Last-Modified']
+
+        response = self.scheduler.get(url, params=params, headers=request_headers, **kwargs)
+        if response.status_code == 304 and entry is not None:
+            self._count('revalidations')
+            # 服务器可能在304中给出新的校验信息，之后的条件请求需要使用新值
+            for name in REVALIDATION_HEADERS:
+                if name in response.headers:
+                    entry['headers'][name] = response.headers[name]
+            entry['stored_at'] = time.time()
+            self._store_meta(key, entry)
+            return self._build_response(url, entry)
+
+        self._count('misses')
+        vary = [name.strip() for name in response.headers.get('Vary', '').split(',') if name.strip()]
+        if (response.status_code == 200 and 'no-store' not in response.headers.get('Cache-Control', '')
+                and '*' not in vary):
+            self._store(key, response, self._vary(vary, headers))
+        return response
+
+    def clear(self):
+        """清空缓存目录"""
+        for name in os.listdir(self.cache_dir):
+            os.remove(os.path.join(self.cache_dir, name))
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _cache_key(self, url, params, headers=None):
+        if params:
+            url = f"{url}?{urlencode(sorted(dict(params).items()))}"
+        headers = CaseInsensitiveDict(headers or {})
+        parts = [url] + [f"{name.lower()}: {headers[name]}" for name in KEY_HEADERS if name in headers]
+        return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _vary(names, headers):
+        """Vary 列出的请求头 -> 请求中该头取值的摘要（不保存原值，避免把 Cookie 等写入磁盘）"""
+        headers = CaseInsensitiveDict(headers or {})
+        return {name.lower(): hashlib.sha256(headers.get(name, '').encode('utf-8')).hexdigest()
+                for name in names}
+
+    def _paths(self, key):
+        base = os.path.join(self.cache_dir, key)
+        return base + '.json', base + '.body'
+
+    def _load(self, key):
+        meta_path, body_path = self._paths(key)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            with open(body_path, 'rb') as f:
+                entry['body'] = f.read()
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, key, response, vary):
+        meta_path, body_path = self._paths(key)
+        headers = {name: response.headers[name] for name in REVALIDATION_HEADERS if name in response.headers}
+        self._write_atomic(body_path, response.content)
+        self._store_meta(key, {
+            'status_code': response.status_code,
+            'headers': headers,
+            'encoding': response.encoding,
+            'vary': vary,
+            'stored_at': time.time()
+        })
+
+    def _store_meta(self, key, entry):
+        meta_path, _ = self._paths(key)
+        meta = {k: v for k, v in entry.items() if k != 'body'}
+        self._write_atomic(meta_path, json.dumps(meta).encode('utf-8'))
+
+    def _write_atomic(self, path, data):
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _build_response(self, url, entry):
+        response = requests.Response()
+        response.status_code = entry['status_code']
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.encoding = entry.get('encoding')
+        response.url = url
+        response._content = entry['body']
+        return response
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+def get_shared_cache():
+    """获取进程内共享的HTTP缓存实例"""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = HTTPCache()
+        return _shared_cache
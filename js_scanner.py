@@ -0,0 +1,114 @@
+import re
+
+_NAME = r'[A-Za-z_$\u00a0-\uffff][\w$\u00a0-\uffff]*'
+# 前面不是标识符字符或属性访问 (obj.if)
+_NOT_AFTER_NAME = r'(?<![\w$.\u00a0-\uffff])'
+
+# 单个主正则完成一次线性扫描：字符串、注释、模板字符串和正则字面量在这里被整体消费或交给调用方切换状态，
+# 其余只匹配需要统计的结构，结构之间的普通代码由正则引擎直接跳过
+_TOKEN_PATTERN = r'''
+    (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<string>'[^'\\\n]*(?:\\.[^'\\\n]*)*'|"[^"\\\n]*(?:\\.[^"\\\n]*)*")
+  | (?P<template>`)
+  | (?P<slash>/)
+  | {guard}(?P<function>function\b\s*(?:\*\s*)?(?P<function_name>{name})?)
+  | {guard}class\s+(?!extends\b)(?P<class_name>{name})(?:\s+extends\s+(?P<class_base>{name}))?
+  | {guard}import\s*(?:[\w$\s{{}},*]*?\bfrom\s*)?(?P<import_quote>['"])(?P<import_module>[^'"\\\n]*)(?P=import_quote)
+  | {guard}require\s*\(\s*(?P<require_quote>['"])(?P<require_module>[^'"\\\n]*)(?P=require_quote)\s*\)
+  | (?<![\w$\u00a0-\uffff])(?P<arrow_name>{name})\s*=\s*(?:async\s*)?(?:\([^()'"`/]*\)|{name})\s*=>
+  | (?P<arrow>=>)
+  | {guard}(?P<keyword>if|for|while|switch|catch)\b
+'''.format(guard=_NOT_AFTER_NAME, name=_NAME)
+_CODE_TOKEN_RE = re.compile(_TOKEN_PATTERN, re.S | re.X)
+# 模板字符串 ${...} 表达式内部还需要跟踪花括号，以找到表达式的结束位置
+_TEMPLATE_EXPRESSION_TOKEN_RE = re.compile(_TOKEN_PATTERN + r'| (?P<open>\{) | (?P<close>\})', re.S | re.X)
+# 模板字符串中的普通文本，止于 ` 或 ${
+_TEMPLATE_TEXT_RE = re.compile(r'[^`\\$]*(?:(?:\\.|\$(?!\{))[^`\\$]*)*', re.S)
+_REGEX_RE = re.compile(r'/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*')
+_PREVIOUS_WORD_RE = re.compile(r'[\w$]+$')
+
+# 这些关键字之后的 / 是正则表达式字面量
+_REGEX_PREFIX_KEYWORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void', 'throw',
+                          'case', 'do', 'else', 'yield', 'await'}
+
+
+def _regex_allowed(code_str, slash_position):
+    """根据 / 之前最近的非空白字符判断它是除号还是正则字面量的开始"""
+    index = slash_position - 1
+    while index >= 0 and code_str[index].isspace():
+        index -= 1
+    if index < 0:
+        return True
+    previous = code_str[index]
+    if previous.isalnum() or previous in '_$':
+        word = _PREVIOUS_WORD_RE.search(code_str, max(0, index - 15), index + 1)
+        return word is not None and word.group() in _REGEX_PREFIX_KEYWORDS
+    return previous not in ')]}\'"`'
+
+
+def scan_javascript(code_str):
+    """单次线性扫描JavaScript源码，返回 functions/classes/imports/complexity
+
+    注释、字符串、模板字符串文本和正则字面量中的内容不会被识别为代码；
+    模板字符串中的 ${...} 表达式按代码处理。返回格式与 CodeAnalyzer 的 JavaScript 分析结果相同。
+    """
+    functions, classes, imports = [], [], []
+    complexity = 1
+    # 模板字符串嵌套栈：'${' 为模板表达式，'{' 为表达式内部的代码块
+    brace_stack = []
+    position, length = 0, len(code_str)
+    in_template = False
+
+    while position < length:
+        if in_template:
+            position = _TEMPLATE_TEXT_RE.match(code_str, position).end()
+            in_template = False
+            if code_str.startswith('${', position):
+                brace_stack.append('${')
+                position += 2
+            else:
+                # 模板字符串结束（或源码截断）
+                position += 1
+
+        token_re = _TEMPLATE_EXPRESSION_TOKEN_RE if brace_stack else _CODE_TOKEN_RE
+        # 在同一个 finditer 中连续处理，只有需要切换词法状态时才跳出并从新位置继续
+        for match in token_re.finditer(code_str, position):
+            kind = match.lastgroup
+            if kind == 'comment' or kind == 'string':
+                continue
+            if kind == 'keyword' or kind == 'arrow':
+                complexity += 1
+            elif kind == 'function' or kind == 'function_name':
+                complexity += 1
+                if match.group('function_name'):
+                    functions.append({'name': match.group('function_name'), 'type': 'function'})
+            elif kind == 'arrow_name':
+                complexity += 1
+                functions.append({'name': match.group('arrow_name'), 'type': 'arrow_function'})
+            elif kind == 'class_name' or kind == 'class_base':
+                classes.append({'name': match.group('class_name'), 'extends': match.group('class_base')})
+            elif kind == 'import_module':
+                imports.append({'module': match.group('import_module'), 'type': 'es6'})
+            elif kind == 'require_quote' or kind == 'require_module':
+                imports.append({'module': match.group('require_module'), 'type': 'require'})
+            elif kind == 'slash':
+                if _regex_allowed(code_str, match.start()):
+                    regex = _REGEX_RE.match(code_str, match.start())
+                    if regex:
+                        position = regex.end()
+                        break
+            elif kind == 'template':
+                in_template = True
+                position = match.end()
+                break
+            elif kind == 'open':
+                brace_stack.append('{')
+            elif kind == 'close':
+                if brace_stack.pop() == '${':
+                    in_template = True
+                    position = match.end()
+                    break
+        else:
+            break
+
+    return {'functions': functions, 'classes': classes, 'imports': imports, 'complexity': complexity}
@@ -24,10 +24,10 @@ def main():
             
     # 示例：网页数据分析
     url = "https://example.com"
-    web_data = collector.collect_web_data(url)
+    web_data = collector.collect_web_data(url, extract='text')
     if web_data:
         # 提取所有文本
-        text = web_data.get_text()
+        text = web_data['text']
         # 分析文本
         text_analysis = analyzer.process_text_data(text)
         if text_analysis:
@@ -0,0 +1,322 @@
+import hashlib
+import keyword
+import re
+import sqlite3
+import threading
+import zlib
+import numpy as np
+
+# 注释按语言区分：Python 中的 // 是整除运算符
+_COMMENT_PATTERNS = {
+    'python': r'\#[^\n]*',
+    'ruby': r'\#[^\n]*'
+}
+_DEFAULT_COMMENT_PATTERN = r'//[^\n]*|/\*.*?(?:\*/|\Z)'
+_TOKEN_PATTERN = r'''
+    (?P<comment>{comment})
+  | (?P<string>"""(?:\\.|[^\\])*?"""|\'\'\'(?:\\.|[^\\])*?\'\'\'|'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*"|`(?:\\.|[^`\\])*`)
+  | (?P<number>\d[\w.]*)
+  | (?P<name>[A-Za-z_$][\w$]*)
+  | (?P<op>\S)
+'''
+_TOKEN_RES = {}
+
+# 标识符归一化时保留的关键字（Python 与 JavaScript 的并集）
+_KEYWORDS = set(keyword.kwlist) | {
+    'function', 'var', 'let', 'const', 'new', 'this', 'typeof', 'instanceof', 'switch', 'case', 'default',
+    'do', 'catch', 'throw', 'extends', 'super', 'null', 'undefined', 'true', 'false', 'void', 'delete',
+    'public', 'private', 'protected', 'static', 'int', 'char', 'long', 'double', 'float', 'struct', 'func'
+}
+
+# 乘法-移位哈希取高 32 位
+_HASH_SHIFT = np.uint64(32)
+# 多项式滚动哈希的基数，用于把 k 个词法单元的哈希组合成一个 shingle 哈希
+_SHINGLE_BASE = np.uint64(0x100000001B3)
+# 一次参与 MinHash 运算的 shingle 数，限制 (num_perm x chunk) 中间矩阵的大小
+_CHUNK = 4096
+
+
+def _token_re(language):
+    pattern = _COMMENT_PATTERNS.get(language, _DEFAULT_COMMENT_PATTERN)
+    token_re = _TOKEN_RES.get(pattern)
+    if token_re is None:
+        token_re = _TOKEN_RES[pattern] = re.compile(_TOKEN_PATTERN.format(comment=pattern), re.S | re.X)
+    return token_re
+
+
+def normalize_tokens(code, language=None, normalize_identifiers=False):
+    """把代码切分为去掉注释和空白的词法单元
+
+    normalize_identifiers 为 True 时，非关键字的标识符统一为 ID，字符串和数字字面量统一为 STR/NUM，
+    使只改了名称或常量的代码（第二类克隆）也能匹配。
+    """
+    tokens = []
+    for match in _token_re(language).finditer(code):
+        kind = match.lastgroup
+        if kind == 'comment':
+            continue
+        token = match.group(kind)
+        if normalize_identifiers:
+            if kind == 'name' and token not in _KEYWORDS:
+                token = 'ID'
+            elif kind == 'string':
+                token = 'STR'
+            elif kind == 'number':
+                token = 'NUM'
+        tokens.append(token)
+    return tokens
+
+
+class NearDuplicateIndex:
+    """基于 MinHash 签名和 LSH 分桶的近重复代码索引
+
+    每个文档只保存固定长度的签名 (num_perm 个 uint32) 和 bands 个桶键，与文档长度无关；
+    查询只读取与新文档至少有一个桶相同的候选文档，再用签名估计的 Jaccard 相似度过滤，
+    耗时取决于候选数而不是语料库大小。签名和桶保存在 SQLite 中，重启后无需重建。
+    """
+
+    def __init__(self, path='near_duplicates.db', num_perm=128, bands=16, shingle_size=5, threshold=0.8,
+                 normalize_identifiers=False, seed=1, commit_every=500):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        self.threshold = threshold
+        self.normalize_identifiers = normalize_identifiers
+        self.commit_every = commit_every
+        self._pending = 0
+        rng = np.random.default_rng(seed)
+        # 乘法-移位哈希族：h(x) = ((a * x + b) mod 2^64) >> 32，a 为奇数
+        self._a = rng.integers(1, 2 ** 63, size=(num_perm, 1), dtype=np.uint64) | np.uint64(1)
+        self._b = rng.integers(0, 2 ** 63, size=(num_perm, 1), dtype=np.uint64)
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS documents (key TEXT PRIMARY KEY, signature BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS buckets (bucket INTEGER NOT NULL, key TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_by_bucket ON buckets (bucket);
+            CREATE INDEX IF NOT EXISTS buckets_by_key ON buckets (key);
+            CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT);
+        ''')
+        params = f"{num_perm}:{bands}:{shingle_size}:{int(normalize_identifiers)}:{seed}"
+        row = self.conn.execute("SELECT value FROM meta WHERE name = 'params'").fetchone()
+        if row is None:
+            self.conn.execute("INSERT INTO meta (name, value) VALUES ('params', ?)", (params,))
+            self.conn.commit()
+        elif row[0] != params:
+            raise ValueError(f"Index at {path} was built with different parameters ({row[0]})")
+
+    def _shingles(self, code, language):
+        tokens = normalize_tokens(code, language, self.normalize_identifiers)
+        if not tokens:
+            return None
+        hashes = {}
+        token_hashes = np.fromiter((hashes.setdefault(token, zlib.crc32(token.encode('utf-8')))
+                                    for token in tokens), dtype=np.uint64, count=len(tokens))
+        size = min(self.shingle_size, len(tokens))
+        count = len(tokens) - size + 1
+        shingles = token_hashes[:count].copy()
+        for offset in range(1, size):
+            shingles = shingles * _SHINGLE_BASE + token_hashes[offset:offset + count]
+        return np.unique(shingles)
+
+    def signature(self, code, language=None):
+        """MinHash 签名 (num_perm 个 uint32)；代码没有任何词法单元时返回 None"""
+        shingles = self._shingles(code, language)
+        if shingles is None:
+            return None
+        signature = np.full(self.num_perm, np.iinfo(np.uint64).max, dtype=np.uint64)
+        for start in range(0, len(shingles), _CHUNK):
+            chunk = shingles[start:start + _CHUNK]
+            hashed = (self._a * chunk + self._b) >> _HASH_SHIFT
+            np.minimum(signature, hashed.min(axis=1), out=signature)
+        return signature.astype(np.uint32)
+
+    def _bucket_keys(self, signature):
+        """每个 band 的行拼接后哈希为一个 64 位整数（带 band 编号，不同 band 不会冲突）"""
+        rows = signature.reshape(self.bands, self.rows)
+        keys = []
+        for band in range(self.bands):
+            digest = hashlib.blake2b(rows[band].tobytes(), digest_size=8, person=band.to_bytes(2, 'little')).digest()
+            keys.append(int.from_bytes(digest, 'little', signed=True))
+        return keys
+
+    def similarity(self, first, second):
+        """两个签名估计的 Jaccard 相似度"""
+        return float(np.count_nonzero(first == second)) / self.num_perm
+
+    def _candidates(self, signature, exclude=None):
+        bucket_keys = self._bucket_keys(signature)
+        placeholders = ','.join('?' * len(bucket_keys))
+        rows = self.conn.execute(
+            f'SELECT d.key, d.signature FROM documents d WHERE d.key IN '
+            f'(SELECT DISTINCT key FROM buckets WHERE bucket IN ({placeholders}))', bucket_keys).fetchall()
+        return [(key, np.frombuffer(blob, dtype=np.uint32)) for key, blob in rows if key != exclude]
+
+    def query_signature(self, signature, threshold=None, exclude=None):
+        threshold = self.threshold if threshold is None else threshold
+        with self._lock:
+            candidates = self._candidates(signature, exclude)
+        if not candidates:
+            return []
+        matrix = np.vstack([candidate for _, candidate in candidates])
+        scores = np.count_nonzero(matrix == signature, axis=1) / self.num_perm
+        matches = [(key, float(score)) for (key, _), score in zip(candidates, scores) if score >= threshold]
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def query(self, code, language=None, threshold=None):
+        """返回与 code 近重复的已索引文档 [(key, 相似度)]，按相似度降序"""
+        signature = self.signature(code, language)
+        if signature is None:
+            return []
+        return self.query_signature(signature, threshold)
+
+    def add(self, key, code, language=None):
+        """索引一个文档，返回其签名；已存在同名 key 时替换"""
+        signature = self.signature(code, language)
+        if signature is not None:
+            self._store(key, signature)
+        return signature
+
+    def add_if_unique(self, key, code, language=None, threshold=None):
+        """流水线过滤：没有近重复时索引文档并返回 None，否则返回最相似的 (key, 相似度) 且不索引"""
+        signature = self.signature(code, language)
+        if signature is None:
+            return None
+        matches = self.query_signature(signature, threshold, exclude=key)
+        if matches:
+            return matches[0]
+        self._store(key, signature)
+        return None
+
+    def _store(self, key, signature):
+        with self._lock:
+            self.conn.execute('DELETE FROM buckets WHERE key = ?', (key,))
+            self.conn.execute('INSERT OR REPLACE INTO documents (key, signature) VALUES (?, ?)',
+                              (key, signature.tobytes()))
+            self.conn.executemany('INSERT INTO buckets (bucket, key) VALUES (?, ?)',
+                                  [(bucket, key) for bucket in self._bucket_keys(signature)])
+            self._maybe_commit()
+
+    def _maybe_commit(self):
+        self._pending += 1
+        if self._pending >= self.commit_every:
+            self.conn.commit()
+            self._pending = 0
+
+    def remove(self, key):
+        with self._lock:
+            self.conn.execute('DELETE FROM buckets WHERE key = ?', (key,))
+            self.conn.execute('DELETE FROM documents WHERE key = ?', (key,))
+            self._maybe_commit()
+
+    def __contains__(self, key):
+        with self._lock:
+            return self.conn.execute('SELECT 1 FROM documents WHERE key = ?', (key,)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def clone_report(self, threshold=None, max_leaders=256):
+        """批量找出索引中的所有近重复簇
+
+        签名完全相同的文档先直接合并，每组只保留一个代表参与桶内比较；
+        桶内按顺序把每个文档与本桶已有的簇代表 (leader) 比较，命中即并入该簇，
+        未命中的文档成为新的代表（每桶最多 max_leaders 个），
+        因此每个桶的比较次数为 O(n × leader 数) 而不是 O(n²)。
+        返回 [{'keys': [...], 'size': n, 'min_similarity': s}]，按簇大小降序；
+        min_similarity 为合并时经过的相似度中的最小值。
+        """
+        threshold = self.threshold if threshold is None else threshold
+        parent = {}
+        min_similarity = {}
+
+        def find(key):
+            root = key
+            while parent[root] != root:
+                root = parent[root]
+            while parent[key] != root:
+                parent[key], key = root, parent[key]
+            return root
+
+        def union(first, second, score):
+            parent.setdefault(first, first)
+            parent.setdefault(second, second)
+            root_first, root_second = find(first), find(second)
+            if root_first != root_second:
+                parent[root_second] = root_first
+                score = min(score, min_similarity.pop(root_second, score))
+            min_similarity[root_first] = min(score, min_similarity.get(root_first, score))
+
+        with self._lock:
+            self.conn.commit()
+            self._pending = 0
+            exact = [keys.split('\n') for (keys,) in self.conn.execute(
+                "SELECT GROUP_CONCAT(key, char(10)) FROM documents GROUP BY signature HAVING COUNT(*) > 1")]
+            groups = [keys.split('\n') for (keys,) in self.conn.execute(
+                "SELECT GROUP_CONCAT(key, char(10)) FROM buckets GROUP BY bucket HAVING COUNT(*) > 1")]
+        representative = {}
+        for keys in exact:
+            for key in keys[1:]:
+                union(keys[0], key, 1.0)
+                representative[key] = keys[0]
+        signatures = {}
+        for keys in groups:
+            keys = list(dict.fromkeys(representative.get(key, key) for key in keys))
+            if len(keys) < 2:
+                continue
+            self._load_signatures([key for key in keys if key not in signatures], signatures)
+            leaders = []
+            matrix = np.empty((min(len(keys), max_leaders), self.num_perm), dtype=np.uint32)
+            for key in keys:
+                signature = signatures[key]
+                if leaders:
+                    scores = np.count_nonzero(matrix[:len(leaders)] == signature, axis=1) / self.num_perm
+                    hits = np.flatnonzero(scores >= threshold)
+                    for hit in hits:
+                        union(leaders[hit], key, float(scores[hit]))
+                    if len(hits):
+                        continue
+                if len(leaders) < len(matrix):
+                    matrix[len(leaders)] = signature
+                    leaders.append(key)
+        clusters = {}
+        for key in parent:
+            clusters.setdefault(find(key), []).append(key)
+        report = [{'keys': sorted(members), 'size': len(members), 'min_similarity': min_similarity[root]}
+                  for root, members in clusters.items()]
+        report.sort(key=lambda cluster: cluster['size'], reverse=True)
+        return report
+
+    def _load_signatures(self, keys, signatures):
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            with self._lock:
+                rows = self.conn.execute(
+                    f"SELECT key, signature FROM documents WHERE key IN ({','.join('?' * len(batch))})",
+                    batch).fetchall()
+            for key, blob in rows:
+                signatures[key] = np.frombuffer(blob, dtype=np.uint32)
+
+    def flush(self):
+        with self._lock:
+            self.conn.commit()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+
+def find_clones(documents, threshold=0.8, **kwargs):
+    """对 (key, code, language) 序列生成近重复簇报告，不保留索引文件"""
+    index = NearDuplicateIndex(':memory:', threshold=threshold, **kwargs)
+    for key, code, language in documents:
+        index.add(key, code, language)
+    return index.clone_report()
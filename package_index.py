@@ -0,0 +1,204 @@
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+from config import CONFIG
+from request_scheduler import get_shared_scheduler
+
+
+def normalize_name(registry, name):
+    """索引中使用的包名：PyPI 包名按 PEP 503 归一化（Django、django_rest 与 django-rest 为同一包）"""
+    if registry == 'pypi':
+        return re.sub(r'[-_.]+', '-', name).lower()
+    return name
+
+
+class PyPIFeed:
+    """PyPI 变更源：通过 XML-RPC 的序列号获取变更的包名"""
+
+    def __init__(self, base_url='https://pypi.org', scheduler=None):
+        self.base_url = base_url
+        self.scheduler = scheduler or get_shared_scheduler()
+
+    def changes(self, cursor):
+        """返回 (新游标, 变更的包名集合)；cursor 为 None 时只返回当前序列号"""
+        if cursor is None:
+            return self._call('changelog_last_serial'), set()
+        events = self._call('changelog_since_serial', int(cursor))
+        if not events:
+            return cursor, set()
+        return max(event[4] for event in events), {normalize_name('pypi', event[0]) for event in events}
+
+    def _call(self, method, *params):
+        """经由 RequestScheduler 发送 XML-RPC 调用，与其他请求共用超时、每主机限速和重试"""
+        response = self.scheduler.request('POST', f"{self.base_url}/pypi",
+                                          data=xmlrpc.client.dumps(params, method).encode('utf-8'),
+                                          headers={'Content-Type': 'text/xml'})
+        response.raise_for_status()
+        (result,), _ = xmlrpc.client.loads(response.content)
+        return result
+
+    def fetch(self, name):
+        response = self.scheduler.get(f"{self.base_url}/pypi/{name}/json")
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        return {'version': data['info'].get('version'), 'summary': data['info'].get('summary'), 'data': data}
+
+
+class NPMFeed:
+    """NPM 变更源：基于 CouchDB 的 _changes 接口"""
+
+    def __init__(self, registry_url='https://registry.npmjs.org', changes_url='https://replicate.npmjs.com',
+                 batch_size=10000, scheduler=None):
+        self.registry_url = registry_url
+        self.changes_url = changes_url
+        self.batch_size = batch_size
+        self.scheduler = scheduler or get_shared_scheduler()
+
+    def changes(self, cursor):
+        if cursor is None:
+            response = self.scheduler.get(f"{self.changes_url}/")
+            return response.json()['update_seq'], set()
+        names = set()
+        while True:
+            response = self.scheduler.get(f"{self.changes_url}/_changes",
+                                          params={'since': cursor, 'limit': self.batch_size})
+            data = response.json()
+            names.update(change['id'] for change in data.get('results', []))
+            if len(data.get('results', [])) < self.batch_size or data.get('last_seq') == cursor:
+                return data.get('last_seq', cursor), names
+            cursor = data['last_seq']
+
+    def fetch(self, name):
+        response = self.scheduler.get(f"{self.registry_url}/{name}")
+        if response.status_code != 200:
+            return None
+        data = response.json()
+        latest = data.get('dist-tags', {}).get('latest')
+        return {'version': latest, 'summary': data.get('description'), 'data': data}
+
+
+class PackageIndex:
+    """本地包元数据索引
+
+    查询优先从本地 SQLite 返回；sync() 从各注册表的变更源增量获取变更的包名，
+    只重新获取索引中已有且发生变化的包。变更源可替换，便于测试时使用本地替身。
+
+    sync() 由使用方定期调用（CodeCollector.sync_package_index，例如放在定时收集任务中），
+    索引本身不会自动同步；此外 get() 对获取时间超过 max_age 秒（默认取 CONFIG 中的
+    package_max_age，None 表示不限）的条目重新获取，未同步时返回的数据也不会无限期过时。
+    """
+
+    def __init__(self, path='package_index.db', feeds=None, concurrency=8, max_age=None):
+        self.logger = logging.getLogger(__name__)
+        self.feeds = feeds if feeds is not None else {'pypi': PyPIFeed(), 'npm': NPMFeed()}
+        self.concurrency = concurrency
+        self.max_age = CONFIG["data_collection"].get("package_max_age") if max_age is None else max_age
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS packages (
+                registry TEXT NOT NULL,
+                name TEXT NOT NULL,
+                version TEXT,
+                summary TEXT,
+                data TEXT,
+                stale INTEGER NOT NULL DEFAULT 0,
+                fetched_at REAL,
+                PRIMARY KEY (registry, name)
+            );
+            CREATE TABLE IF NOT EXISTS sync_state (
+                registry TEXT PRIMARY KEY,
+                cursor TEXT
+            );
+        ''')
+        # 早期版本按原样保存 PyPI 包名，改为归一化后的名称，同一包的多行只保留一行
+        renamed = [(normalize_name('pypi', name), name) for (name,) in self.conn.execute(
+            "SELECT name FROM packages WHERE registry = 'pypi'") if normalize_name('pypi', name) != name]
+        self.conn.executemany("UPDATE OR REPLACE packages SET name = ? WHERE registry = 'pypi' AND name = ?", renamed)
+        self.conn.commit()
+
+    def get(self, registry, name, with_data=True):
+        """查询包元数据；本地没有、被 sync() 标记为已变更或超过 max_age 时从注册表获取一次并保存
+
+        重新获取失败时返回本地已有的数据。
+        """
+        name = normalize_name(registry, name)
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT version, summary, data, stale, fetched_at FROM packages WHERE registry = ? AND name = ?',
+                (registry, name)).fetchone()
+        if row is None or row[3] or self._expired(row[4]):
+            result = self._refresh(registry, name, with_data)
+            if result is not None or row is None:
+                return result
+        version, summary, data = row[:3]
+        result = {'name': name, 'version': version, 'summary': summary}
+        if with_data:
+            result['data'] = json.loads(data) if data else None
+        return result
+
+    def _expired(self, fetched_at):
+        return self.max_age is not None and time.time() - (fetched_at or 0) > self.max_age
+
+    def search(self, registry, pattern, limit=50):
+        """按包名模式 (SQL LIKE) 在本地查询"""
+        with self._lock:
+            rows = self.conn.execute(
+                'SELECT name, version, summary FROM packages WHERE registry = ? AND name LIKE ? LIMIT ?',
+                (registry, pattern, limit)).fetchall()
+        return [{'name': name, 'version': version, 'summary': summary} for name, version, summary in rows]
+
+    def sync(self, registry=None, refetch=True):
+        """从变更源增量同步，返回 {registry: 重新获取的包数量}"""
+        registries = [registry] if registry else list(self.feeds)
+        result = {}
+        for name in registries:
+            feed = self.feeds[name]
+            with self._lock:
+                row = self.conn.execute('SELECT cursor FROM sync_state WHERE registry = ?', (name,)).fetchone()
+            cursor = json.loads(row[0]) if row else None
+            new_cursor, changed = feed.changes(cursor)
+            changed = {normalize_name(name, package) for package in changed}
+            with self._lock:
+                tracked = [package for package in changed if self.conn.execute(
+                    'SELECT 1 FROM packages WHERE registry = ? AND name = ?', (name, package)).fetchone()]
+                self.conn.executemany('UPDATE packages SET stale = 1 WHERE registry = ? AND name = ?',
+                                      [(name, package) for package in tracked])
+                self.conn.execute('INSERT OR REPLACE INTO sync_state (registry, cursor) VALUES (?, ?)',
+                                  (name, json.dumps(new_cursor)))
+                self.conn.commit()
+            if refetch and tracked:
+                with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                    list(executor.map(lambda package: self._refresh(name, package, False), tracked))
+            result[name] = len(tracked)
+        return result
+
+    def _refresh(self, registry, name, with_data=True):
+        try:
+            metadata = self.feeds[registry].fetch(name)
+        except Exception as e:
+            self.logger.error(f"Package fetch error for {registry}:{name}: {str(e)}")
+            return None
+        if metadata is None:
+            return None
+        with self._lock:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO packages (registry, name, version, summary, data, stale, fetched_at) '
+                'VALUES (?, ?, ?, ?, ?, 0, ?)',
+                (registry, name, metadata.get('version'), metadata.get('summary'),
+                 json.dumps(metadata.get('data')), time.time()))
+            self.conn.commit()
+        result = {'name': name, 'version': metadata.get('version'), 'summary': metadata.get('summary')}
+        if with_data:
+            result['data'] = metadata.get('data')
+        return result
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
@@ -0,0 +1,64 @@
+import threading
+import time
+
+class TokenBucket:
+    """线程安全的令牌桶限速器
+
+    可以根据 X-RateLimit-Remaining / X-RateLimit-Reset 响应头动态调整速率，
+    使剩余配额在重置时间之前均匀消耗。
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(rate, 1))
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens=1, timeout=None):
+        """获取令牌，必要时阻塞；超时返回 False"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return True
+                wait = (tokens - self.tokens) / self.rate if self.rate > 0 else 1.0
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+    def reserve(self, tokens=1):
+        """不阻塞地获取令牌：成功返回0，否则返回还需等待的秒数"""
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return 0.0
+            return (tokens - self.tokens) / self.rate if self.rate > 0 else 1.0
+
+    def update_from_headers(self, headers):
+        """根据 X-RateLimit-* 响应头调整速率和可用令牌"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining, reset = int(remaining), float(reset)
+        except ValueError:
+            return
+        seconds_left = max(reset - time.time(), 1.0)
+        with self._lock:
+            self._refill()
+            # 配额耗尽时按重置时间推迟下一个令牌
+            self.rate = max(remaining, 1) / seconds_left
+            self.tokens = min(self.tokens, float(remaining))
@@ -0,0 +1,339 @@
+import requests
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError, as_completed, wait
+from urllib.parse import urlsplit
+from config import CONFIG
+from rate_limit import TokenBucket
+
+# 优先级，数值越小越先执行
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# 只有幂等请求才允许对冲
+HEDGE_METHODS = ('GET', 'HEAD')
+
+class _HostState:
+    """单个主机的队列、令牌桶和统计信息"""
+
+    def __init__(self, rate, capacity):
+        # rate 为 None 时不限速
+        self.bucket = None if rate is None else TokenBucket(rate, capacity)
+        # ready 按 (优先级, 序号) 排序；delayed 存放等待重试的请求，按可执行时间排序
+        self.ready = []
+        self.delayed = []
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.hedged = 0
+        self.timeouts = 0
+        self.latencies = deque(maxlen=1000)
+
+
+class RequestScheduler:
+    """所有收集器共享的HTTP请求调度器
+
+    全局并发数由工作线程数限制；主机默认不限速（host_rate 默认取 CONFIG 中的 host_rate_limit），
+    CONFIG 中 host_rate_limits 列出的已知API和通过 set_host_limit 设置的主机使用令牌桶限速，
+    并根据 X-RateLimit-* 响应头调整速率。请求按优先级出队，
+    失败或返回 429/5xx 时按带抖动的指数退避重新排队，重试次数取自 CONFIG。
+
+    每次请求默认带 CONFIG 中的 request_timeout；deadline 参数限制包括排队与重试在内的总耗时。
+    开启对冲 (hedge) 时，若请求耗时超过该主机延迟的 hedge_percentile 分位数（不低于
+    hedge_min_delay，可用 set_hedge_min_delay 按主机设置），会再发送一个相同的请求并采用先返回的结果，
+    落败请求的响应在完成后关闭。
+    """
+
+    def __init__(self, concurrency=16, host_rate=None, host_burst=None, retry_attempts=None, backoff_base=0.5,
+                 session=None, timeout=None, hedge=False, hedge_percentile=0.95, hedge_min_samples=20,
+                 hedge_min_delay=0.0):
+        self.logger = logging.getLogger(__name__)
+        self.concurrency = concurrency
+        self.host_rate = CONFIG["data_collection"].get("host_rate_limit") if host_rate is None else host_rate
+        self.host_burst = host_burst
+        self.retry_attempts = CONFIG["data_collection"]["retry_attempts"] if retry_attempts is None else retry_attempts
+        self.backoff_base = backoff_base
+        self.timeout = CONFIG["data_collection"]["request_timeout"] if timeout is None else timeout
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self._hedge_min_delays = {}
+        self._hedge_executor = ThreadPoolExecutor(max_workers=concurrency * 2)
+        self.session = session or requests.Session()
+        # 对冲时同时在途的请求最多为并发数的两倍，连接池按此大小保留连接
+        adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency * 2)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._hosts = {}
+        self._host_limits = {}
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._workers = []
+        self._closed = False
+        for host, rate in CONFIG["data_collection"].get("host_rate_limits", {}).items():
+            self.set_host_limit(host, rate)
+
+    def set_host_limit(self, host, rate, burst=None):
+        """为指定主机设置请求速率（每秒）和突发容量；rate 为 None 时取消限速"""
+        with self._condition:
+            self._host_limits[host] = (rate, burst if burst is not None or rate is None else max(rate, 1))
+            if host in self._hosts:
+                self._hosts[host].bucket = None if rate is None else TokenBucket(*self._host_limits[host])
+
+    def set_hedge_min_delay(self, host, seconds):
+        """设置指定主机的对冲等待下限（秒）；None 表示使用全局的 hedge_min_delay"""
+        with self._condition:
+            if seconds is None:
+                self._hedge_min_delays.pop(host, None)
+            else:
+                self._hedge_min_delays[host] = seconds
+
+    def submit(self, method, url, priority=PRIORITY_NORMAL, deadline=None, hedge=None, **kwargs):
+        """提交请求，返回 concurrent.futures.Future
+
+        deadline 为从提交起算的总秒数，超过后请求以 TimeoutError 结束。
+        """
+        future = Future()
+        kwargs.setdefault('timeout', self.timeout)
+        job = {'method': method, 'url': url, 'kwargs': kwargs, 'future': future, 'attempt': 0,
+               'priority': priority, 'host': urlsplit(url).netloc,
+               'deadline': None if deadline is None else time.monotonic() + deadline,
+               'hedge': self.hedge if hedge is None else hedge}
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Scheduler is closed")
+            self._enqueue(job)
+            self._start_workers()
+        return future
+
+    def request(self, method, url, priority=PRIORITY_NORMAL, deadline=None, **kwargs):
+        """提交请求并等待结果"""
+        future = self.submit(method, url, priority=priority, deadline=deadline, **kwargs)
+        try:
+            return future.result(timeout=deadline)
+        except TimeoutError:
+            future.cancel()
+            raise TimeoutError(f"Request to {url} exceeded deadline of {deadline}s")
+
+    def get(self, url, priority=PRIORITY_NORMAL, **kwargs):
+        return self.request('GET', url, priority=priority, **kwargs)
+
+    def stats(self):
+        """返回每个主机的队列深度、并发数和延迟统计"""
+        with self._condition:
+            result = {}
+            for host, state in self._hosts.items():
+                latencies = sorted(state.latencies)
+                result[host] = {
+                    'queued': len(state.ready) + len(state.delayed),
+                    'in_flight': state.in_flight,
+                    'completed': state.completed,
+                    'failed': state.failed,
+                    'retries': state.retries,
+                    'hedged': state.hedged,
+                    'timeouts': state.timeouts,
+                    'latency_mean': sum(latencies) / len(latencies) if latencies else None,
+                    'latency_p50': latencies[len(latencies) // 2] if latencies else None,
+                    'latency_p95': latencies[int(len(latencies) * 0.95)] if latencies else None,
+                    'latency_p99': latencies[int(len(latencies) * 0.99)] if latencies else None
+                }
+            return result
+
+    def close(self):
+        """停止工作线程，未执行的请求以异常结束"""
+        with self._condition:
+            self._closed = True
+            for state in self._hosts.values():
+                for entry in state.ready + state.delayed:
+                    entry[-1]['future'].set_exception(RuntimeError("Scheduler is closed"))
+                state.ready.clear()
+                state.delayed.clear()
+            self._condition.notify_all()
+        for worker in self._workers:
+            worker.join()
+        self._hedge_executor.shutdown(wait=False)
+
+    def _host_state(self, host):
+        state = self._hosts.get(host)
+        if state is None:
+            rate, burst = self._host_limits.get(host, (self.host_rate, self.host_burst))
+            if rate is not None and burst is None:
+                burst = max(rate, 1)
+            state = self._hosts[host] = _HostState(rate, burst)
+        return state
+
+    def _enqueue(self, job, not_before=None):
+        state = self._host_state(job['host'])
+        if not_before is None:
+            heapq.heappush(state.ready, (job['priority'], next(self._sequence), job))
+        else:
+            heapq.heappush(state.delayed, (not_before, next(self._sequence), job))
+        self._condition.notify()
+
+    def _start_workers(self):
+        while len(self._workers) < self.concurrency:
+            worker = threading.Thread(target=self._worker_loop, daemon=True)
+            self._workers.append(worker)
+            worker.start()
+
+    def _next_job(self):
+        """选出可以立即执行的最高优先级请求；没有时返回需要等待的秒数"""
+        now = time.monotonic()
+        wait = None
+        candidates = []
+        for state in self._hosts.values():
+            while state.delayed and state.delayed[0][0] <= now:
+                _, _, job = heapq.heappop(state.delayed)
+                heapq.heappush(state.ready, (job['priority'], next(self._sequence), job))
+            if state.delayed:
+                delay = state.delayed[0][0] - now
+                wait = delay if wait is None else min(wait, delay)
+            if state.ready:
+                candidates.append((state.ready[0][:2], state))
+        # 按优先级依次尝试，跳过令牌暂时用完的主机
+        for _, state in sorted(candidates, key=lambda candidate: candidate[0]):
+            delay = state.bucket.reserve() if state.bucket is not None else 0.0
+            if delay > 0:
+                wait = delay if wait is None else min(wait, delay)
+                continue
+            _, _, job = heapq.heappop(state.ready)
+            state.in_flight += 1
+            return job, None
+        return None, wait
+
+    def _worker_loop(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._closed:
+                        return
+                    job, wait = self._next_job()
+                    if job is not None:
+                        break
+                    self._condition.wait(timeout=wait)
+            self._execute(job)
+
+    def _execute(self, job):
+        future = job['future']
+        if job['attempt'] == 0 and not future.set_running_or_notify_cancel():
+            self._finish(job, None, failed=True)
+            return
+        kwargs = dict(job['kwargs'])
+        if job['deadline'] is not None:
+            remaining = job['deadline'] - time.monotonic()
+            if remaining <= 0:
+                with self._condition:
+                    self._hosts[job['host']].timeouts += 1
+                self._finish(job, None, failed=True)
+                future.set_exception(TimeoutError(f"Request to {job['url']} exceeded its deadline"))
+                return
+            kwargs['timeout'] = min(kwargs['timeout'], remaining) if kwargs.get('timeout') else remaining
+        start = time.monotonic()
+        response, error = None, None
+        try:
+            response = self._send(job, kwargs)
+        except Exception as e:
+            error = e
+        latency = time.monotonic() - start
+
+        retryable = error is not None or response.status_code in RETRY_STATUS_CODES
+        delay = self._backoff_delay(job['attempt'], response)
+        # 重试不能越过截止时间
+        if job['deadline'] is not None and time.monotonic() + delay >= job['deadline']:
+            retryable = False
+        if retryable and job['attempt'] < self.retry_attempts:
+            job['attempt'] += 1
+            # 重试前放回连接，避免流式响应占用连接池
+            if response is not None:
+                response.close()
+            with self._condition:
+                state = self._hosts[job['host']]
+                state.in_flight -= 1
+                state.retries += 1
+                state.latencies.append(latency)
+                self._enqueue(job, not_before=time.monotonic() + delay)
+            return
+
+        bucket = self._hosts[job['host']].bucket
+        if response is not None and bucket is not None:
+            bucket.update_from_headers(response.headers)
+        self._finish(job, latency, failed=error is not None)
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(response)
+
+    def _send(self, job, kwargs):
+        """发送请求；需要对冲时在超过延迟分位数后发送备份请求，取先成功者"""
+        hedge_delay = self._hedge_delay(job)
+        if hedge_delay is None:
+            return self.session.request(job['method'], job['url'], **kwargs)
+        primary = self._hedge_executor.submit(self.session.request, job['method'], job['url'], **kwargs)
+        done, _ = wait([primary], timeout=hedge_delay)
+        if done:
+            return primary.result()
+        with self._condition:
+            self._hosts[job['host']].hedged += 1
+        backup = self._hedge_executor.submit(self.session.request, job['method'], job['url'], **kwargs)
+        for attempt in as_completed([primary, backup]):
+            if attempt.exception() is None:
+                other = backup if attempt is primary else primary
+                other.add_done_callback(_close_response)
+                return attempt.result()
+        return primary.result()
+
+    def _hedge_delay(self, job):
+        """返回对冲前等待的秒数，不满足对冲条件时返回 None"""
+        if not job['hedge'] or job['method'].upper() not in HEDGE_METHODS or job['kwargs'].get('stream'):
+            return None
+        with self._condition:
+            latencies = sorted(self._hosts[job['host']].latencies)
+            floor = self._hedge_min_delays.get(job['host'], self.hedge_min_delay)
+        if len(latencies) < self.hedge_min_samples:
+            return None
+        return max(floor, latencies[min(int(len(latencies) * self.hedge_percentile), len(latencies) - 1)])
+
+    def _finish(self, job, latency, failed):
+        with self._condition:
+            state = self._hosts[job['host']]
+            state.in_flight -= 1
+            if failed:
+                state.failed += 1
+            else:
+                state.completed += 1
+            if latency is not None:
+                state.latencies.append(latency)
+            self._condition.notify()
+
+    def _backoff_delay(self, attempt, response):
+        """带完全抖动的指数退避，优先使用 Retry-After 响应头"""
+        if response is not None and response.headers.get('Retry-After', '').isdigit():
+            return float(response.headers['Retry-After'])
+        return random.uniform(0, self.backoff_base * (2 ** attempt))
+
+
+def _close_response(future):
+    """关闭对冲中落败请求的响应，释放连接"""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+_shared_scheduler = None
+_shared_lock = threading.Lock()
+
+def get_shared_scheduler():
+    """获取进程内共享的请求调度器"""
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = RequestScheduler()
+        return _shared_scheduler
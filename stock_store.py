@@ -0,0 +1,152 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import json
+import logging
+import os
+import threading
+
+class YFinanceProvider:
+    """默认的行情数据源，一次请求批量获取多个股票"""
+
+    def fetch(self, symbols, start, end):
+        import yfinance as yf
+        data = yf.download(list(symbols), start=start, end=end, group_by='ticker',
+                           auto_adjust=False, progress=False)
+        result = {}
+        for symbol in symbols:
+            if isinstance(data.columns, pd.MultiIndex):
+                frame = data[symbol] if symbol in data.columns.get_level_values(0) else pd.DataFrame()
+            else:
+                frame = data
+            result[symbol] = frame.dropna(how='all')
+        return result
+
+
+class StockStore:
+    """按股票分区的本地列式行情存储
+
+    每个股票一个 Feather 文件，manifest.json 记录已覆盖的日期区间 [start, end) 列表
+    （有序、互不相交）。查询时只向数据源请求未被覆盖的空档，其余部分通过内存映射从磁盘读取。
+    只有数据源实际返回了数据的区间才记为已覆盖。
+    数据源需要实现 fetch(symbols, start, end) -> {symbol: DataFrame}，索引为日期。
+    """
+
+    def __init__(self, root='stock_data', provider=None):
+        self.logger = logging.getLogger(__name__)
+        self.root = root
+        self.provider = provider or YFinanceProvider()
+        os.makedirs(self.root, exist_ok=True)
+        self._manifest_path = os.path.join(self.root, 'manifest.json')
+        self._lock = threading.Lock()
+        self.manifest = self._load_manifest()
+
+    def get_many(self, symbols, start, end):
+        """返回 {symbol: DataFrame}，覆盖 [start, end) 区间"""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        with self._lock:
+            self._sync(symbols, start, end)
+        return {symbol: self._read(symbol, start, end) for symbol in symbols}
+
+    def coverage(self, symbol):
+        """返回已存储的日期区间列表 [(start, end), ...]，按时间排序且互不相交；没有数据时返回空列表"""
+        entry = self.manifest.get(symbol)
+        if entry is None:
+            return []
+        # 旧版 manifest 每个股票只记录一个区间
+        if isinstance(entry, dict):
+            entry = [[entry['start'], entry['end']]]
+        return [(pd.Timestamp(start), pd.Timestamp(end)) for start, end in entry]
+
+    def _sync(self, symbols, start, end):
+        # 当天的数据还不完整，覆盖区间最多记录到今天为止
+        today = pd.Timestamp.now().normalize()
+        # 按缺失区间分组，同一区间的股票一次批量请求
+        missing = {}
+        for symbol in symbols:
+            for gap in self._missing_ranges(symbol, start, end):
+                missing.setdefault(gap, []).append(symbol)
+        updated = False
+        for (gap_start, gap_end), group in missing.items():
+            try:
+                fetched = self.provider.fetch(group, gap_start.strftime('%Y-%m-%d'), gap_end.strftime('%Y-%m-%d'))
+            except Exception as e:
+                self.logger.error(f"Stock data fetch error for {', '.join(group)}: {str(e)}")
+                continue
+            for symbol in group:
+                frame = fetched.get(symbol)
+                # 没有返回数据（请求失败或批量下载中缺少该股票）时不记录覆盖，下次查询重新请求
+                if frame is None or frame.empty:
+                    continue
+                self._merge(symbol, frame)
+                self._extend_coverage(symbol, gap_start, min(gap_end, today))
+                updated = True
+        if updated:
+            self._save_manifest()
+
+    def _missing_ranges(self, symbol, start, end):
+        """[start, end) 中未被任何已覆盖区间包含的部分"""
+        gaps = []
+        cursor = start
+        for covered_start, covered_end in self.coverage(symbol):
+            if covered_end <= cursor:
+                continue
+            if covered_start >= end:
+                break
+            if covered_start > cursor:
+                gaps.append((cursor, covered_start))
+            cursor = covered_end
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+    def _extend_coverage(self, symbol, start, end):
+        """把 [start, end) 并入覆盖区间列表，只合并重叠或相接的区间"""
+        if end <= start:
+            return
+        merged = []
+        for interval_start, interval_end in sorted(self.coverage(symbol) + [(start, end)]):
+            if merged and interval_start <= merged[-1][1]:
+                merged[-1] = (merged[-1][0], max(merged[-1][1], interval_end))
+            else:
+                merged.append((interval_start, interval_end))
+        self.manifest[symbol] = [[interval_start.isoformat(), interval_end.isoformat()]
+                                 for interval_start, interval_end in merged]
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.feather")
+
+    def _merge(self, symbol, frame):
+        frame = frame.copy()
+        frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+        frame.index.name = 'Date'
+        existing = self._read(symbol)
+        if existing is not None:
+            frame = pd.concat([existing, frame])
+            frame = frame[~frame.index.duplicated(keep='last')]
+        frame = frame.sort_index()
+        tmp_path = self._path(symbol) + '.tmp'
+        feather.write_feather(pa.Table.from_pandas(frame), tmp_path)
+        os.replace(tmp_path, self._path(symbol))
+
+    def _read(self, symbol, start=None, end=None):
+        path = self._path(symbol)
+        if not os.path.exists(path):
+            return None if start is None else pd.DataFrame()
+        frame = feather.read_table(path, memory_map=True).to_pandas()
+        if start is not None:
+            frame = frame[(frame.index >= start) & (frame.index < end)]
+        return frame
+
+    def _load_manifest(self):
+        try:
+            with open(self._manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self._manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, self._manifest_path)
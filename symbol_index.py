@@ -0,0 +1,561 @@
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import zlib
+from collections import defaultdict
+import numpy as np
+
+_MAGIC = b'SYMIDX01'
+_HEADER = struct.Struct('<8sI')
+
+# 词项按字段加前缀：n 完整名称，t 名称拆分出的子词，i 导入的模块，b 基类
+FIELD_NAME = 'n'
+FIELD_TOKEN = 't'
+FIELD_IMPORT = 'i'
+FIELD_BASE = 'b'
+
+KINDS = ('function', 'class', 'import')
+
+# camelCase / PascalCase / 缩写 / 数字 拆分
+_SUBTOKEN_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+')
+_SEPARATOR_RE = re.compile(r'[^A-Za-z0-9]+')
+
+
+def split_identifier(name):
+    """把标识符拆分为小写子词，例如 parseHTTPResponse_v2 -> ['parse', 'http', 'response', 'v', '2']"""
+    return [token.lower() for part in _SEPARATOR_RE.split(name) for token in _SUBTOKEN_RE.findall(part)]
+
+
+def _grams(text):
+    """模糊查找使用的三元组（两端补边界符）"""
+    padded = f"\x02{text}\x03"
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def _deletion_keys(term):
+    """词项本身及删除正文中一个字符后的全部变体（保留字段前缀）
+
+    编辑距离不超过 1 的两个词项，各自的变体集合必有交集，因此可以用精确查找代替逐个比较。
+    """
+    field, body = term[:2], term[2:]
+    return {term} | {field + body[:index] + body[index + 1:] for index in range(len(body))}
+
+
+def _key_hash(key):
+    # 两个 32 位校验和拼成 64 位键；偶尔的冲突只会多出候选，最终由编辑距离排除
+    data = key.encode('utf-8')
+    return zlib.crc32(data) << 32 | zlib.adler32(data)
+
+
+def _distance_at_most_one(first, second):
+    """编辑距离为 0 或 1 时返回该值，否则返回 2（线性时间）"""
+    if first == second:
+        return 0
+    if len(first) > len(second):
+        first, second = second, first
+    index = 0
+    while index < len(first) and first[index] == second[index]:
+        index += 1
+    if len(first) == len(second):
+        return 1 if first[index + 1:] == second[index + 1:] else 2
+    return 1 if first[index:] == second[index + 1:] else 2
+
+
+def _levenshtein(first, second, limit):
+    """编辑距离，超过 limit 时提前返回 limit + 1"""
+    if abs(len(first) - len(second)) > limit:
+        return limit + 1
+    if limit <= 1:
+        return _distance_at_most_one(first, second)
+    previous = list(range(len(second) + 1))
+    for row, first_char in enumerate(first, 1):
+        current = [row]
+        for column, second_char in enumerate(second, 1):
+            current.append(min(previous[column] + 1, current[column - 1] + 1,
+                               previous[column - 1] + (first_char != second_char)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def symbols_from_analysis(analysis):
+    """从 CodeAnalyzer 的分析结果中提取符号记录 (kind, name, line, bases)"""
+    symbols = []
+    for function in analysis.get('functions', []):
+        symbols.append(('function', function['name'], function.get('line_number', 0), ()))
+    for cls in analysis.get('classes', []):
+        bases = cls.get('bases') or ([cls['extends']] if cls.get('extends') else [])
+        symbols.append(('class', cls['name'], cls.get('line_number', 0), tuple(bases)))
+    for entry in analysis.get('imports', []):
+        module = entry['module'] if isinstance(entry, dict) else entry
+        symbols.append(('import', module, 0, ()))
+    return symbols
+
+
+def symbol_terms(kind, name, bases):
+    """一个符号对应的全部词项"""
+    if kind == 'import':
+        # 同时索引各级父模块，便于查找 "导入了 os.path 下任意名称的文件"
+        parts = [part for part in re.split(r'[./]', name.lower()) if part]
+        separator = '/' if '/' in name else '.'
+        return {f"{FIELD_IMPORT}:{separator.join(parts[:index])}" for index in range(1, len(parts) + 1)}
+    terms = {f"{FIELD_NAME}:{name.lower()}"}
+    terms.update(f"{FIELD_TOKEN}:{token}" for token in split_identifier(name))
+    for base in bases:
+        terms.add(f"{FIELD_BASE}:{base.lower()}")
+        terms.add(f"{FIELD_BASE}:{base.rsplit('.', 1)[-1].lower()}")
+    return terms
+
+
+class _Strings:
+    """内存映射文件中按偏移数组存放的字符串序列，可直接用于 bisect"""
+
+    def __init__(self, buffer, offsets, base):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._base = base
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        return self._buffer[self._base + int(self._offsets[index]):self._base + int(self._offsets[index + 1])]
+
+
+class SymbolIndex:
+    """函数、类、导入和基类的持久化倒排索引
+
+    磁盘格式为单个只读段文件：排好序的词项表、每个词项的符号编号列表（uint32）、
+    词项三元组到词项编号的倒排表（用于模糊查找）以及符号和文件表，全部是连续的数组，
+    打开时只需内存映射，查找在映射上二分进行，不需要把索引读入内存。
+
+    按文件的增量修改保存在内存中：新增或更新的文件进入增量部分，被删除或替换的文件记为墓碑；
+    查询同时读取段文件和增量部分。save() 把两者合并写成新的段文件。
+    """
+
+    def __init__(self, path='symbol_index.bin'):
+        self.path = path
+        self._lock = threading.RLock()
+        self._mmap = None
+        self._file = None
+        self._load()
+        self._reset_delta()
+
+    # ---- 段文件 ----
+
+    def _load(self):
+        self._arrays = {}
+        self._segment_files = {}
+        self._symbol_count = 0
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        self._file = open(self.path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_length = _HEADER.unpack_from(self._mmap, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Invalid symbol index file: {self.path}")
+        header = json.loads(self._mmap[_HEADER.size:_HEADER.size + header_length])
+        for name, (offset, dtype, count) in header['arrays'].items():
+            self._arrays[name] = np.frombuffer(self._mmap, dtype=dtype, count=count, offset=offset)
+        blob_offset = lambda name: header['arrays'][name][0]
+        self._terms = _Strings(self._mmap, self._arrays['term_offsets'], blob_offset('term_blob'))
+        self._grams = _Strings(self._mmap, self._arrays['gram_offsets'], blob_offset('gram_blob'))
+        self._names = _Strings(self._mmap, self._arrays['name_offsets'], blob_offset('name_blob'))
+        self._bases = _Strings(self._mmap, self._arrays['base_offsets'], blob_offset('base_blob'))
+        paths = _Strings(self._mmap, self._arrays['path_offsets'], blob_offset('path_blob'))
+        self._paths = [paths[index].decode('utf-8') for index in range(len(paths))]
+        self._segment_files = {path: index for index, path in enumerate(self._paths)}
+        self._symbol_count = len(self._arrays['symbol_file'])
+
+    def _close_segment(self):
+        # 先释放所有引用映射内存的数组，否则无法关闭映射
+        self._arrays = {}
+        self._terms = self._grams = self._names = self._bases = None
+        self._removed_mask = None
+        if self._mmap is not None:
+            self._mmap.close()
+            self._file.close()
+            self._mmap = self._file = None
+
+    def _reset_delta(self):
+        # 增量符号编号从段文件符号数开始；删除的增量符号置为 None
+        self._delta_symbols = []
+        self._delta_files = {}
+        self._delta_terms = defaultdict(set)
+        # 增量部分的模糊查找表 (三元组 -> 词项, 删除变体 -> 词项)，第一次模糊查询时才建立
+        self._delta_fuzzy = None
+        self._removed_files = set()
+        self._removed_mask = None
+
+    # ---- 增量修改 ----
+
+    def update(self, result):
+        """用 CodeAnalyzer.analyze_file 的结果添加或替换一个文件的符号"""
+        path = os.path.abspath(result['path'])
+        with self._lock:
+            self._remove(path)
+            if result.get('analysis') is None:
+                return
+            ids = []
+            for kind, name, line, bases in symbols_from_analysis(result['analysis']):
+                symbol_id = self._symbol_count + len(self._delta_symbols)
+                self._delta_symbols.append((path, kind, name, line, bases))
+                ids.append(symbol_id)
+                for term in symbol_terms(kind, name, bases):
+                    if term not in self._delta_terms and self._delta_fuzzy is not None:
+                        self._index_delta_term(term)
+                    self._delta_terms[term].add(symbol_id)
+            self._delta_files[path] = ids
+
+    def update_many(self, results):
+        for result in results:
+            self.update(result)
+
+    def remove(self, path):
+        with self._lock:
+            self._remove(os.path.abspath(path))
+
+    def _remove(self, path):
+        if path in self._segment_files and path not in self._removed_files:
+            self._removed_files.add(path)
+            self._removed_mask = None
+        for symbol_id in self._delta_files.pop(path, ()):
+            path_, kind, name, line, bases = self._delta_symbols[symbol_id - self._symbol_count]
+            for term in symbol_terms(kind, name, bases):
+                ids = self._delta_terms.get(term)
+                if ids is not None:
+                    ids.discard(symbol_id)
+                    if not ids:
+                        del self._delta_terms[term]
+                        if self._delta_fuzzy is not None:
+                            self._unindex_delta_term(term)
+            self._delta_symbols[symbol_id - self._symbol_count] = None
+
+    def _index_delta_term(self, term):
+        grams, deletions = self._delta_fuzzy
+        for gram in _grams(term[2:]):
+            grams[gram].add(term)
+        for key in _deletion_keys(term):
+            deletions[key].add(term)
+
+    def _unindex_delta_term(self, term):
+        grams, deletions = self._delta_fuzzy
+        for gram in _grams(term[2:]):
+            grams[gram].discard(term)
+        for key in _deletion_keys(term):
+            deletions[key].discard(term)
+
+    def _delta_fuzzy_tables(self):
+        if self._delta_fuzzy is None:
+            self._delta_fuzzy = (defaultdict(set), defaultdict(set))
+            for term in self._delta_terms:
+                self._index_delta_term(term)
+        return self._delta_fuzzy
+
+    # ---- 查询 ----
+
+    def _removed_symbol_mask(self):
+        """段文件中属于已删除文件的符号"""
+        if self._removed_mask is None:
+            removed = np.fromiter((self._segment_files[path] for path in self._removed_files), dtype=np.uint32)
+            self._removed_mask = np.isin(self._arrays['symbol_file'], removed)
+        return self._removed_mask
+
+    def _segment_postings(self, index):
+        offsets = self._arrays['posting_offsets']
+        postings = self._arrays['postings'][int(offsets[index]):int(offsets[index + 1])]
+        if self._removed_files:
+            postings = postings[~self._removed_symbol_mask()[postings]]
+        return postings
+
+    def _term_ids(self, term):
+        """词项的全部符号编号（段文件 + 增量部分），按编号升序"""
+        ids = []
+        if self._arrays:
+            encoded = term.encode('utf-8')
+            index = bisect.bisect_left(self._terms, encoded)
+            if index < len(self._terms) and self._terms[index] == encoded:
+                ids.append(self._segment_postings(index))
+        if term in self._delta_terms:
+            ids.append(np.fromiter(sorted(self._delta_terms[term]), dtype=np.uint32))
+        if not ids:
+            return np.empty(0, dtype=np.uint32)
+        return ids[0] if len(ids) == 1 else np.concatenate(ids)
+
+    def _terms_with_prefix(self, prefix, limit):
+        """以 prefix 开头的词项（段文件按序取区间，增量部分逐个比较）"""
+        terms = []
+        if self._arrays:
+            encoded = prefix.encode('utf-8')
+            start = bisect.bisect_left(self._terms, encoded)
+            end = bisect.bisect_left(self._terms, encoded + b'\xff', lo=start)
+            for index in range(start, min(end, start + limit)):
+                terms.append(self._terms[index].decode('utf-8'))
+        terms.extend(term for term in self._delta_terms if term.startswith(prefix))
+        return terms
+
+    def symbol(self, symbol_id):
+        """符号编号 -> {'name', 'kind', 'path', 'line', 'bases'}"""
+        symbol_id = int(symbol_id)
+        if symbol_id >= self._symbol_count:
+            path, kind, name, line, bases = self._delta_symbols[symbol_id - self._symbol_count]
+            return {'name': name, 'kind': kind, 'path': path, 'line': line, 'bases': list(bases)}
+        arrays = self._arrays
+        bases = self._bases[symbol_id].decode('utf-8')
+        return {
+            'name': self._names[symbol_id].decode('utf-8'),
+            'kind': KINDS[arrays['symbol_kind'][symbol_id]],
+            'path': self._paths[arrays['symbol_file'][symbol_id]],
+            'line': int(arrays['symbol_line'][symbol_id]),
+            'bases': bases.split('\n') if bases else []
+        }
+
+    def _symbols(self, ids, limit, kind=None):
+        results = []
+        for symbol_id in ids:
+            record = self.symbol(symbol_id)
+            if kind is None or record['kind'] == kind:
+                results.append(record)
+                if len(results) >= limit:
+                    break
+        return results
+
+    def lookup(self, name, kind=None, limit=100):
+        """按完整名称（不区分大小写）查找符号"""
+        with self._lock:
+            return self._symbols(self._term_ids(f"{FIELD_NAME}:{name.lower()}"), limit, kind)
+
+    def search(self, query, kind=None, limit=100):
+        """按子词查找：query 拆分出的所有子词都出现在名称中，例如 "parse response" 匹配 parseHttpResponse"""
+        tokens = split_identifier(query)
+        if not tokens:
+            return []
+        with self._lock:
+            postings = sorted((self._term_ids(f"{FIELD_TOKEN}:{token}") for token in tokens), key=len)
+            ids = postings[0]
+            for other in postings[1:]:
+                ids = np.intersect1d(ids, other, assume_unique=True)
+                if not len(ids):
+                    break
+            return self._symbols(ids, limit, kind)
+
+    def prefix(self, prefix, field=FIELD_NAME, kind=None, limit=100):
+        """名称（或其他字段）以 prefix 开头的符号"""
+        with self._lock:
+            results = []
+            for term in self._terms_with_prefix(f"{field}:{prefix.lower()}", limit):
+                results.extend(self._symbols(self._term_ids(term), limit - len(results), kind))
+                if len(results) >= limit:
+                    break
+            return results
+
+    def fuzzy(self, name, max_distance=1, field=FIELD_NAME, kind=None, limit=100):
+        """与 name 的编辑距离不超过 max_distance 的符号，按距离排序
+
+        max_distance 为 1 时在删除变体表中精确查找候选词项；更大的距离使用三元组倒排表，
+        先找出共享足够多三元组的词项。候选最后都用编辑距离确认。
+        """
+        text = name.lower()
+        prefix = f"{field}:"
+        with self._lock:
+            if max_distance <= 1:
+                candidates = self._deletion_candidates(prefix + text)
+            else:
+                grams = _grams(text)
+                # 每处编辑最多破坏 3 个三元组
+                candidates = self._gram_candidates(grams, max(1, len(grams) - 3 * max_distance))
+            scored = []
+            for term in candidates:
+                if term.startswith(prefix):
+                    distance = _levenshtein(text, term[len(prefix):], max_distance)
+                    if distance <= max_distance:
+                        scored.append((distance, term))
+            scored.sort()
+            results = []
+            for distance, term in scored:
+                for record in self._symbols(self._term_ids(term), limit - len(results), kind):
+                    record['distance'] = distance
+                    results.append(record)
+                if len(results) >= limit:
+                    break
+            return results
+
+    def _deletion_candidates(self, term):
+        keys = _deletion_keys(term)
+        candidates = set()
+        if self._arrays:
+            table = self._arrays['deletion_hashes']
+            hashes = np.array(sorted(_key_hash(key) for key in keys), dtype=np.uint64)
+            positions = np.searchsorted(table, hashes)
+            found = positions < len(table)
+            found[found] = table[positions[found]] == hashes[found]
+            positions = positions[found]
+            offsets = self._arrays['deletion_offsets']
+            postings = self._arrays['deletion_postings']
+            lists = [postings[int(offsets[position]):int(offsets[position + 1])] for position in positions]
+            if lists:
+                for term_id in np.unique(np.concatenate(lists)):
+                    candidates.add(self._terms[int(term_id)].decode('utf-8'))
+        if self._delta_terms:
+            deletions = self._delta_fuzzy_tables()[1]
+            for key in keys:
+                candidates.update(deletions.get(key, ()))
+        return candidates
+
+    def _gram_candidates(self, grams, required):
+        candidates = set()
+        if self._arrays:
+            lists = []
+            offsets = self._arrays['gram_posting_offsets']
+            for gram in grams:
+                encoded = gram.encode('utf-8')
+                index = bisect.bisect_left(self._grams, encoded)
+                if index < len(self._grams) and self._grams[index] == encoded:
+                    lists.append(self._arrays['gram_postings'][int(offsets[index]):int(offsets[index + 1])])
+            if lists:
+                term_ids, counts = np.unique(np.concatenate(lists), return_counts=True)
+                for term_id in term_ids[counts >= required]:
+                    candidates.add(self._terms[int(term_id)].decode('utf-8'))
+        if self._delta_terms:
+            counts = defaultdict(int)
+            for gram in grams:
+                for term in self._delta_fuzzy_tables()[0].get(gram, ()):
+                    counts[term] += 1
+            candidates.update(term for term, count in counts.items() if count >= required)
+        return candidates
+
+    def importers(self, module, limit=100):
+        """导入了 module（或其子模块/成员）的文件"""
+        with self._lock:
+            records = self._symbols(self._term_ids(f"{FIELD_IMPORT}:{module.lower()}"), limit)
+        return sorted({record['path'] for record in records})
+
+    def subclasses(self, base, limit=100):
+        with self._lock:
+            return self._symbols(self._term_ids(f"{FIELD_BASE}:{base.lower()}"), limit, 'class')
+
+    def __len__(self):
+        with self._lock:
+            removed = int(self._removed_symbol_mask().sum()) if self._removed_files else 0
+            return self._symbol_count - removed + sum(map(len, self._delta_files.values()))
+
+    # ---- 合并写盘 ----
+
+    def _iter_symbols(self):
+        """段文件中未删除的符号和增量符号，产出 (path, kind, name, line, bases)"""
+        removed = self._removed_symbol_mask() if self._removed_files else None
+        for symbol_id in range(self._symbol_count):
+            if removed is not None and removed[symbol_id]:
+                continue
+            record = self.symbol(symbol_id)
+            yield record['path'], record['kind'], record['name'], record['line'], tuple(record['bases'])
+        for symbol in self._delta_symbols:
+            if symbol is not None:
+                yield symbol
+
+    def save(self):
+        """把段文件与增量部分合并写成新的段文件，并重新映射"""
+        with self._lock:
+            paths, path_ids = [], {}
+            files, kinds, lines, names, bases_list = [], [], [], [], []
+            postings = defaultdict(list)
+            for symbol_id, (path, kind, name, line, bases) in enumerate(self._iter_symbols()):
+                if path not in path_ids:
+                    path_ids[path] = len(paths)
+                    paths.append(path)
+                files.append(path_ids[path])
+                kinds.append(KINDS.index(kind))
+                lines.append(line or 0)
+                names.append(name)
+                bases_list.append('\n'.join(bases))
+                for term in symbol_terms(kind, name, bases):
+                    postings[term].append(symbol_id)
+            terms = sorted(postings, key=lambda term: term.encode('utf-8'))
+            gram_postings = defaultdict(list)
+            for term_id, term in enumerate(terms):
+                for gram in _grams(term[2:]):
+                    gram_postings[gram].append(term_id)
+            grams = sorted(gram_postings, key=lambda gram: gram.encode('utf-8'))
+            deletion_hashes, deletion_offsets, deletion_postings = _deletion_table(terms)
+
+            arrays = {}
+            arrays['term_offsets'], arrays['term_blob'] = _pack_strings(terms)
+            arrays['posting_offsets'], arrays['postings'] = _pack_lists(postings[term] for term in terms)
+            arrays['gram_offsets'], arrays['gram_blob'] = _pack_strings(grams)
+            arrays['gram_posting_offsets'], arrays['gram_postings'] = _pack_lists(gram_postings[gram] for gram in grams)
+            arrays['deletion_hashes'] = deletion_hashes
+            arrays['deletion_offsets'] = deletion_offsets
+            arrays['deletion_postings'] = deletion_postings
+            arrays['symbol_file'] = np.array(files, dtype=np.uint32)
+            arrays['symbol_kind'] = np.array(kinds, dtype=np.uint8)
+            arrays['symbol_line'] = np.array(lines, dtype=np.uint32)
+            arrays['name_offsets'], arrays['name_blob'] = _pack_strings(names)
+            arrays['base_offsets'], arrays['base_blob'] = _pack_strings(bases_list)
+            arrays['path_offsets'], arrays['path_blob'] = _pack_strings(paths)
+
+            temp_path = f"{self.path}.tmp"
+            _write_segment(temp_path, arrays)
+            self._close_segment()
+            os.replace(temp_path, self.path)
+            self._load()
+            self._reset_delta()
+
+    def close(self):
+        with self._lock:
+            self._close_segment()
+
+
+def _deletion_table(terms):
+    """删除变体哈希（升序去重）、偏移和对应的词项编号，用 NumPy 排序分组以控制内存"""
+    hashes = np.fromiter((_key_hash(key) for term in terms for key in _deletion_keys(term)), dtype=np.uint64)
+    term_ids = np.fromiter((term_id for term_id, term in enumerate(terms) for _ in _deletion_keys(term)),
+                           dtype=np.uint32, count=len(hashes))
+    order = np.argsort(hashes, kind='stable')
+    hashes, term_ids = hashes[order], term_ids[order]
+    unique, starts = np.unique(hashes, return_index=True)
+    offsets = np.append(starts, len(hashes)).astype(np.uint64)
+    return unique, offsets, term_ids
+
+
+def _pack_strings(strings):
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(item) for item in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def _pack_lists(lists):
+    lists = list(lists)
+    offsets = np.zeros(len(lists) + 1, dtype=np.uint64)
+    np.cumsum([len(item) for item in lists], out=offsets[1:])
+    values = np.fromiter((value for item in lists for value in item), dtype=np.uint32, count=int(offsets[-1]))
+    return offsets, values
+
+
+def _write_segment(path, arrays):
+    """段文件：魔数 + 头长度 + JSON头（各数组的偏移、类型、长度）+ 8字节对齐的数组数据"""
+    layout, offset = {}, 0
+    for name, array in arrays.items():
+        layout[name] = [offset, array.dtype.str, len(array)]
+        offset += (array.nbytes + 7) // 8 * 8
+    # 头部长度影响数组的绝对偏移，偏移的位数又影响头部长度，重复直到头部能放下
+    header_size = 0
+    while True:
+        absolute = {name: [entry[0] + header_size] + entry[1:] for name, entry in layout.items()}
+        header = json.dumps({'arrays': absolute}).encode('utf-8')
+        if _HEADER.size + len(header) <= header_size:
+            break
+        header_size = (_HEADER.size + len(header) + 64 + 7) // 8 * 8
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(_MAGIC, len(header)))
+        f.write(header)
+        f.write(b'\0' * (header_size - _HEADER.size - len(header)))
+        for array in arrays.values():
+            data = array.tobytes()
+            f.write(data)
+            f.write(b'\0' * ((len(data) + 7) // 8 * 8 - len(data)))
@@ -0,0 +1,43 @@
+import pytest
+
+from analysis_cache import AnalysisCache
+from code_analyzer import ANALYZER_VERSION, CodeAnalyzer
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return CodeAnalyzer()
+
+
+def test_default_version_follows_analyzer(tmp_path):
+    cache = AnalysisCache(str(tmp_path / 'cache.db'))
+    assert cache.version == ANALYZER_VERSION
+    cache.close()
+
+
+def test_results_of_other_analyzer_versions_are_dropped(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    old = AnalysisCache(path, version='1')
+    old.put('digest', 'python', {'functions': []})
+    old.close()
+
+    cache = AnalysisCache(path)
+    assert cache.get('digest', 'python') is None
+    cache.close()
+
+
+def test_analyze_many_reuses_cached_results(analyzer, tmp_path):
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"module_{i}.py"
+        path.write_text(f"def f{i}():\n    return {i}\n")
+        paths.append(str(path))
+    cache = AnalysisCache(str(tmp_path / 'cache.db'))
+
+    cold = list(analyzer.analyze_many(paths, workers=1, cache=cache))
+    warm = list(analyzer.analyze_many(paths, workers=1, cache=cache))
+    assert not any(result.get('cached') for result in cold)
+    assert all(result.get('cached') for result in warm)
+    assert sorted(r['analysis']['functions'][0]['name'] for r in warm) == ['f0', 'f1', 'f2']
+    cache.close()
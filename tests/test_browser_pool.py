@@ -0,0 +1,99 @@
+import pytest
+
+from browser_pool import BrowserPool, needs_javascript
+
+
+class FakeDriver:
+    def __init__(self):
+        self.crashed = False
+        self.fail_next_get = False
+        self.quit_called = False
+        self.page_source = ''
+
+    @property
+    def current_url(self):
+        if self.crashed:
+            raise RuntimeError("chrome not reachable")
+        return 'about:blank'
+
+    def get(self, url):
+        if self.crashed or self.fail_next_get:
+            raise RuntimeError("chrome not reachable")
+        self.page_source = f"<html>{url}</html>"
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def drivers():
+    return []
+
+
+@pytest.fixture
+def pool(drivers):
+    def factory():
+        drivers.append(FakeDriver())
+        return drivers[-1]
+
+    with BrowserPool(size=2, max_pages=3, driver_factory=factory) as pool:
+        yield pool
+
+
+def test_checkout_returns_session_for_reuse(pool, drivers):
+    assert pool.fetch('http://a/') == '<html>http://a/</html>'
+    assert pool.fetch('http://b/') == '<html>http://b/</html>'
+    assert len(drivers) == 1
+    assert pool.stats['created'] == 1
+    assert pool.stats['checkouts'] == 2
+
+
+def test_crashed_idle_driver_is_replaced(pool, drivers):
+    pool.fetch('http://a/')
+    drivers[0].crashed = True
+    assert pool.fetch('http://b/') == '<html>http://b/</html>'
+    assert len(drivers) == 2
+    assert drivers[0].quit_called
+    assert pool.stats['crashed'] == 1
+
+
+def test_driver_failing_during_use_is_discarded(pool, drivers):
+    pool.fetch('http://a/')
+    drivers[0].fail_next_get = True
+    with pytest.raises(RuntimeError):
+        with pool.checkout() as driver:
+            driver.get('http://b/')
+    # 失败的会话不会回到空闲队列
+    pool.fetch('http://c/')
+    assert len(drivers) == 2
+    assert drivers[0].quit_called
+    assert pool.stats['crashed'] == 1
+
+
+def test_driver_is_recycled_after_max_pages(pool, drivers):
+    for number in range(4):
+        pool.fetch(f"http://a/{number}")
+    assert len(drivers) == 2
+    assert drivers[0].quit_called
+    assert pool.stats['recycled'] == 1
+
+
+def test_checkout_waits_for_free_slot(pool):
+    with pool.checkout(), pool.checkout():
+        with pytest.raises(TimeoutError):
+            with pool.checkout(timeout=0.01):
+                pass
+    with pool.checkout(timeout=0.01):
+        pass
+
+
+def test_close_quits_idle_sessions(pool, drivers):
+    with pool.checkout(), pool.checkout():
+        pass
+    pool.close()
+    assert all(driver.quit_called for driver in drivers)
+
+
+def test_needs_javascript():
+    assert needs_javascript('<html><body><div id="root"></div><script src="app.js"></script></body></html>')
+    assert not needs_javascript('<html><body><p>' + 'static content ' * 30 + '</p></body></html>')
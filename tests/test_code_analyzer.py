@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import textwrap
+
+import pytest
+
+from code_analyzer import CodeAnalyzer
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return CodeAnalyzer()
+
+
+def _function(analyzer, source):
+    return analyzer.analyze_python_code(textwrap.dedent(source))['functions'][0]
+
+
+def test_elif_chain_does_not_add_nesting(analyzer):
+    branches = '\n'.join(f"    {'if' if i == 0 else 'elif'} x == {i}:\n        return {i}" for i in range(10))
+    function = _function(analyzer, f"def f(x):\n{branches}\n    else:\n        return -1\n")
+    assert function['nesting_depth'] == 1
+    assert function['complexity'] == 11
+
+
+def test_nested_blocks_inside_elif_are_counted(analyzer):
+    function = _function(analyzer, """
+        def f(x, items):
+            if x:
+                pass
+            elif items:
+                for item in items:
+                    if item:
+                        return item
+    """)
+    assert function['nesting_depth'] == 3
+
+
+def test_if_nested_in_else_with_other_statements_adds_nesting(analyzer):
+    function = _function(analyzer, """
+        def f(x):
+            if x:
+                pass
+            else:
+                x = 1
+                if x:
+                    return x
+    """)
+    assert function['nesting_depth'] == 2
+
+
+@pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                    reason="工作进程需要继承替换后的 analyze_file")
+@pytest.mark.parametrize('failure', ['raise', 'crash'])
+def test_failed_worker_chunk_does_not_drop_neighbours(analyzer, tmp_path, monkeypatch, failure):
+    paths = []
+    for i in range(12):
+        path = tmp_path / f"module_{i}.py"
+        path.write_text(f"def f{i}():\n    return {i}\n")
+        paths.append(str(path))
+    bad = paths[5]
+    analyze_file = CodeAnalyzer.analyze_file
+
+    def failing_analyze_file(self, path):
+        if path == bad:
+            if failure == 'crash':
+                os._exit(1)
+            raise RuntimeError("worker failure")
+        return analyze_file(self, path)
+
+    monkeypatch.setattr(CodeAnalyzer, 'analyze_file', failing_analyze_file)
+    results = {result['path']: result for result in analyzer.analyze_many(paths, workers=2, chunksize=4)}
+
+    assert sorted(results) == sorted(paths)
+    assert results[bad]['analysis'] is None
+    assert results[bad]['error'].startswith('worker error')
+    for path in paths:
+        if path != bad:
+            assert results[path]['error'] is None
+            assert results[path]['analysis']['functions']
@@ -0,0 +1,199 @@
+import base64
+import io
+import json
+import tarfile
+import time
+import zlib
+from queue import Queue
+
+import pytest
+import requests
+
+from benchmarks.local_server import LocalServer
+from code_collector import CodeCollector
+from http_cache import HTTPCache
+from request_scheduler import RequestScheduler
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+
+class FakeHTTPCache:
+    """按 URL 返回预设响应，并记录请求"""
+
+    def __init__(self, routes):
+        self.routes = routes
+        self.requests = []
+
+    def get(self, url, params=None, headers=None, **kwargs):
+        self.requests.append((url, params))
+        route = self.routes[url]
+        return route(params) if callable(route) else route
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return CodeCollector()
+
+
+def test_github_repository_follows_tree_and_rate_limit_headers(collector):
+    api = collector.github_api
+    rate_headers = {'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '9999999999'}
+    tree = {'tree': [
+        {'type': 'blob', 'path': 'a.py', 'sha': 's1', 'size': 10},
+        {'type': 'blob', 'path': 'big.py', 'sha': 's2', 'size': 10 ** 9},
+        {'type': 'blob', 'path': 'notes.txt', 'sha': 's3', 'size': 10},
+        {'type': 'tree', 'path': 'pkg', 'sha': 's4'}
+    ]}
+    collector.http_cache = FakeHTTPCache({
+        f"{api}/repos/o/r/git/trees/HEAD": FakeResponse(tree, headers={'X-RateLimit-Remaining': '100',
+                                                                       'X-RateLimit-Reset': '9999999999'}),
+        f"{api}/repos/o/r/git/blobs/s1": FakeResponse(
+            {'encoding': 'base64', 'content': base64.b64encode(b'print(1)').decode()}, headers=rate_headers)
+    })
+    files = list(collector.collect_github_repository('o', 'r', extensions={'.py'}))
+    assert files == [('a.py', 'print(1)')]
+    # 最后一个响应报告配额耗尽，令牌桶应当清空并按重置时间放慢
+    assert collector.github_bucket.tokens == 0
+    assert collector.github_bucket.rate < 1e-6
+
+
+def _question(question_id, blocks):
+    body = ''.join(f"<pre><code>{code}</code></pre>" for code in blocks)
+    return {'question_id': question_id, 'title': f"q{question_id}", 'body': body, 'tags': ['python']}
+
+
+def _stackoverflow_cache(collector, pages):
+    def route(params):
+        page = params['page']
+        items = pages.get(page, [])
+        return FakeResponse({'items': items, 'has_more': page < max(pages), 'quota_remaining': 1000})
+
+    collector.http_cache = FakeHTTPCache({f"{collector.stackexchange_api}/questions": route})
+
+
+def test_stackoverflow_resume_after_close_mid_round(collector, tmp_path):
+    pages = {1: [_question(1, ['a', 'b']), _question(2, ['c'])],
+             2: [_question(3, ['d'])],
+             3: [_question(4, ['e', 'f'])]}
+    _stackoverflow_cache(collector, pages)
+    checkpoint = str(tmp_path / 'so.json')
+
+    harvest = collector.harvest_stackoverflow_code('python', target=10, concurrency=4, checkpoint_path=checkpoint)
+    first = [next(harvest)['code'] for _ in range(2)]
+    harvest.close()
+
+    rest = [snippet['code'] for snippet in
+            collector.harvest_stackoverflow_code('python', target=10, concurrency=4, checkpoint_path=checkpoint)]
+    assert first == ['a', 'b']
+    assert rest == ['c', 'd', 'e', 'f']
+
+
+def test_stackoverflow_resume_skips_reordered_items(collector, tmp_path):
+    pages = {1: [_question(1, ['a']), _question(2, ['b'])], 2: [_question(3, ['c'])]}
+    _stackoverflow_cache(collector, pages)
+    checkpoint = str(tmp_path / 'so.json')
+    assert [s['code'] for s in collector.harvest_stackoverflow_code('python', target=1, checkpoint_path=checkpoint)] == ['a']
+
+    # 投票变化后第 1 页的顺序改变，已产出的片段不会再次出现
+    pages[1].reverse()
+    rest = [s['code'] for s in collector.harvest_stackoverflow_code('python', target=10, checkpoint_path=checkpoint)]
+    assert rest == ['b', 'c']
+
+
+def test_stackoverflow_pages_reread_backoff_each_round(collector, tmp_path):
+    calls = []
+
+    def route(handler):
+        calls.append(handler.path)
+        body = {'items': [_question(len(calls), ['x'])], 'has_more': False, 'quota_remaining': 1000}
+        if len(calls) == 2:
+            body['backoff'] = 5
+        return 200, {'Content-Type': 'application/json'}, json.dumps(body)
+
+    scheduler = RequestScheduler(concurrency=2, retry_attempts=0)
+    with LocalServer({'/2.3/questions': route}) as server:
+        collector.http_cache = HTTPCache(str(tmp_path / 'cache'), scheduler=scheduler)
+        collector.stackexchange_api = server.url('/2.3')
+        assert len(list(collector.harvest_stackoverflow_code('python', target=1, concurrency=1))) == 1
+        assert collector._stackexchange_not_before == 0
+
+        # 同一页再次请求时不使用缓存的响应，新的 backoff 生效
+        assert len(list(collector.harvest_stackoverflow_code('python', target=1, concurrency=1))) == 1
+    scheduler.close()
+    assert len(calls) == 2
+    assert collector._stackexchange_not_before > time.monotonic() + 4
+    assert collector.http_cache.stats['hits'] == 0
+
+
+def _archive(files, mode='w:gz'):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=mode) as archive:
+        for name, data in files.items():
+            info = tarfile.TarInfo(f"repo-abc123/{name}")
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def archive_server(collector, tmp_path):
+    scheduler = RequestScheduler(concurrency=2, retry_attempts=0)
+    with LocalServer() as server:
+        collector.http_cache = HTTPCache(str(tmp_path / 'cache'), scheduler=scheduler)
+        collector.github_api = server.url('/api')
+
+        def serve(body, status=200):
+            server.routes['/api/repos/o/r/tarball/HEAD'] = lambda handler: (status, {'Content-Type': 'application/gzip'}, body)
+
+        yield serve
+    scheduler.close()
+
+
+ARCHIVE_FILES = {
+    'main.py': b'print("main")\n',
+    'pkg/util.js': b'export const x = 1;\n',
+    'README.md': b'# readme\n',
+    'big.py': b'x = 1\n' * 1000,
+    'binary.py': b'\xff\xfe\x00',
+}
+
+
+@pytest.mark.parametrize('mode', ['w', 'w:gz'])
+def test_archive_filters_extension_and_size(collector, archive_server, mode):
+    archive_server(_archive(ARCHIVE_FILES, mode))
+    files = dict(collector.iter_repository_archive('github', 'o/r', extensions={'.py', '.js'}, max_size=1000))
+    assert files == {'main.py': 'print("main")\n', 'pkg/util.js': 'export const x = 1;\n'}
+
+
+def test_archive_queues_files(collector, archive_server):
+    archive_server(_archive(ARCHIVE_FILES))
+    queue = Queue()
+    assert collector.collect_repository_archive('github', 'o/r', queue, extensions={'.py'}, max_size=100) == 1
+    item = queue.get_nowait()
+    assert item['path'] == 'main.py'
+    assert item['language'] == 'python'
+
+
+def test_truncated_archive_raises(collector, archive_server):
+    data = _archive({f"m{i}.py": f"value = {i}\n".encode() * 200 for i in range(20)})
+    archive_server(data[:len(data) // 2])
+    queue = Queue()
+    with pytest.raises((EOFError, tarfile.TarError, zlib.error)):
+        collector.collect_repository_archive('github', 'o/r', queue)
+    # 截断前的文件已入队，但不会被当作完整结果返回
+    assert not queue.empty()
+
+
+def test_archive_http_error_raises(collector, archive_server):
+    archive_server(b'not found', status=404)
+    with pytest.raises(requests.HTTPError):
+        list(collector.iter_repository_archive('github', 'o/r'))
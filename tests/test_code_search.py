@@ -0,0 +1,128 @@
+import zipfile
+
+import numpy as np
+import pytest
+
+from code_collector import CodeCollector
+from code_search import CodeSearchIndex, HashingEncoder, code_features
+
+WORDS = ['user', 'config', 'parse', 'load', 'save', 'http', 'request', 'cache', 'token', 'stream',
+         'render', 'page', 'query', 'index', 'vector', 'graph', 'node', 'edge', 'file', 'path']
+
+
+def _corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    documents = []
+    for i in range(n):
+        a, b, c, d = rng.choice(WORDS, 4, replace=False)
+        code = (f"def {a}_{b}_{i}({c}, {d}):\n"
+                f"    {c}_{a} = {a}{b.title()}({c})\n"
+                f"    return {d}.{b}_{c}({c}_{a}, '{a} {d}')\n")
+        documents.append((f"doc-{i}", code, 'python'))
+    return documents
+
+
+def _keys(results):
+    return [key for key, _ in results]
+
+
+def test_features_depend_on_language_comment_syntax():
+    assert code_features('load_user()  # parse config', 'python') == ['load', 'user', 'load user']
+    assert 'parse' in code_features('load_user()  # parse config', 'javascript')
+    assert code_features('loadUser(); // parse config', 'javascript') == ['load', 'user', 'load user']
+    # Python 的 // 是整除，后面的名称仍然是特征
+    assert 'config' in code_features('x = load // config', 'python')
+
+
+def test_search_respects_query_language():
+    index = CodeSearchIndex(None)
+    index.build([('py', 'def load_user():\n    return fetch_user()\n', 'python'),
+                 ('js', 'function loadUser() { return fetchUser(); }', 'javascript')])
+    query = 'def load_user():  # render page template\n    return fetch_user()\n'
+    assert index.search(query, k=1, language='python')[0][1] > 0.99
+    assert index.search(query, k=1, language='javascript')[0][1] < 0.99
+
+
+def test_untrained_index_uses_brute_force():
+    documents = _corpus(60)
+    index = CodeSearchIndex(None, train_threshold=1000)
+    index.build(documents)
+    assert not index.trained
+    for key, code, language in documents[:10]:
+        results = index.search(code, k=5, language=language)
+        assert results[0] == (key, pytest.approx(1.0, abs=1e-5))
+        assert results == index.exact_search(code, k=5, language=language)
+
+
+def test_ivf_is_trained_at_threshold():
+    documents = _corpus(120)
+    index = CodeSearchIndex(None, train_threshold=100)
+    index.build(documents[:99])
+    assert not index.trained
+    index.add(*documents[99])
+    assert index.trained
+    index.add_many(documents[100:])
+    assert len(index) == 120
+
+    built = CodeSearchIndex(None, train_threshold=100)
+    built.build(documents)
+    assert built.trained
+    # 探测全部簇时与精确检索一致
+    nlist = len(built._centroids)
+    for key, code, language in documents[:20]:
+        assert _keys(built.search(code, k=3, language=language, nprobe=nlist))[0] == key
+
+
+def test_add_and_remove_after_training():
+    documents = _corpus(150)
+    index = CodeSearchIndex(None, train_threshold=100)
+    index.build(documents)
+    assert index.trained
+    nlist = len(index._centroids)
+
+    query = "def vector_graph_search(edge, node):\n    return edge.graph_node(node)\n"
+    index.add('new', query, 'python')
+    assert _keys(index.search(query, k=1, nprobe=nlist)) == ['new']
+
+    index.remove('doc-0')
+    assert 'doc-0' not in index
+    assert 'doc-0' not in _keys(index.search(documents[0][1], k=10, nprobe=nlist))
+    assert 'doc-0' not in _keys(index.exact_search(documents[0][1], k=10))
+
+    # 同名键被新内容替换
+    index.add('doc-1', query, 'python')
+    assert set(_keys(index.search(query, k=2, nprobe=nlist))) == {'new', 'doc-1'}
+    assert len(index) == 150
+
+
+@pytest.mark.parametrize('train_threshold', [10, 1000])
+def test_save_and_load_round_trip(tmp_path, train_threshold):
+    path = str(tmp_path / 'search.npz')
+    documents = _corpus(80)
+    index = CodeSearchIndex(path, train_threshold=train_threshold)
+    index.build(documents)
+    index.remove('doc-3')
+    index.save()
+    with zipfile.ZipFile(path) as archive:
+        assert all(info.compress_type == zipfile.ZIP_DEFLATED for info in archive.infolist())
+
+    loaded = CodeSearchIndex(path)
+    assert len(loaded) == 79
+    assert loaded.trained == index.trained
+    assert np.allclose(loaded.encoder.idf, index.encoder.idf)
+    for key, code, language in documents[:10]:
+        assert loaded.search(code, k=5, language=language) == index.search(code, k=5, language=language)
+
+    with pytest.raises(ValueError):
+        CodeSearchIndex(path, encoder=HashingEncoder(dim=256))
+
+
+def test_build_search_index_saves_to_path(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    collector = CodeCollector()
+    for key, code, language in _corpus(5):
+        collector.store_code({'code': code, 'language': language})
+    path = str(tmp_path / 'index.npz')
+    index = collector.build_search_index(path)
+    assert index.path == path
+    assert len(CodeSearchIndex(path)) == 5
@@ -0,0 +1,181 @@
+import os
+import zlib
+
+import pytest
+
+import corpus_store
+from corpus_store import CorpusStore, _RECORD_HEADER, KIND_TEXT, _digest
+
+
+def _fill(store, n, prefix='snippet'):
+    return {store.put(f"{prefix} {i}"): f"{prefix} {i}" for i in range(n)}
+
+
+def _assert_all(store, expected):
+    assert len(store) == len(expected)
+    for key, value in expected.items():
+        assert store.get(key) == value
+
+
+def test_reopen_keeps_index(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    expected = _fill(store, 50)
+    store.close()
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _assert_all(store, expected)
+    assert store.put('snippet 3') in expected
+    assert len(store) == 50
+    store.close()
+
+
+def test_missing_index_is_rebuilt_from_packs(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    expected = _fill(store, 30)
+    store.close()
+    os.remove(tmp_path / 'index.bin')
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _assert_all(store, expected)
+    store.close()
+
+
+def test_corrupt_or_stale_index_is_rebuilt(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    expected = _fill(store, 30)
+    store.close()
+    index_path = tmp_path / 'index.bin'
+    good_index = index_path.read_bytes()
+
+    # 旧版魔数
+    index_path.write_bytes(b'CORPIDX1' + good_index[8:])
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _assert_all(store, expected)
+    store.close()
+
+    # 截断的索引文件
+    index_path.write_bytes(good_index[:100])
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _assert_all(store, expected)
+    store.close()
+
+
+def test_index_pointing_past_truncated_pack_is_rebuilt(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    first = _fill(store, 10, 'kept')
+    store.close()
+    pack = tmp_path / 'pack-00001.dat'
+    kept_size = pack.stat().st_size
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _fill(store, 10, 'lost')
+    store.close()
+    with open(pack, 'r+b') as f:
+        f.truncate(kept_size)
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _assert_all(store, first)
+    store.close()
+
+
+def test_records_written_after_last_index_update_are_indexed(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    expected = _fill(store, 5)
+    store.close()
+
+    # 模拟记录已写入包文件、索引尚未更新时崩溃
+    raw = 'written before crash'.encode('utf-8')
+    compressed = zlib.compress(raw)
+    digest = _digest(KIND_TEXT, raw)
+    with open(tmp_path / 'pack-00001.dat', 'ab') as f:
+        f.write(_RECORD_HEADER.pack(digest, KIND_TEXT, len(raw), len(compressed)))
+        f.write(compressed)
+    expected[digest.hex()] = 'written before crash'
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    _assert_all(store, expected)
+    store.close()
+
+
+def test_kind_is_part_of_the_digest(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    keys = [store.put('{"a": 1}'), store.put({'a': 1}), store.put(b'{"a": 1}')]
+    assert len(set(keys)) == 3
+    assert [store.get(key) for key in keys] == ['{"a": 1}', {'a': 1}, b'{"a": 1}']
+    assert store.put(b'{"a": 1}') == keys[2]
+    store.close()
+
+
+def test_bytes_round_trip(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    data = bytes(range(256))
+    key = store.put(data)
+    assert store.get(key) == data
+    store.close()
+    os.remove(tmp_path / 'index.bin')
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    assert store.get(key) == data
+    assert list(store.scan()) == [(key, data)]
+    store.close()
+
+
+def test_legacy_records_survive_rebuild(tmp_path):
+    # 旧版记录的摘要只覆盖内容，重建索引时不能当作损坏的记录截断
+    raw = 'legacy snippet'.encode('utf-8')
+    compressed = zlib.compress(raw)
+    legacy = corpus_store.hashlib.sha256(raw).digest()
+    with open(tmp_path / 'pack-00001.dat', 'wb') as f:
+        f.write(_RECORD_HEADER.pack(legacy, KIND_TEXT, len(raw), len(compressed)))
+        f.write(compressed)
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    assert store.get(legacy.hex()) == 'legacy snippet'
+    key = store.put('new snippet')
+    store.close()
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    assert store.get(legacy.hex()) == 'legacy snippet'
+    assert store.get(key) == 'new snippet'
+    store.close()
+
+
+def test_torn_tail_record_is_truncated(tmp_path):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    expected = _fill(store, 5)
+    store.close()
+    pack = tmp_path / 'pack-00001.dat'
+    good_size = pack.stat().st_size
+    with open(pack, 'ab') as f:
+        f.write(_RECORD_HEADER.pack(b'x' * 32, KIND_TEXT, 100, 100))
+        f.write(b'partial')
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    assert pack.stat().st_size == good_size
+    _assert_all(store, expected)
+    key = store.put('after recovery')
+    assert store.get(key) == 'after recovery'
+    assert [k for k, _ in store.scan()][-1] == key
+    store.close()
+
+
+def test_crash_during_grow_leaves_old_index_usable(tmp_path, monkeypatch):
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    expected = _fill(store, 5)
+
+    def crash(*args):
+        raise OSError("simulated crash")
+
+    monkeypatch.setattr(corpus_store.os, 'replace', crash)
+    with pytest.raises(OSError):
+        _fill(store, 10, 'growing')
+    monkeypatch.undo()
+    store._pack_file.close()
+    assert (tmp_path / 'index.bin.tmp').exists()
+
+    store = CorpusStore(str(tmp_path), initial_capacity=8)
+    assert not (tmp_path / 'index.bin.tmp').exists()
+    # 触发扩容的那条记录已写入包文件，重新打开时被补建索引
+    expected[store.put('growing 0')] = 'growing 0'
+    _assert_all(store, expected)
+    store.close()
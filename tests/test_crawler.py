@@ -0,0 +1,102 @@
+import threading
+import time
+
+import pytest
+
+from benchmarks.local_server import LocalServer
+from crawler import Crawler
+from http_cache import HTTPCache
+from request_scheduler import RequestScheduler
+
+
+def _page(title, *links):
+    anchors = ''.join(f'<li><a href="{link}">{link}</a></li>' for link in links)
+    return f"<html><head><title>{title}</title></head><body><p>{title}</p><ul>{anchors}</ul></body></html>"
+
+
+class Site:
+    """本地替身站点：记录每个路径的请求时间"""
+
+    def __init__(self, robots):
+        self.robots = robots
+        self.hits = {}
+        self._lock = threading.Lock()
+        self.server = LocalServer(default_body='', routes={
+            '/robots.txt': self._route(lambda: robots, 'text/plain'),
+            '/sitemap_index.xml': self._route(lambda: self._sitemap_index(), 'application/xml'),
+            '/sitemap.xml': self._route(lambda: self._sitemap(), 'application/xml'),
+            '/': self._route(lambda: _page('home', '/a', '/private/secret', 'http://elsewhere.test/x')),
+            '/a': self._route(lambda: _page('a', '/b', '/#top')),
+            '/b': self._route(lambda: _page('b')),
+            '/fresh': self._route(lambda: _page('fresh')),
+            '/stale': self._route(lambda: _page('stale')),
+            '/private/secret': self._route(lambda: _page('secret')),
+        })
+
+    def _route(self, body, content_type='text/html; charset=utf-8'):
+        def handle(handler):
+            with self._lock:
+                self.hits.setdefault(handler.path, []).append(time.monotonic())
+            return 200, {'Content-Type': content_type}, body()
+        return handle
+
+    def _sitemap_index(self):
+        return (f'<?xml version="1.0"?><sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f'<sitemap><loc>{self.server.url("/sitemap.xml")}</loc></sitemap></sitemapindex>')
+
+    def _sitemap(self):
+        return ('<?xml version="1.0"?><urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+                f'<url><loc>{self.server.url("/stale")}</loc><lastmod>2001-01-01</lastmod></url>'
+                f'<url><loc>{self.server.url("/fresh")}</loc><lastmod>2024-06-01</lastmod></url>'
+                '</urlset>')
+
+
+@pytest.fixture
+def crawl(tmp_path):
+    schedulers = []
+
+    def run(robots, **kwargs):
+        site = Site(robots)
+        scheduler = RequestScheduler(concurrency=4, host_rate=1000, host_burst=1000)
+        schedulers.append(scheduler)
+        cache = HTTPCache(cache_dir=str(tmp_path / f"cache{len(schedulers)}"), scheduler=scheduler)
+        with site.server:
+            site.robots = robots.replace('{base}', site.server.base_url)
+            site.server.routes['/robots.txt'] = site._route(lambda: site.robots, 'text/plain')
+            kwargs.setdefault('concurrency', 4)
+            pages = list(Crawler(cache, **kwargs).crawl([site.server.url('/')]))
+        return site, pages
+
+    yield run
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def test_robots_disallow_and_sitemap_index(crawl):
+    site, pages = crawl("User-agent: *\nDisallow: /private\nSitemap: {base}/sitemap_index.xml\n")
+    paths = {page['url'].split('/', 3)[-1] for page in pages}
+    assert paths == {'', 'a', 'b', 'fresh', 'stale'}
+    assert '/private/secret' not in site.hits
+    assert '/sitemap.xml' in site.hits
+    home = next(page for page in pages if page['title'] == 'home')
+    assert home['depth'] == 0
+    assert home['text'] == 'home\nhome\n/a\n/private/secret\nhttp://elsewhere.test/x'
+
+
+def test_sitemap_lastmod_orders_frontier(crawl):
+    site, pages = crawl("User-agent: *\nSitemap: {base}/sitemap.xml\n", concurrency=1, max_depth=0)
+    assert [page['title'] for page in pages] == ['home', 'fresh', 'stale']
+
+
+def test_crawl_delay_spaces_requests(crawl):
+    # 小数延迟向上取整为 1 秒
+    site, pages = crawl("User-agent: *\nCrawl-delay: 0.5\n", use_sitemaps=False, max_pages=3)
+    assert len(pages) == 3
+    times = sorted(hit for path, hits in site.hits.items() if path != '/robots.txt' for hit in hits)
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert min(gaps) >= 0.99
+
+
+def test_page_budget(crawl):
+    site, pages = crawl("User-agent: *\nSitemap: {base}/sitemap.xml\n", max_pages=2)
+    assert len(pages) == 2
@@ -0,0 +1,108 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from benchmarks.local_server import LocalServer
+from data_collector import DataCollector
+from enhanced_data_collector import EnhancedDataCollector
+from http_cache import HTTPCache
+from request_scheduler import RequestScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RequestScheduler(concurrency=8, retry_attempts=0)
+    yield scheduler
+    scheduler.close()
+
+
+@pytest.fixture
+def http_cache(tmp_path, scheduler):
+    return HTTPCache(str(tmp_path / 'cache'), scheduler=scheduler)
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch, http_cache):
+    monkeypatch.chdir(tmp_path)
+    collector = DataCollector()
+    collector.http_cache = http_cache
+    return collector
+
+
+def _concurrency_route(delay=0.05):
+    state = {'active': 0, 'peak': 0}
+    lock = threading.Lock()
+
+    def route(handler):
+        with lock:
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+        time.sleep(delay)
+        with lock:
+            state['active'] -= 1
+        return 200, {}, '<html><body><p>page</p></body></html>'
+
+    return route, state
+
+
+def test_batch_goes_through_scheduler_and_cache(collector, scheduler):
+    with LocalServer() as server:
+        urls = [server.url(f"/page/{i}") for i in range(10)] + [server.url('/missing')]
+        results = dict(collector.collect_web_data_many(urls, concurrency=4))
+        assert sorted(results) == sorted(urls)
+        assert all(results[url].find('p') is not None for url in urls)
+        assert scheduler.stats()[server.base_url.split('//')[1]]['completed'] == 11
+
+        # 第二批全部命中HTTP缓存
+        again = dict(collector.collect_web_data_many(urls, concurrency=4))
+        assert len(again) == 11
+        assert server.request_count == 11
+
+
+def test_batch_respects_per_host_limit(collector):
+    route, state = _concurrency_route()
+    with LocalServer({'/slow': route}) as server:
+        urls = [server.url(f"/slow?i={i}") for i in range(12)]
+        results = list(collector.collect_web_data_many(urls, concurrency=8, per_host=2))
+    assert len(results) == 12
+    assert all(soup is not None for _, soup in results)
+    assert state['peak'] <= 2
+
+
+def test_batch_applies_host_rate_limit(collector, scheduler):
+    with LocalServer() as server:
+        scheduler.set_host_limit(server.base_url.split('//')[1], 20, burst=1)
+        urls = [server.url(f"/limited/{i}") for i in range(10)]
+        start = time.monotonic()
+        results = list(collector.collect_web_data_many(urls, concurrency=10, per_host=10))
+        elapsed = time.monotonic() - start
+    assert len(results) == 10
+    # 20 次/秒、突发 1：10 个请求至少约 0.45 秒
+    assert elapsed >= 0.4
+
+
+def test_batch_failure_yields_none(collector):
+    def broken(handler):
+        return 500, {}, 'error'
+
+    with LocalServer({'/broken': broken}) as server:
+        results = dict(collector.collect_web_data_many([server.url('/broken'), server.url('/ok')]))
+    assert results[server.url('/broken')] is None
+    assert results[server.url('/ok')] is not None
+
+
+def test_api_data_goes_through_scheduler(tmp_path, monkeypatch, http_cache, scheduler):
+    monkeypatch.chdir(tmp_path)
+    collector = EnhancedDataCollector()
+    collector.http_cache = http_cache
+
+    def api(handler):
+        return 200, {'Content-Type': 'application/json'}, json.dumps({'ok': True})
+
+    with LocalServer({'/api': api}) as server:
+        assert asyncio.run(collector.collect_api_data(server.url('/api'))) == {'ok': True}
+        assert scheduler.stats()[server.base_url.split('//')[1]]['completed'] == 1
+    collector.sqlite_pool.close()
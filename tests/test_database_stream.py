@@ -0,0 +1,97 @@
+import sqlite3
+
+import pyarrow as pa
+import pytest
+
+from db_pool import SQLiteConnectionPool
+from enhanced_data_collector import EnhancedDataCollector
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = str(tmp_path / 'data.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE prices (id INTEGER PRIMARY KEY, symbol TEXT, price REAL)')
+    # 后 5 行的 symbol 和 price 全为 NULL
+    conn.executemany('INSERT INTO prices VALUES (?, ?, ?)',
+                     [(i, f"S{i}" if i < 5 else None, i * 1.5 if i < 5 else None) for i in range(10)])
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch, database):
+    monkeypatch.chdir(tmp_path)
+    collector = EnhancedDataCollector()
+    collector.sqlite_pool = SQLiteConnectionPool(database, size=1)
+    yield collector
+    collector.sqlite_pool.close()
+
+
+def test_arrow_chunks_share_first_schema(collector):
+    batches = list(collector.stream_database_data('SELECT * FROM prices ORDER BY id', chunksize=5, as_arrow=True))
+    assert len(batches) == 2
+    assert batches[1].schema == batches[0].schema
+    assert batches[0].schema.field('price').type == pa.float64()
+    table = pa.Table.from_batches(batches)
+    assert table.num_rows == 10
+    assert table.column('symbol').null_count == 5
+
+
+def test_explicit_schema(collector):
+    schema = pa.schema([('id', pa.int32()), ('symbol', pa.string()), ('price', pa.float32())])
+    batches = list(collector.stream_database_data('SELECT * FROM prices ORDER BY id DESC', chunksize=4,
+                                                  as_arrow=True, schema=schema))
+    assert all(batch.schema == schema for batch in batches)
+
+
+def test_abandoned_stream_returns_connection(collector):
+    stream = collector.stream_database_data('SELECT * FROM prices', chunksize=2)
+    next(stream)
+    stream.close()
+    # 池大小为 1：连接未归还时这里会超时
+    with collector.sqlite_pool.connection(timeout=0.1) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM prices').fetchone() == (10,)
+
+
+def test_stream_error_is_raised(collector):
+    with pytest.raises(sqlite3.OperationalError):
+        list(collector.stream_database_data('SELECT * FROM missing_table'))
+    with collector.sqlite_pool.connection(timeout=0.1):
+        pass
+
+
+def test_pool_rolls_back_on_error(database):
+    pool = SQLiteConnectionPool(database, size=1)
+    with pytest.raises(RuntimeError):
+        with pool.connection() as conn:
+            conn.execute('DELETE FROM prices')
+            raise RuntimeError("boom")
+    with pool.connection(timeout=0.1) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM prices').fetchone() == (10,)
+    pool.close()
+
+
+def test_null_typed_column_is_promoted_when_values_appear(collector):
+    # 按 id 降序时第一块的 symbol 和 price 全为 NULL
+    batches = list(collector.stream_database_data('SELECT * FROM prices ORDER BY id DESC', chunksize=5,
+                                                  as_arrow=True))
+    assert len(batches) == 2
+    assert batches[0].schema.field('price').type == pa.null()
+    assert batches[1].schema.field('price').type == pa.float64()
+    assert batches[1].schema.field('symbol').type == pa.string()
+    table = pa.concat_tables([pa.Table.from_batches([batch]) for batch in batches], promote_options='default')
+    assert table.num_rows == 10
+    assert table.column('price').null_count == 5
+    assert sorted(table.column('price').drop_null().to_pylist()) == [0.0, 1.5, 3.0, 4.5, 6.0]
+
+
+def test_null_typed_column_is_promoted_for_records(collector):
+    first = collector._records_to_chunk([{'a': 1, 'b': None}], as_arrow=True)
+    second = collector._records_to_chunk([{'a': 2, 'b': 'x'}], as_arrow=True, schema=first.schema)
+    assert first.schema.field('b').type == pa.null()
+    assert second.schema.field('b').type == pa.string()
+    assert second.column(1).to_pylist() == ['x']
+    third = collector._records_to_chunk([{'a': 3, 'b': None}], as_arrow=True, schema=second.schema)
+    assert third.schema == second.schema
@@ -0,0 +1,157 @@
+import os
+import random
+
+import networkx as nx
+import pytest
+
+import code_analyzer
+from analysis_cache import AnalysisCache
+from code_analyzer import CodeAnalyzer, DependencyGraph
+
+
+@pytest.fixture
+def analyzer(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return CodeAnalyzer()
+
+
+def _module(root, name, imports=(), functions=None):
+    """直接构造 analyze_file 的结果，不需要磁盘上的文件"""
+    functions = functions or {}
+    return {'path': os.path.join(str(root), *name.split('.')) + '.py', 'language': 'python', 'error': None,
+            'analysis': {'imports': list(imports),
+                         'functions': [{'name': fn, 'calls': calls} for fn, calls in functions.items()]}}
+
+
+def _write(root, relative, text):
+    path = root / relative
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return str(path)
+
+
+def _expected_cycles(graph):
+    return sorted(sorted(c) for c in nx.strongly_connected_components(graph.imports) if len(c) > 1)
+
+
+def _cycles(graph):
+    return sorted(sorted(c) for c in graph.cycles())
+
+
+def test_cycles_follow_incremental_edge_changes(tmp_path):
+    graph = DependencyGraph(str(tmp_path))
+    graph.update_many([_module(tmp_path, 'a', ['b']), _module(tmp_path, 'b', ['c']), _module(tmp_path, 'c')])
+    assert graph.cycles() == []
+
+    # 新增边闭合环
+    graph.update(_module(tmp_path, 'c', ['a']))
+    assert graph.cycle_of('b') == {'a', 'b', 'c'}
+
+    # 删除环上的一条边，环拆开
+    graph.update(_module(tmp_path, 'b'))
+    assert graph.cycles() == []
+    assert graph.dependencies('a') == {'b'}
+    assert graph.dependents('a') == {'c'}
+
+    # 两个独立的环之间双向连通后合并为一个分量，断开后再拆开
+    graph.update_many([_module(tmp_path, 'b', ['a']), _module(tmp_path, 'd', ['c']), _module(tmp_path, 'c', ['d'])])
+    assert _cycles(graph) == [['a', 'b'], ['c', 'd']]
+    graph.update_many([_module(tmp_path, 'a', ['b', 'c']), _module(tmp_path, 'c', ['a', 'd'])])
+    assert _cycles(graph) == [['a', 'b', 'c', 'd']]
+    graph.update(_module(tmp_path, 'c', ['d']))
+    assert _cycles(graph) == [['a', 'b'], ['c', 'd']]
+
+
+def test_removing_a_node_updates_edges_and_cycles(tmp_path):
+    graph = DependencyGraph(str(tmp_path))
+    graph.update_many([_module(tmp_path, 'pkg'), _module(tmp_path, 'pkg.a', ['pkg.b']),
+                       _module(tmp_path, 'pkg.b', ['pkg.a', 'pkg.c']), _module(tmp_path, 'pkg.c')])
+    assert graph.cycle_of('pkg.a') == {'pkg.a', 'pkg.b'}
+    assert graph.impact('pkg.c') == {'pkg.a', 'pkg.b'}
+
+    graph.remove(os.path.join(str(tmp_path), 'pkg', 'a.py'))
+    assert 'pkg.a' not in graph.imports
+    assert graph.cycles() == []
+    assert graph.dependents('pkg.b') == set()
+
+    # 导入 pkg.c 的模块在 pkg.c 消失后解析到包本身，重新加入后恢复
+    graph.remove(os.path.join(str(tmp_path), 'pkg', 'c.py'))
+    assert graph.dependencies('pkg.b') == {'pkg'}
+    graph.update(_module(tmp_path, 'pkg.c'))
+    assert graph.dependencies('pkg.b') == {'pkg', 'pkg.c'}
+
+
+def test_update_with_failed_analysis_removes_node(tmp_path):
+    graph = DependencyGraph(str(tmp_path))
+    graph.update_many([_module(tmp_path, 'a', ['b']), _module(tmp_path, 'b', ['a'])])
+    assert graph.cycle_of('a') == {'a', 'b'}
+    graph.update({'path': os.path.join(str(tmp_path), 'b.py'), 'language': 'python', 'analysis': None})
+    assert 'b' not in graph.imports
+    assert graph.cycles() == []
+
+
+def test_random_edits_match_full_recomputation(tmp_path):
+    rng = random.Random(7)
+    names = [f"m{i}" for i in range(12)]
+    graph = DependencyGraph(str(tmp_path))
+    graph.update_many(_module(tmp_path, name) for name in names)
+    assert graph.cycles() == []
+    for _ in range(200):
+        name = rng.choice(names)
+        if rng.random() < 0.15:
+            graph.remove(_module(tmp_path, name)['path'])
+        else:
+            graph.update(_module(tmp_path, name, rng.sample(names, rng.randint(0, 2))))
+        assert _cycles(graph) == _expected_cycles(graph)
+
+
+def test_call_edges_follow_imports(tmp_path):
+    graph = DependencyGraph(str(tmp_path))
+    graph.update(_module(tmp_path, 'app', ['lib.run', 'lib'],
+                         functions={'main': ['run', 'lib.stop', 'local'], 'local': []}))
+    assert graph.callees('app', 'main') == {'app:local'}
+    graph.update(_module(tmp_path, 'lib', functions={'run': [], 'stop': []}))
+    assert graph.callees('app', 'main') == {'lib:run', 'lib:stop', 'app:local'}
+    assert graph.callers('lib', 'run') == {'app:main'}
+    graph.update(_module(tmp_path, 'lib', functions={'stop': []}))
+    assert graph.callees('app', 'main') == {'lib:stop', 'app:local'}
+
+
+def test_update_dependency_graph_from_files(analyzer, tmp_path):
+    root = tmp_path / 'src'
+    _write(root, 'pkg/__init__.py', '')
+    a = _write(root, 'pkg/a.py', 'from pkg import b\n\ndef run():\n    return b.helper()\n')
+    b = _write(root, 'pkg/b.py', 'def helper():\n    return 1\n')
+    graph = analyzer.build_dependency_graph(str(root), workers=1)
+    assert graph.dependencies('pkg.a') == {'pkg.b'}
+    assert graph.callees('pkg.a', 'run') == {'pkg.b:helper'}
+
+    _write(root, 'pkg/b.py', 'from pkg.a import run\n\ndef helper():\n    return run()\n')
+    analyzer.update_dependency_graph(graph, [b])
+    assert graph.cycle_of('pkg.a') == {'pkg.a', 'pkg.b'}
+
+    os.remove(a)
+    analyzer.update_dependency_graph(graph, [a])
+    assert graph.cycles() == []
+    assert 'pkg.a' not in graph.imports
+
+
+def test_single_path_is_reanalyzed_without_process_pool(analyzer, tmp_path, monkeypatch):
+    root = tmp_path / 'src'
+    path = _write(root, 'a.py', 'def f():\n    return 1\n')
+    graph = DependencyGraph(str(root))
+    cache = AnalysisCache(str(tmp_path / 'cache.db'))
+
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started for a single path")
+
+    monkeypatch.setattr(code_analyzer, 'ProcessPoolExecutor', no_pool)
+    analyzed = []
+    analyze_file = analyzer.analyze_file
+    monkeypatch.setattr(analyzer, 'analyze_file', lambda p: analyzed.append(p) or analyze_file(p))
+
+    analyzer.update_dependency_graph(graph, [path], cache=cache)
+    analyzer.update_dependency_graph(graph, [path], cache=cache)
+    assert analyzed == [path]
+    assert 'a' in graph.imports
+    cache.close()
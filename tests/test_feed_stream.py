@@ -0,0 +1,114 @@
+import io
+import xml.etree.ElementTree as ET
+
+import pytest
+import requests
+
+from benchmarks.local_server import LocalServer
+from enhanced_data_collector import EnhancedDataCollector
+from feed_stream import SeenIndex, iter_feed_items, record_guid
+from http_cache import HTTPCache
+from request_scheduler import RequestScheduler
+
+RSS = """<?xml version="1.0"?>
+<rss><channel><title>t</title>
+{items}
+</channel></rss>"""
+
+
+def _rss(n):
+    items = ''.join(f"<item><guid>g{i}</guid><title>item {i}</title></item>" for i in range(n))
+    return RSS.format(items=items)
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    scheduler = RequestScheduler(concurrency=2, retry_attempts=0)
+    collector = EnhancedDataCollector()
+    collector.http_cache = HTTPCache(str(tmp_path / 'cache'), scheduler=scheduler)
+    yield collector
+    collector.sqlite_pool.close()
+    scheduler.close()
+
+
+@pytest.fixture
+def seen(tmp_path):
+    seen = SeenIndex(str(tmp_path / 'seen.db'))
+    yield seen
+    seen.close()
+
+
+def test_iter_feed_items_handles_rss_atom_and_sitemaps():
+    atom = ('<feed xmlns="http://www.w3.org/2005/Atom"><entry><id>a1</id>'
+            '<link href="https://example.com/a1"/><category>x</category><category>y</category></entry></feed>')
+    sitemap = ('<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+               '<url><loc>https://example.com/</loc></url></urlset>')
+    assert [r['title'] for r in iter_feed_items(io.StringIO(_rss(3)))] == ['item 0', 'item 1', 'item 2']
+    assert list(iter_feed_items(io.StringIO(atom))) == [
+        {'id': 'a1', 'link': 'https://example.com/a1', 'category': ['x', 'y']}]
+    assert list(iter_feed_items(io.StringIO(sitemap), with_tag=True)) == [('url', {'loc': 'https://example.com/'})]
+
+
+def test_record_guid_falls_back_to_content_hash():
+    assert record_guid({'link': 'https://example.com/a', 'title': 'a'}) == 'https://example.com/a'
+    assert record_guid({'title': 'a'}) == record_guid({'title': 'a'})
+    assert record_guid({'title': 'a'}) != record_guid({'title': 'b'})
+
+
+def test_seen_index_persists_across_reopen(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    seen = SeenIndex(path)
+    assert seen.add('feed', 'g1') is True
+    assert seen.add('feed', 'g1') is False
+    seen.close()
+
+    seen = SeenIndex(path)
+    assert ('feed', 'g1') in seen
+    assert ('other', 'g1') not in seen
+    seen.close()
+
+
+def test_stream_skips_items_seen_in_earlier_polls(collector, seen):
+    with LocalServer({'/feed': _rss(3)}) as server:
+        first = list(collector.stream_xml_feed(server.url('/feed'), seen_index=seen))
+        server.routes['/feed'] = _rss(5)
+        second = list(collector.stream_xml_feed(server.url('/feed'), seen_index=seen))
+    assert [r['guid'] for r in first] == ['g0', 'g1', 'g2']
+    assert [r['guid'] for r in second] == ['g3', 'g4']
+
+
+def test_item_is_not_marked_seen_until_consumer_moves_on(collector, seen):
+    with LocalServer({'/feed': _rss(3)}) as server:
+        url = server.url('/feed')
+        stream = collector.stream_xml_feed(url, seen_index=seen)
+        assert next(stream)['guid'] == 'g0'
+        assert next(stream)['guid'] == 'g1'
+        # 处理 g1 期间调用方提前关闭生成器
+        stream.close()
+        assert (url, 'g0') in seen
+        assert (url, 'g1') not in seen
+
+        assert [r['guid'] for r in collector.stream_xml_feed(url, seen_index=seen)] == ['g1', 'g2']
+
+
+def test_truncated_feed_raises(collector, seen):
+    truncated = _rss(3)[:-40]
+    with LocalServer({'/feed': truncated}) as server:
+        url = server.url('/feed')
+        received = []
+        with pytest.raises(ET.ParseError):
+            for record in collector.stream_xml_feed(url, seen_index=seen):
+                received.append(record['guid'])
+    assert received == ['g0', 'g1']
+    # 已处理的条目仍然记为已见并落盘
+    assert (url, 'g1') in seen
+
+
+def test_http_error_raises(collector):
+    def broken(handler):
+        return 503, {}, 'unavailable'
+
+    with LocalServer({'/feed': broken}) as server:
+        with pytest.raises(requests.HTTPError):
+            list(collector.stream_xml_feed(server.url('/feed')))
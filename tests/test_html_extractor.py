@@ -0,0 +1,82 @@
+import pytest
+
+from html_extractor import HTMLExtractor, charset_from_content_type, parse_selector, sniff_encoding
+
+
+def test_meta_charset_is_used_for_bytes():
+    html = '<html><head><meta charset="gbk"><title>标题</title></head><body><p>第一段</p></body></html>'
+    assert HTMLExtractor('text', chunk_size=5).extract(html.encode('gbk'))['text'] == '标题\n第一段'
+
+
+def test_http_equiv_charset_is_used_for_bytes():
+    html = ('<html><head><meta http-equiv="Content-Type" content="text/html; charset=windows-1251">'
+            '</head><body><p>Привет</p></body></html>')
+    assert HTMLExtractor('text').extract(html.encode('cp1251'))['text'] == 'Привет'
+
+
+def test_http_charset_without_meta():
+    html = '<p>无声明</p>'.encode('gbk')
+    assert HTMLExtractor('text').extract(html, encoding='gbk')['text'] == '无声明'
+
+
+def test_charset_helpers():
+    assert charset_from_content_type('text/html; charset="Shift_JIS"') == 'Shift_JIS'
+    assert charset_from_content_type('text/html') is None
+    assert charset_from_content_type('text/html; charset=bogus') is None
+    assert sniff_encoding(b'\xef\xbb\xbf<p>x</p>') == 'utf-8-sig'
+    assert sniff_encoding(b'<p>x</p>') is None
+
+
+def test_block_elements_are_separated():
+    html = '<div>intro<p>first</p><ul><li>one</li><li>two</li></ul>tail<br>next <b>bold</b> word</div>'
+    assert HTMLExtractor('text').extract(html)['text'] == 'intro\nfirst\none\ntwo\ntail\nnext bold word'
+
+
+def test_selector_captures_collapse_whitespace():
+    html = '<div class="a"><p>x</p><p>y</p></div><a href="/z">q</a>'
+    result = HTMLExtractor({'body': 'div.a', 'links': 'a@href'}).extract(html)
+    assert result == {'body': ['x y'], 'links': ['/z']}
+
+
+@pytest.mark.parametrize('selector, combinators', [
+    ('p', []),
+    ('a b', [' ']),
+    ('a > b', ['>']),
+    ('a>b c', ['>', ' ']),
+    ('a b > c', [' ', '>']),
+    ('a > b c d', ['>', ' ', ' ']),
+    ('h2 + p ~ ul', ['+', '~']),
+])
+def test_one_combinator_between_compounds(selector, combinators):
+    compounds, parsed, _ = parse_selector(selector)
+    assert parsed == combinators
+    assert len(compounds) == len(parsed) + 1
+
+
+@pytest.mark.parametrize('selector', ['> a', 'a >', 'a > > b', 'a + ~ b'])
+def test_dangling_combinators_are_rejected(selector):
+    with pytest.raises(ValueError):
+        parse_selector(selector)
+
+
+PAGE = '''
+<div class="x"><p><span>child-p</span></p><section><p><span>grandchild-p</span></p></section></div>
+<section><p><span>outside</span></p></section>
+<article><h2>t</h2><p>adjacent</p><p>later</p><ul><li>list</li></ul></article>
+'''
+
+
+@pytest.mark.parametrize('selector, expected', [
+    ('div.x span', ['child-p', 'grandchild-p']),
+    ('div.x > p span', ['child-p']),
+    ('div.x p > span', ['child-p', 'grandchild-p']),
+    ('div.x > section > p > span', ['grandchild-p']),
+    ('section p span', ['grandchild-p', 'outside']),
+    ('div > section span', ['grandchild-p']),
+    ('h2 + p', ['adjacent']),
+    ('h2 ~ p', ['adjacent', 'later']),
+    ('h2 + p ~ ul > li', ['list']),
+    ('h2 + ul', []),
+])
+def test_combinator_chains(selector, expected):
+    assert HTMLExtractor({'found': selector}).extract(PAGE)['found'] == expected
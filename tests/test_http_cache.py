@@ -0,0 +1,154 @@
+import json
+
+import pytest
+
+from benchmarks.local_server import LocalServer
+from http_cache import HTTPCache
+from request_scheduler import RequestScheduler
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RequestScheduler(concurrency=2, retry_attempts=0)
+    yield scheduler
+    scheduler.close()
+
+
+@pytest.fixture
+def cache(tmp_path, scheduler):
+    return HTTPCache(str(tmp_path / 'cache'), scheduler=scheduler)
+
+
+class Resource:
+    """带 ETag / Last-Modified 的资源，支持条件请求，记录收到的请求头"""
+
+    def __init__(self, etag='"v1"', last_modified=None, body='v1', headers=None):
+        self.etag = etag
+        self.last_modified = last_modified
+        self.body = body
+        self.headers = dict(headers or {})
+        self.requests = []
+
+    def __call__(self, handler):
+        self.requests.append(dict(handler.headers))
+        headers = dict(self.headers)
+        if self.etag:
+            headers['ETag'] = self.etag
+        if self.last_modified:
+            headers['Last-Modified'] = self.last_modified
+        if self.etag and handler.headers.get('If-None-Match') == self.etag:
+            return 304, headers, b''
+        if (not self.etag and self.last_modified
+                and handler.headers.get('If-Modified-Since') == self.last_modified):
+            return 304, headers, b''
+        return 200, headers, self.body
+
+
+def _expire(cache):
+    cache.cache_duration = 0
+
+
+def test_hit_and_miss(cache):
+    resource = Resource()
+    with LocalServer({'/r': resource}) as server:
+        assert cache.get(server.url('/r')).text == 'v1'
+        assert cache.get(server.url('/r')).text == 'v1'
+        assert cache.get(server.url('/r'), params={'page': 2}).text == 'v1'
+    assert len(resource.requests) == 2
+    assert cache.stats == {'hits': 1, 'misses': 2, 'revalidations': 0}
+
+
+def test_etag_revalidation(cache):
+    resource = Resource()
+    with LocalServer({'/r': resource}) as server:
+        cache.get(server.url('/r'))
+        _expire(cache)
+        response = cache.get(server.url('/r'))
+    assert response.status_code == 200
+    assert response.text == 'v1'
+    assert resource.requests[1]['If-None-Match'] == '"v1"'
+    assert cache.stats['revalidations'] == 1
+
+
+def test_last_modified_revalidation(cache):
+    resource = Resource(etag=None, last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    with LocalServer({'/r': resource}) as server:
+        cache.get(server.url('/r'))
+        _expire(cache)
+        assert cache.get(server.url('/r')).text == 'v1'
+    assert resource.requests[1]['If-Modified-Since'] == 'Mon, 01 Jan 2024 00:00:00 GMT'
+    assert cache.stats['revalidations'] == 1
+
+
+def test_validators_from_304_are_saved(cache):
+    resource = Resource()
+    with LocalServer({'/r': resource}) as server:
+        cache.get(server.url('/r'))
+        _expire(cache)
+
+        def not_modified_with_new_etag(handler):
+            resource.requests.append(dict(handler.headers))
+            return 304, {'ETag': '"v2"'}, b''
+
+        server.routes['/r'] = not_modified_with_new_etag
+        cache.get(server.url('/r'))
+        cache.get(server.url('/r'))
+    assert [request.get('If-None-Match') for request in resource.requests] == [None, '"v1"', '"v2"']
+
+
+def test_changed_resource_replaces_entry(cache):
+    resource = Resource()
+    with LocalServer({'/r': resource}) as server:
+        cache.get(server.url('/r'))
+        _expire(cache)
+        resource.etag, resource.body = '"v2"', 'v2'
+        assert cache.get(server.url('/r')).text == 'v2'
+        cache.cache_duration = 3600
+        assert cache.get(server.url('/r')).text == 'v2'
+    assert len(resource.requests) == 2
+
+
+def test_key_headers_select_representation(cache):
+    def negotiate(handler):
+        if handler.headers.get('Accept') == 'application/json':
+            return 200, {'Content-Type': 'application/json'}, json.dumps({'format': 'json'})
+        return 200, {}, '<p>html</p>'
+
+    with LocalServer({'/r': negotiate}) as server:
+        assert cache.get(server.url('/r')).text == '<p>html</p>'
+        assert cache.get(server.url('/r'), headers={'Accept': 'application/json'}).json() == {'format': 'json'}
+        assert cache.get(server.url('/r'), headers={'accept': 'application/json'}).json() == {'format': 'json'}
+        assert cache.get(server.url('/r')).text == '<p>html</p>'
+        assert server.request_count == 2
+
+        cache.get(server.url('/r'), headers={'Authorization': 'token a'})
+        cache.get(server.url('/r'), headers={'Authorization': 'token b'})
+        assert server.request_count == 4
+
+
+def test_vary_header_is_respected(cache):
+    resource = Resource(headers={'Vary': 'X-Variant'})
+    with LocalServer({'/r': resource}) as server:
+        cache.get(server.url('/r'), headers={'X-Variant': 'a'})
+        cache.get(server.url('/r'), headers={'X-Variant': 'a'})
+        cache.get(server.url('/r'), headers={'X-Variant': 'b'})
+    assert len(resource.requests) == 2
+    assert 'If-None-Match' not in resource.requests[1]
+
+
+def test_uncacheable_responses(cache):
+    with LocalServer({'/no-store': Resource(headers={'Cache-Control': 'no-store'}),
+                      '/vary-star': Resource(headers={'Vary': '*'})}) as server:
+        for path in ('/no-store', '/vary-star'):
+            cache.get(server.url(path))
+            cache.get(server.url(path))
+        assert server.request_count == 4
+
+
+def test_no_store_request_bypasses_cache(cache):
+    resource = Resource()
+    with LocalServer({'/r': resource}) as server:
+        cache.get(server.url('/r'))
+        cache.get(server.url('/r'), no_store=True)
+    assert len(resource.requests) == 2
+    assert 'If-None-Match' not in resource.requests[1]
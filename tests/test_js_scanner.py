@@ -0,0 +1,105 @@
+import pytest
+
+from js_scanner import scan_javascript
+
+
+def _names(code):
+    return [function['name'] for function in scan_javascript(code)['functions']]
+
+
+def _modules(code):
+    return [(entry['module'], entry['type']) for entry in scan_javascript(code)['imports']]
+
+
+def test_declarations_and_complexity():
+    result = scan_javascript('''
+        function load(path) {
+            if (path) { for (const p of path) { while (p) {} } }
+        }
+        class Loader extends Base {}
+        class Plain {}
+    ''')
+    assert result['functions'] == [{'name': 'load', 'type': 'function'}]
+    assert result['classes'] == [{'name': 'Loader', 'extends': 'Base'}, {'name': 'Plain', 'extends': None}]
+    # 基础 1 + function + if + for + while
+    assert result['complexity'] == 5
+
+
+def test_comments_are_ignored():
+    code = '''
+        // function lineComment() {}
+        /* function blockComment() {}
+           import x from "commented"; */
+        function real() {} // if (x) {}
+    '''
+    assert _names(code) == ['real']
+    assert _modules(code) == []
+    assert scan_javascript(code)['complexity'] == 2
+    assert _names('function a() {} /* unterminated function b() {}') == ['a']
+
+
+def test_strings_are_ignored():
+    code = '''
+        const a = "function inDouble() {} // not a comment";
+        const b = 'it\\'s function inSingle() {}';
+        function afterStrings() {}
+    '''
+    assert _names(code) == ['afterStrings']
+
+
+def test_template_literals():
+    code = '''
+        const text = `function inTemplate() {} ${ items.map(item => `${item}`) } if (x)`;
+        const nested = `${ { a: `${ (function inner() {})() }` }.a }`;
+        function after() {}
+    '''
+    assert _names(code) == ['inner', 'after']
+    # 模板文本中的 if 不计入，表达式中的箭头函数计入
+    assert scan_javascript('const t = `if (a) while (b)`;')['complexity'] == 1
+    assert scan_javascript('const t = `${x => x}`;')['complexity'] == 2
+    assert _names('const t = `\\${ function escaped() {} }`; function real() {}') == ['real']
+
+
+@pytest.mark.parametrize('code, expected', [
+    ('const r = /function inRegex() {}/g; function after() {}', ['after']),
+    ('if (/\\/function x\\//.test(s)) {} function after() {}', ['after']),
+    ('const r = /[/]function y/; function after() {}', ['after']),
+    ('return /function z() {}/; function after() {}', ['after']),
+    # 除号：前面是标识符、数字或右括号
+    ('const half = total / 2; const q = (a) / b / c; function after() {}', ['after']),
+    ('const x = a / 2 / function divided() {}', ['divided']),
+])
+def test_regex_versus_division(code, expected):
+    assert _names(code) == expected
+
+
+def test_imports():
+    code = '''
+        import React, { useState } from 'react';
+        import * as path from "path";
+        import './side-effect.css';
+        const fs = require('fs');
+        const lazy = require ( "lodash/fp" );
+        obj.import('not-an-import');
+    '''
+    assert _modules(code) == [('react', 'es6'), ('path', 'es6'), ('./side-effect.css', 'es6'),
+                              ('fs', 'require'), ('lodash/fp', 'require')]
+
+
+def test_arrow_functions():
+    code = '''
+        const add = (a, b) => a + b;
+        let square = x => x * x;
+        const fetchAll = async (urls) => Promise.all(urls.map(u => fetch(u)));
+        handlers.push(() => {});
+    '''
+    result = scan_javascript(code)
+    assert [(f['name'], f['type']) for f in result['functions']] == [
+        ('add', 'arrow_function'), ('square', 'arrow_function'), ('fetchAll', 'arrow_function')]
+    # 基础 1 + 3 个命名箭头函数 + 2 个匿名箭头
+    assert result['complexity'] == 6
+
+
+def test_property_access_is_not_a_keyword():
+    assert scan_javascript('obj.if = 1; obj.function = 2; x.class = 3;') == {
+        'functions': [], 'classes': [], 'imports': [], 'complexity': 1}
@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from near_duplicates import NearDuplicateIndex, find_clones, normalize_tokens
+
+FUNCTION = '''
+def total(items):
+    result = 0
+    for item in items:
+        if item.price > 0:
+            result += item.price * item.quantity
+    return result
+'''
+
+OTHER = '''
+class Parser:
+    def __init__(self, text):
+        self.text = text
+        self.position = 0
+
+    def peek(self):
+        return self.text[self.position]
+'''
+
+
+def _variant(code, n):
+    """带不同注释和缩进空白、语义相同的代码"""
+    lines = [f"# revision {n}"]
+    for line in code.strip().splitlines():
+        lines.append(line.replace('    ', '\t' if n % 2 else '  ') + f"  # note {n}")
+    return '\n'.join(lines) + '\n'
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = NearDuplicateIndex(str(tmp_path / 'dedup.db'))
+    yield index
+    index.close()
+
+
+def test_comments_are_language_specific():
+    assert normalize_tokens('a = b // 2  # halve', 'python') == ['a', '=', 'b', '/', '/', '2']
+    assert normalize_tokens('a = b; // halve', 'javascript') == ['a', '=', 'b', ';']
+    assert normalize_tokens('x = "y"', normalize_identifiers=True) == ['ID', '=', 'STR']
+
+
+def test_add_if_unique_ignores_comments_and_whitespace(index):
+    assert index.add_if_unique('original', FUNCTION, 'python') is None
+    for n in range(3):
+        key, score = index.add_if_unique(f"variant-{n}", _variant(FUNCTION, n), 'python')
+        assert key == 'original'
+        assert score == 1.0
+    assert index.add_if_unique('other', OTHER, 'python') is None
+    assert len(index) == 2
+    assert 'variant-0' not in index
+    # 同名 key 再次加入不与自身比较
+    assert index.add_if_unique('original', FUNCTION, 'python') is None
+
+
+def test_renamed_identifiers_need_normalization(tmp_path):
+    renamed = FUNCTION.replace('items', 'rows').replace('item', 'row').replace('result', 'acc')
+    plain = NearDuplicateIndex(':memory:')
+    plain.add('a', FUNCTION, 'python')
+    assert plain.query(renamed, 'python') == []
+    normalized = NearDuplicateIndex(':memory:', normalize_identifiers=True)
+    normalized.add('a', FUNCTION, 'python')
+    assert normalized.query(renamed, 'python')[0][0] == 'a'
+
+
+def test_find_clones_groups_near_duplicates():
+    documents = [('f0', FUNCTION, 'python'), ('o0', OTHER, 'python')]
+    documents += [(f"f{n}", _variant(FUNCTION, n), 'python') for n in range(1, 4)]
+    documents += [('o1', OTHER.replace('self.position = 0', 'self.position = 0\n        self.line = 1'), 'python')]
+    documents += [('lone', 'print("hello world")', 'python')]
+    report = find_clones(documents, threshold=0.5)
+    assert [cluster['keys'] for cluster in report] == [['f0', 'f1', 'f2', 'f3'], ['o0', 'o1']]
+    assert report[0]['min_similarity'] == 1.0
+    assert 0.5 <= report[1]['min_similarity'] < 1.0
+
+
+def test_clone_report_merges_clusters_across_buckets(index):
+    rng = np.random.default_rng(0)
+    base = [f"v{i} = f(v{i - 1}, {i})" for i in range(1, 120)]
+    for n in range(20):
+        lines = list(base)
+        for position in rng.choice(len(lines), size=3, replace=False):
+            lines[position] = f"w{n}_{position} = g()"
+        index.add(f"doc-{n}", '\n'.join(lines), 'python')
+    index.add('unrelated', OTHER, 'python')
+    report = index.clone_report(threshold=0.7)
+    assert len(report) == 1
+    assert report[0]['keys'] == sorted(f"doc-{n}" for n in range(20))
+
+
+def test_flush_and_close_persist_signatures(tmp_path):
+    path = str(tmp_path / 'dedup.db')
+    index = NearDuplicateIndex(path, commit_every=1000)
+    index.add('a', FUNCTION, 'python')
+    index.flush()
+    index.add('b', OTHER, 'python')
+    index.close()
+
+    index = NearDuplicateIndex(path)
+    assert 'a' in index and 'b' in index
+    assert index.query(_variant(FUNCTION, 1), 'python')[0] == ('a', 1.0)
+    index.remove('a')
+    index.close()
+
+    index = NearDuplicateIndex(path)
+    assert len(index) == 1
+    assert index.query(FUNCTION, 'python') == []
+    index.close()
+
+
+def test_reopen_with_different_parameters_fails(tmp_path):
+    path = str(tmp_path / 'dedup.db')
+    NearDuplicateIndex(path).close()
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(path, num_perm=64)
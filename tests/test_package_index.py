@@ -0,0 +1,143 @@
+import sqlite3
+import time
+import xmlrpc.client
+
+import pytest
+import requests
+
+from benchmarks.local_server import LocalServer
+from package_index import PackageIndex, PyPIFeed, normalize_name
+from request_scheduler import RequestScheduler
+
+
+def _xmlrpc_route(methods, delay=0.0):
+    calls = []
+
+    def route(handler):
+        body = handler.rfile.read(int(handler.headers['Content-Length']))
+        params, method = xmlrpc.client.loads(body)
+        calls.append((method, params))
+        time.sleep(delay)
+        return 200, {'Content-Type': 'text/xml'}, xmlrpc.client.dumps((methods[method](*params),), methodresponse=True)
+
+    return route, calls
+
+
+class FakeFeed:
+    def __init__(self, changed=()):
+        self.changed = set(changed)
+        self.fetched = []
+
+    def changes(self, cursor):
+        return (cursor or 0) + 1, self.changed
+
+    def fetch(self, name):
+        self.fetched.append(name)
+        return {'version': '1.0', 'summary': name, 'data': {}}
+
+
+@pytest.fixture
+def scheduler():
+    scheduler = RequestScheduler(concurrency=2, retry_attempts=0, timeout=0.5)
+    yield scheduler
+    scheduler.close()
+
+
+def test_normalize_name_follows_pep_503():
+    assert normalize_name('pypi', 'Django_REST.framework') == 'django-rest-framework'
+    assert normalize_name('pypi', 'zope..interface') == 'zope-interface'
+    assert normalize_name('npm', 'Some_Package') == 'Some_Package'
+
+
+def test_pypi_changes_go_through_scheduler(scheduler):
+    route, calls = _xmlrpc_route({
+        'changelog_last_serial': lambda: 100,
+        'changelog_since_serial': lambda serial: [
+            ['Flask_Login', '1.0', 0, 'new release', 101],
+            ['flask-login', '1.0', 0, 'add file', 102],
+            ['Requests', '2.0', 0, 'new release', 103],
+        ],
+    })
+    with LocalServer({'/pypi': route}) as server:
+        feed = PyPIFeed(server.base_url, scheduler)
+        assert feed.changes(None) == (100, set())
+        assert feed.changes(100) == (103, {'flask-login', 'requests'})
+    assert calls == [('changelog_last_serial', ()), ('changelog_since_serial', (100,))]
+    assert scheduler.stats()
+
+
+def test_pypi_changes_time_out(scheduler):
+    route, _ = _xmlrpc_route({'changelog_last_serial': lambda: 100}, delay=2)
+    with LocalServer({'/pypi': route}) as server:
+        feed = PyPIFeed(server.base_url, scheduler)
+        start = time.monotonic()
+        with pytest.raises(requests.exceptions.Timeout):
+            feed.changes(None)
+        assert time.monotonic() - start < 1.5
+
+
+def test_index_keys_pypi_packages_by_normalized_name(tmp_path):
+    feed = FakeFeed(changed={'Django_Rest.Framework'})
+    index = PackageIndex(str(tmp_path / 'index.db'), feeds={'pypi': feed})
+    assert index.get('pypi', 'django-rest-framework')['name'] == 'django-rest-framework'
+    assert index.get('pypi', 'Django_REST_Framework', with_data=False)['version'] == '1.0'
+    assert feed.fetched == ['django-rest-framework']
+
+    # 变更源返回的非规范名称也能匹配到索引中的包
+    assert index.sync('pypi') == {'pypi': 1}
+    assert feed.fetched == ['django-rest-framework', 'django-rest-framework']
+    index.close()
+
+
+def test_legacy_rows_are_renamed_to_normalized_names(tmp_path):
+    path = str(tmp_path / 'index.db')
+    PackageIndex(path, feeds={}).close()
+    conn = sqlite3.connect(path)
+    conn.executemany("INSERT INTO packages (registry, name, version, fetched_at) VALUES (?, ?, ?, ?)",
+                     [('pypi', 'Flask_Login', '0.5', time.time()), ('pypi', 'flask-login', '0.6', time.time()),
+                      ('npm', 'Left_Pad', '1.0', time.time())])
+    conn.commit()
+    conn.close()
+
+    feed = FakeFeed()
+    index = PackageIndex(path, feeds={'pypi': feed, 'npm': FakeFeed()})
+    assert [row['name'] for row in index.search('pypi', '%')] == ['flask-login']
+    assert index.get('pypi', 'Flask.Login') is not None
+    assert feed.fetched == []
+    assert index.search('npm', 'Left_Pad')[0]['name'] == 'Left_Pad'
+    index.close()
+
+
+def test_entries_older_than_max_age_are_refetched(tmp_path, monkeypatch):
+    feed = FakeFeed()
+    index = PackageIndex(str(tmp_path / 'index.db'), feeds={'pypi': feed}, max_age=60)
+    index.get('pypi', 'requests')
+    index.get('pypi', 'requests')
+    assert feed.fetched == ['requests']
+
+    now = time.time()
+    monkeypatch.setattr('package_index.time.time', lambda: now + 120)
+    index.get('pypi', 'requests')
+    assert feed.fetched == ['requests', 'requests']
+    index.close()
+
+
+def test_expired_entry_is_served_when_refetch_fails(tmp_path, monkeypatch):
+    feed = FakeFeed()
+    index = PackageIndex(str(tmp_path / 'index.db'), feeds={'pypi': feed}, max_age=60)
+    index.get('pypi', 'requests')
+
+    def fail(name):
+        raise ConnectionError("registry down")
+
+    feed.fetch = fail
+    now = time.time()
+    monkeypatch.setattr('package_index.time.time', lambda: now + 120)
+    assert index.get('pypi', 'requests')['version'] == '1.0'
+    index.close()
+
+
+def test_default_max_age_comes_from_config(tmp_path):
+    index = PackageIndex(str(tmp_path / 'index.db'), feeds={})
+    assert index.max_age == 86400
+    index.close()
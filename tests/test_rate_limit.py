@@ -0,0 +1,73 @@
+import pytest
+
+import rate_limit
+from rate_limit import TokenBucket
+
+
+class FakeClock:
+    """替换 rate_limit 模块中的 time：sleep 只推进虚拟时间"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.wall = 1_700_000_000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return self.wall + self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+
+def test_bucket_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=2)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.5)
+    clock.sleep(0.5)
+    assert bucket.reserve() == 0
+    clock.sleep(100)
+    assert bucket.reserve() == 0 and bucket.reserve() == 0
+    assert bucket.reserve() > 0
+
+
+def test_acquire_blocks_until_token_available(clock):
+    bucket = TokenBucket(rate=4, capacity=1)
+    start = clock.now
+    for _ in range(5):
+        assert bucket.acquire()
+    assert clock.now - start == pytest.approx(1.0)
+    assert not bucket.acquire(timeout=0.1)
+
+
+def test_exhausted_quota_waits_until_reset(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': str(clock.time() + 60)})
+    assert bucket.reserve() == pytest.approx(60)
+    clock.sleep(60)
+    assert bucket.reserve() == 0
+
+
+def test_remaining_quota_is_spread_until_reset(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.update_from_headers({'X-RateLimit-Remaining': '3', 'X-RateLimit-Reset': str(clock.time() + 30)})
+    assert bucket.rate == pytest.approx(0.1)
+    assert bucket.tokens == 3
+    for _ in range(3):
+        assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(10)
+
+
+def test_missing_or_invalid_headers_are_ignored(clock):
+    bucket = TokenBucket(rate=5, capacity=5)
+    bucket.update_from_headers({})
+    bucket.update_from_headers({'X-RateLimit-Remaining': 'n/a', 'X-RateLimit-Reset': '1'})
+    assert bucket.rate == 5 and bucket.tokens == 5
@@ -0,0 +1,171 @@
+import itertools
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+import requests
+
+from benchmarks.local_server import LocalServer
+from request_scheduler import RequestScheduler
+
+
+@pytest.fixture
+def scheduler():
+    schedulers = []
+
+    def make(**kwargs):
+        kwargs.setdefault('concurrency', 8)
+        schedulers.append(RequestScheduler(**kwargs))
+        return schedulers[-1]
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.close()
+
+
+def test_hosts_are_not_rate_limited_by_default(scheduler):
+    scheduler = scheduler()
+    with LocalServer() as server:
+        start = time.monotonic()
+        futures = [scheduler.submit('GET', server.url(f"/{i}")) for i in range(50)]
+        wait(futures)
+        elapsed = time.monotonic() - start
+    assert all(future.result().status_code == 200 for future in futures)
+    # 旧的默认值（每主机 5 次/秒）下需要约 9 秒
+    assert elapsed < 3
+
+
+def test_set_host_limit_applies_token_bucket(scheduler):
+    scheduler = scheduler()
+    with LocalServer() as server:
+        scheduler.set_host_limit(server.base_url.split('://')[1], rate=20, burst=1)
+        start = time.monotonic()
+        wait([scheduler.submit('GET', server.url(f"/{i}")) for i in range(11)])
+        elapsed = time.monotonic() - start
+    assert elapsed >= 0.45
+
+
+def test_known_api_limits_come_from_config(scheduler):
+    scheduler = scheduler()
+    assert scheduler._host_state('api.stackexchange.com').bucket.rate == 25
+    assert scheduler._host_state('example.com').bucket is None
+
+
+class TrackingSession(requests.Session):
+    """记录发出的每个响应以及它是否被调度器关闭"""
+
+    def __init__(self):
+        super().__init__()
+        self.responses = []
+
+    def request(self, *args, **kwargs):
+        response = super().request(*args, **kwargs)
+        response.closed_by_scheduler = False
+        close = response.close
+
+        def tracked_close():
+            response.closed_by_scheduler = True
+            close()
+
+        response.close = tracked_close
+        self.responses.append(response)
+        return response
+
+
+def _counting_route(handler_for_hit):
+    """按请求序号选择行为的路由：handler_for_hit(序号) -> (延迟, 状态码, 响应头, 正文)"""
+    hits = itertools.count()
+    lock = threading.Lock()
+
+    def route(handler):
+        with lock:
+            hit = next(hits)
+        delay, status, headers, body = handler_for_hit(hit)
+        time.sleep(delay)
+        return status, headers, body
+
+    return route
+
+
+def test_deadline_expires_during_slow_request(scheduler):
+    scheduler = scheduler()
+    with LocalServer(delay=0.5) as server:
+        start = time.monotonic()
+        with pytest.raises(TimeoutError):
+            scheduler.get(server.url('/slow'), deadline=0.1)
+        assert time.monotonic() - start < 0.4
+
+
+def test_deadline_expires_while_queued(scheduler):
+    scheduler = scheduler()
+    with LocalServer() as server:
+        scheduler.set_host_limit(server.base_url.split('://')[1], rate=1, burst=1)
+        first = scheduler.submit('GET', server.url('/a'), deadline=0.3)
+        second = scheduler.submit('GET', server.url('/b'), deadline=0.3)
+        assert first.result(timeout=2).status_code == 200
+        with pytest.raises(TimeoutError):
+            second.result(timeout=2)
+        assert server.request_count == 1
+    assert next(iter(scheduler.stats().values()))['timeouts'] == 1
+
+
+def test_retry_does_not_run_past_deadline(scheduler):
+    scheduler = scheduler(retry_attempts=3)
+    route = _counting_route(lambda hit: (0, 503, {'Retry-After': '2'}, b'busy'))
+    with LocalServer({'/busy': route}) as server:
+        start = time.monotonic()
+        response = scheduler.get(server.url('/busy'), deadline=1)
+        # Retry-After 要求的等待会越过截止时间：不再重试，直接返回最后一次响应
+        assert response.status_code == 503
+        assert server.request_count == 1
+        assert time.monotonic() - start < 0.5
+
+
+def test_retry_within_deadline(scheduler):
+    scheduler = scheduler(retry_attempts=3, backoff_base=0.01)
+    route = _counting_route(lambda hit: (0, 503 if hit < 2 else 200, {}, b'ok'))
+    with LocalServer({'/flaky': route}) as server:
+        assert scheduler.get(server.url('/flaky'), deadline=5).status_code == 200
+        assert server.request_count == 3
+
+
+def _hedging_scheduler(scheduler, **kwargs):
+    session = TrackingSession()
+    return scheduler(hedge=True, hedge_min_samples=5, session=session, **kwargs), session
+
+
+def test_hedged_request_wins_and_loser_is_closed(scheduler):
+    scheduler, session = _hedging_scheduler(scheduler)
+    # 第 6 个请求（预热 5 个之后的主请求）很慢，对冲的备份请求立即返回
+    route = _counting_route(lambda hit: (0.5 if hit == 5 else 0, 200, {}, b'slow' if hit == 5 else b'fast'))
+    with LocalServer({'/api': route}) as server:
+        for _ in range(5):
+            scheduler.get(server.url('/api'))
+        start = time.monotonic()
+        response = scheduler.get(server.url('/api'))
+        assert response.text == 'fast'
+        assert time.monotonic() - start < 0.4
+        time.sleep(0.7)
+    loser = next(r for r in session.responses if r.text == 'slow')
+    assert loser.closed_by_scheduler
+    assert not response.closed_by_scheduler
+    assert next(iter(scheduler.stats().values()))['hedged'] == 1
+
+
+def test_hedge_min_delay_floor(scheduler):
+    scheduler, session = _hedging_scheduler(scheduler, hedge_min_delay=5)
+    route = _counting_route(lambda hit: (0.3 if hit == 5 else 0, 200, {}, b'ok'))
+    with LocalServer({'/api': route}) as server:
+        host = server.base_url.split('://')[1]
+        for _ in range(6):
+            scheduler.get(server.url('/api'))
+        assert server.request_count == 6
+    # 下限高于慢请求的耗时，不会发出对冲请求
+    assert next(iter(scheduler.stats().values()))['hedged'] == 0
+
+    job = {'hedge': True, 'method': 'GET', 'kwargs': {}, 'host': host}
+    scheduler.set_hedge_min_delay(host, 10)
+    assert scheduler._hedge_delay(job) == 10
+    scheduler.set_hedge_min_delay(host, None)
+    assert scheduler._hedge_delay(job) == 5
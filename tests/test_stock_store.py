@@ -0,0 +1,122 @@
+import json
+
+import pandas as pd
+import pytest
+
+from stock_store import StockStore
+
+
+class FakeProvider:
+    """按请求区间生成工作日行情，并记录每次请求"""
+
+    def __init__(self):
+        self.calls = []
+
+    def fetch(self, symbols, start, end):
+        self.calls.append((tuple(symbols), start, end))
+        dates = pd.bdate_range(start, pd.Timestamp(end) - pd.Timedelta(days=1))
+        return {symbol: pd.DataFrame({'Close': [float(day.day) for day in dates]}, index=dates)
+                for symbol in symbols}
+
+
+@pytest.fixture
+def provider():
+    return FakeProvider()
+
+
+@pytest.fixture
+def store(tmp_path, provider):
+    return StockStore(root=str(tmp_path), provider=provider)
+
+
+def test_gap_between_non_adjacent_fetches_is_fetched(store, provider):
+    store.get_many(['AAA'], '2023-01-01', '2023-02-01')
+    store.get_many(['AAA'], '2023-06-01', '2023-07-01')
+    assert store.coverage('AAA') == [(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-02-01')),
+                                     (pd.Timestamp('2023-06-01'), pd.Timestamp('2023-07-01'))]
+
+    march = store.get_many(['AAA'], '2023-03-01', '2023-04-01')['AAA']
+    assert len(march) == len(pd.bdate_range('2023-03-01', '2023-03-31'))
+    assert provider.calls[-1] == (('AAA',), '2023-03-01', '2023-04-01')
+
+
+def test_span_across_intervals_fetches_only_gaps(store, provider):
+    store.get_many(['AAA'], '2023-01-01', '2023-02-01')
+    store.get_many(['AAA'], '2023-06-01', '2023-07-01')
+    provider.calls.clear()
+
+    frame = store.get_many(['AAA'], '2022-12-01', '2023-08-01')['AAA']
+    assert sorted(call[1:] for call in provider.calls) == [('2022-12-01', '2023-01-01'),
+                                                           ('2023-02-01', '2023-06-01'),
+                                                           ('2023-07-01', '2023-08-01')]
+    assert len(frame) == len(pd.bdate_range('2022-12-01', '2023-07-31'))
+    assert store.coverage('AAA') == [(pd.Timestamp('2022-12-01'), pd.Timestamp('2023-08-01'))]
+
+    provider.calls.clear()
+    store.get_many(['AAA'], '2023-02-01', '2023-05-01')
+    assert provider.calls == []
+
+
+def test_symbols_with_same_gap_share_one_request(store, provider):
+    store.get_many(['AAA', 'BBB'], '2023-01-01', '2023-02-01')
+    assert provider.calls == [(('AAA', 'BBB'), '2023-01-01', '2023-02-01')]
+
+
+def test_legacy_single_range_manifest(tmp_path, provider):
+    with open(tmp_path / 'manifest.json', 'w', encoding='utf-8') as f:
+        json.dump({'AAA': {'start': '2023-01-01T00:00:00', 'end': '2023-02-01T00:00:00'}}, f)
+    store = StockStore(root=str(tmp_path), provider=provider)
+    assert store._missing_ranges('AAA', pd.Timestamp('2023-01-10'), pd.Timestamp('2023-03-01')) == \
+        [(pd.Timestamp('2023-02-01'), pd.Timestamp('2023-03-01'))]
+    store.get_many(['AAA'], '2023-03-01', '2023-04-01')
+    assert len(store.coverage('AAA')) == 2
+
+
+def test_coverage_survives_reopen(tmp_path, store, provider):
+    store.get_many(['AAA'], '2023-01-01', '2023-02-01')
+    store.get_many(['AAA'], '2023-06-01', '2023-07-01')
+    reopened = StockStore(root=str(tmp_path), provider=provider)
+    assert len(reopened.coverage('AAA')) == 2
+
+
+class FlakyProvider(FakeProvider):
+    """第一次请求时 fail 中的股票缺失（或整个请求抛出异常）"""
+
+    def __init__(self, fail=(), raise_error=False):
+        super().__init__()
+        self.fail = set(fail)
+        self.raise_error = raise_error
+
+    def fetch(self, symbols, start, end):
+        result = super().fetch(symbols, start, end)
+        if self.raise_error:
+            self.raise_error = False
+            raise ConnectionError("download failed")
+        missing, self.fail = self.fail, set()
+        for symbol in missing:
+            result[symbol] = pd.DataFrame()
+        return result
+
+
+def test_symbol_missing_from_batch_is_not_marked_covered(tmp_path):
+    provider = FlakyProvider(fail={'BBB'})
+    store = StockStore(root=str(tmp_path), provider=provider)
+    data = store.get_many(['AAA', 'BBB'], '2023-01-01', '2023-02-01')
+    assert data['BBB'].empty
+    assert store.coverage('AAA') == [(pd.Timestamp('2023-01-01'), pd.Timestamp('2023-02-01'))]
+    assert store.coverage('BBB') == []
+
+    data = store.get_many(['AAA', 'BBB'], '2023-01-01', '2023-02-01')
+    assert provider.calls[-1] == (('BBB',), '2023-01-01', '2023-02-01')
+    assert len(data['BBB']) == len(data['AAA'])
+
+
+def test_failed_fetch_is_retried_on_next_read(tmp_path):
+    provider = FlakyProvider(raise_error=True)
+    store = StockStore(root=str(tmp_path), provider=provider)
+    assert store.get_many(['AAA'], '2023-01-01', '2023-02-01')['AAA'].empty
+    assert store.coverage('AAA') == []
+
+    frame = store.get_many(['AAA'], '2023-01-01', '2023-02-01')['AAA']
+    assert len(frame) == len(pd.bdate_range('2023-01-01', '2023-01-31'))
+    assert len(provider.calls) == 2
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from symbol_index import FIELD_TOKEN, SymbolIndex, split_identifier
+
+
+def _result(path, functions=(), classes=(), imports=()):
+    return {'path': str(path), 'analysis': {
+        'functions': [{'name': name, 'line_number': line} for line, name in enumerate(functions, 1)],
+        'classes': [{'name': name, 'line_number': 1, 'bases': list(bases)} for name, bases in classes],
+        'imports': list(imports),
+    }}
+
+
+def _names(records):
+    return sorted(record['name'] for record in records)
+
+
+@pytest.fixture
+def paths(tmp_path):
+    return {name: os.path.abspath(tmp_path / f"{name}.py") for name in ('a', 'b', 'c')}
+
+
+@pytest.fixture
+def index(tmp_path, paths):
+    index = SymbolIndex(str(tmp_path / 'symbols.bin'))
+    index.update(_result(paths['a'], functions=['parseHttpResponse', 'load_config'],
+                         classes=[('HttpClient', ['requests.Session'])], imports=['os.path']))
+    index.update(_result(paths['b'], functions=['parse_json', 'loadConfig'], imports=['json']))
+    yield index
+    index.close()
+
+
+def test_split_identifier():
+    assert split_identifier('parseHTTPResponse_v2') == ['parse', 'http', 'response', 'v', '2']
+
+
+def _check_queries(index, paths):
+    assert _names(index.lookup('LOAD_CONFIG')) == ['load_config']
+    assert _names(index.search('parse response')) == ['parseHttpResponse']
+    assert _names(index.search('load config')) == ['loadConfig', 'load_config']
+    assert _names(index.subclasses('Session')) == ['HttpClient']
+    assert index.importers('os') == [paths['a']]
+    assert _names(index.prefix('parse')) == ['parseHttpResponse', 'parse_json']
+    assert _names(index.prefix('http', field=FIELD_TOKEN, kind='class')) == ['HttpClient']
+    assert len(index) == 7
+
+
+def test_queries_on_delta(index, paths):
+    _check_queries(index, paths)
+
+
+def test_queries_after_save_and_reopen(index, paths, tmp_path):
+    index.save()
+    _check_queries(index, paths)
+    index.close()
+
+    reopened = SymbolIndex(str(tmp_path / 'symbols.bin'))
+    _check_queries(reopened, paths)
+    assert reopened.lookup('parse_json')[0]['path'] == paths['b']
+    assert reopened.lookup('HttpClient')[0]['bases'] == ['requests.Session']
+    reopened.close()
+
+
+def test_update_replaces_and_remove_deletes(index, paths):
+    index.save()
+    index.update(_result(paths['a'], functions=['renderPage']))
+    assert index.lookup('parseHttpResponse') == []
+    assert _names(index.lookup('renderPage')) == ['renderPage']
+    index.remove(paths['b'])
+    assert index.lookup('parse_json') == []
+    assert len(index) == 1
+
+    # 增量部分内的更新和删除
+    index.update(_result(paths['c'], functions=['first']))
+    index.update(_result(paths['c'], functions=['second']))
+    assert index.lookup('first') == []
+    index.remove(paths['c'])
+    assert index.lookup('second') == []
+    assert len(index) == 1
+
+
+def test_save_merges_delta_into_segment(index, paths, tmp_path):
+    index.save()
+    index.remove(paths['b'])
+    index.update(_result(paths['c'], functions=['parse_xml']))
+    index.save()
+    assert _names(index.prefix('parse')) == ['parseHttpResponse', 'parse_xml']
+    assert index.lookup('parse_json') == []
+    index.close()
+
+    reopened = SymbolIndex(str(tmp_path / 'symbols.bin'))
+    assert len(reopened) == 5
+    assert reopened.lookup('parse_xml')[0]['path'] == paths['c']
+    reopened.close()
+
+
+@pytest.mark.parametrize('saved', [False, True])
+def test_fuzzy_matches_within_distance(index, paths, saved):
+    if saved:
+        index.save()
+    # 距离 1：删除、插入、替换各一个字符
+    for query in ('load_confg', 'load_configs', 'load_donfig'):
+        matches = index.fuzzy(query, max_distance=1)
+        assert [(m['name'], m['distance']) for m in matches] == [('load_config', 1)]
+    assert index.fuzzy('load_config')[0]['distance'] == 0
+    assert index.fuzzy('lod_confg', max_distance=1) == []
+
+    matches = index.fuzzy('lod_confg', max_distance=2)
+    assert [(m['name'], m['distance']) for m in matches] == [('load_config', 2)]
+    assert index.fuzzy('parse_jsn', max_distance=2, kind='class') == []
+
+    # 增量中新增和删除的词项同样反映在模糊查找中
+    index.update(_result(paths['c'], functions=['load_configs']))
+    assert _names(index.fuzzy('load_config', max_distance=1)) == ['loadConfig', 'load_config', 'load_configs']
+    index.remove(paths['c'])
+    assert _names(index.fuzzy('load_config', max_distance=1)) == ['loadConfig', 'load_config']
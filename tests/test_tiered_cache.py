@@ -0,0 +1,119 @@
+import time
+
+import pandas as pd
+import pytest
+
+from tiered_cache import TieredCache, deserialize, serialize
+
+
+class FakeRedis:
+    """实现 TieredCache 用到的 Redis 命令子集，过期时间以毫秒计"""
+
+    def __init__(self):
+        self.store = {}
+        self.round_trips = 0
+
+    def _alive(self, key):
+        entry = self.store.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.monotonic():
+            del self.store[key]
+            return None
+        return entry
+
+    def mget(self, keys):
+        return [entry[0] if entry else None for entry in map(self._alive, keys)]
+
+    def pttl(self, key):
+        entry = self._alive(key)
+        if entry is None:
+            return -2
+        if entry[1] is None:
+            return -1
+        return int((entry[1] - time.monotonic()) * 1000)
+
+    def set(self, key, value):
+        self.store[key] = (value, None)
+
+    def setex(self, key, ttl, value):
+        self.store[key] = (value, time.monotonic() + ttl)
+
+    def psetex(self, key, ttl_ms, value):
+        self.store[key] = (value, time.monotonic() + ttl_ms / 1000)
+
+    def delete(self, *keys):
+        for key in keys:
+            self.store.pop(key, None)
+
+    def pipeline(self, transaction=False):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    def __getattr__(self, name):
+        def queue(*args):
+            self.commands.append((name, args))
+        return queue
+
+    def execute(self):
+        self.redis.round_trips += 1
+        return [getattr(self.redis, name)(*args) for name, args in self.commands]
+
+
+class DownRedis(FakeRedis):
+    def pipeline(self, transaction=False):
+        raise ConnectionError("Redis is down")
+
+    def mget(self, keys):
+        raise ConnectionError("Redis is down")
+
+
+def test_serialization_round_trip():
+    frame = pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']})
+    pd.testing.assert_frame_equal(deserialize(serialize(frame)), frame)
+    assert deserialize(serialize({'k': [1, 2]})) == {'k': [1, 2]}
+
+
+def test_redis_hit_uses_remaining_ttl():
+    redis = FakeRedis()
+    redis.psetex('short', 50, serialize('value'))
+    redis.set('forever', serialize('kept'))
+    cache = TieredCache(redis, ttl=3600)
+    assert cache.get_many(['short', 'forever', 'absent']) == {'short': 'value', 'forever': 'kept'}
+    assert redis.round_trips == 1
+    assert cache._local['short'][1] - time.monotonic() <= 0.05
+    # 没有过期时间的键使用缓存默认 TTL
+    assert cache._local['forever'][1] - time.monotonic() > 3000
+
+    time.sleep(0.06)
+    assert cache.get('short') is None
+    assert cache.stats == {'local_hits': 0, 'redis_hits': 2, 'misses': 2}
+
+
+def test_local_hits_survive_redis_outage():
+    cache = TieredCache(FakeRedis(), ttl=60)
+    cache.set('local', 1)
+    cache.redis_client = DownRedis()
+    assert cache.get_many(['local', 'remote']) == {'local': 1}
+    assert cache.stats['misses'] == 1
+
+
+def test_set_many_writes_both_tiers_in_one_round_trip():
+    redis = FakeRedis()
+    cache = TieredCache(redis, ttl=60)
+    cache.set_many({'a': 1, 'b': 2})
+    assert redis.round_trips == 1
+    assert 0 < redis.pttl('a') <= 60000
+    fresh = TieredCache(redis, ttl=60)
+    assert fresh.get_many(['a', 'b']) == {'a': 1, 'b': 2}
+
+
+def test_lru_bound():
+    cache = TieredCache(None, max_items=2, ttl=60)
+    cache.set_many({'a': 1, 'b': 2})
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get_many(['a', 'b', 'c']) == {'a': 1, 'c': 3}
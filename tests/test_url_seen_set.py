@@ -0,0 +1,94 @@
+import os
+import sqlite3
+
+from url_seen_set import SeenURLSet
+
+URLS = [f"https://example.com/page/{i}" for i in range(200)]
+
+
+def _open(path, **kwargs):
+    kwargs.setdefault('expected_items', 10000)
+    return SeenURLSet(str(path), **kwargs)
+
+
+def test_add_and_contains(tmp_path):
+    seen = _open(tmp_path)
+    assert seen.add(URLS[0]) is True
+    assert seen.add(URLS[0]) is False
+    assert URLS[0] in seen
+    assert URLS[1] not in seen
+    assert seen.add_many(URLS[:10] + URLS[:3]) == 9
+    assert len(seen) == 10
+    seen.close()
+
+
+def test_flushed_urls_survive_reopen(tmp_path):
+    seen = _open(tmp_path)
+    seen.add_many(URLS[:50])
+    seen.add(URLS[50])
+    seen.flush()
+    seen.close()
+
+    seen = _open(tmp_path)
+    assert len(seen) == 51
+    assert all(url in seen for url in URLS[:51])
+    assert URLS[51] not in seen
+    seen.close()
+
+
+def test_missing_bloom_is_rebuilt_from_sqlite(tmp_path):
+    seen = _open(tmp_path)
+    seen.add_many(URLS)
+    seen.close()
+    os.remove(tmp_path / 'bloom.bin')
+
+    seen = _open(tmp_path)
+    assert all(url in seen for url in URLS)
+    assert seen.add(URLS[0]) is False
+    assert len(seen) == len(URLS)
+    seen.close()
+
+
+def test_stale_bloom_is_rebuilt(tmp_path):
+    seen = _open(tmp_path)
+    seen.add_many(URLS[:10])
+    seen.close()
+    stale = (tmp_path / 'bloom.bin').read_bytes()
+
+    seen = _open(tmp_path)
+    seen.add_many(URLS[10:])
+    seen.close()
+    # 模拟 SQLite 已提交而 Bloom 文件停留在旧状态
+    (tmp_path / 'bloom.bin').write_bytes(stale)
+
+    seen = _open(tmp_path)
+    assert all(url in seen for url in URLS)
+    assert seen.add(URLS[-1]) is False
+    seen.close()
+
+
+def test_add_does_not_fail_when_bloom_lags_sqlite(tmp_path):
+    seen = _open(tmp_path)
+    seen.close()
+    # 绕过 Bloom 过滤器直接写入 SQLite
+    conn = sqlite3.connect(str(tmp_path / 'seen.db'))
+    conn.execute('INSERT INTO seen (digest) VALUES (?)', (SeenURLSet._digest(URLS[0]),))
+    conn.commit()
+    conn.close()
+
+    seen = _open(tmp_path)
+    assert seen.add(URLS[0]) is False
+    assert seen.add_many(URLS[:2]) == 1
+    seen.close()
+
+
+def test_legacy_bloom_header_is_rebuilt(tmp_path):
+    seen = _open(tmp_path)
+    seen.add_many(URLS[:20])
+    seen.close()
+    with open(tmp_path / 'bloom.bin', 'r+b') as f:
+        f.write(b'URLBLOOM')
+
+    seen = _open(tmp_path)
+    assert all(url in seen for url in URLS[:20])
+    seen.close()
@@ -0,0 +1,139 @@
+import pandas as pd
+import pyarrow as pa
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from config import CONFIG
+
+# 序列化格式标记
+_PICKLE = b'P'
+_ARROW = b'A'
+
+def serialize(value):
+    """DataFrame 使用 Arrow IPC，其余对象使用 pickle 协议5"""
+    if isinstance(value, pd.DataFrame):
+        table = pa.Table.from_pandas(value)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return _ARROW + sink.getvalue().to_pybytes()
+    return _PICKLE + pickle.dumps(value, protocol=5)
+
+def deserialize(payload):
+    tag, body = payload[:1], payload[1:]
+    if tag == _ARROW:
+        return pa.ipc.open_stream(body).read_all().to_pandas()
+    if tag == _PICKLE:
+        return pickle.loads(body)
+    raise ValueError(f"Unknown cache payload format: {tag!r}")
+
+
+class TieredCache:
+    """两级缓存：进程内有界LRU + Redis
+
+    读取先查本地LRU，未命中再批量查询Redis并回填本地（有效期取 Redis 中的剩余 TTL）；
+    写入同时更新两级，批量读写都通过Redis pipeline一次往返完成。TTL默认取自 CONFIG。
+    Redis 读取失败时记录日志并只返回本地命中的结果。
+    """
+
+    _MISSING = object()
+
+    def __init__(self, redis_client=None, max_items=1024, ttl=None):
+        self.logger = logging.getLogger(__name__)
+        self.redis_client = redis_client
+        self.max_items = max_items
+        self.ttl = CONFIG["data_collection"]["cache_duration"] if ttl is None else ttl
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'local_hits': 0, 'redis_hits': 0, 'misses': 0}
+
+    def get(self, key, default=None):
+        return self.get_many([key]).get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.set_many({key: value}, ttl=ttl)
+
+    def get_many(self, keys):
+        """返回 {key: value}，不存在的键不出现在结果中"""
+        result = {}
+        remote_keys = []
+        for key in keys:
+            value = self._local_get(key)
+            if value is self._MISSING:
+                remote_keys.append(key)
+            else:
+                result[key] = value
+        self._count('local_hits', len(result))
+        if remote_keys and self.redis_client is not None:
+            try:
+                # 值和剩余 TTL 在同一次往返中取回
+                pipe = self.redis_client.pipeline(transaction=False)
+                pipe.mget(remote_keys)
+                for key in remote_keys:
+                    pipe.pttl(key)
+                payloads, *remaining = pipe.execute()
+            except Exception as e:
+                self.logger.error(f"Redis read error: {str(e)}")
+                payloads, remaining = [], []
+            for key, payload, ttl_ms in zip(remote_keys, payloads, remaining):
+                if payload is None:
+                    continue
+                value = deserialize(payload)
+                result[key] = value
+                self._local_set(key, value, self._remaining_ttl(ttl_ms))
+                self._count('redis_hits')
+        self._count('misses', len(keys) - len(result))
+        return result
+
+    def _remaining_ttl(self, ttl_ms):
+        """本地副本的有效期不超过 Redis 中的剩余 TTL（PTTL 为 -1 表示没有过期时间）"""
+        if ttl_ms is None or ttl_ms < 0:
+            return self.ttl
+        remaining = ttl_ms / 1000
+        return min(self.ttl, remaining) if self.ttl else remaining
+
+    def set_many(self, mapping, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        for key, value in mapping.items():
+            self._local_set(key, value, ttl)
+        if self.redis_client is not None and mapping:
+            pipe = self.redis_client.pipeline(transaction=False)
+            for key, value in mapping.items():
+                if ttl:
+                    pipe.setex(key, ttl, serialize(value))
+                else:
+                    pipe.set(key, serialize(value))
+            pipe.execute()
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._local.pop(key, None)
+        if self.redis_client is not None and keys:
+            self.redis_client.delete(*keys)
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def _local_get(self, key):
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is None:
+                return self._MISSING
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._local[key]
+                return self._MISSING
+            self._local.move_to_end(key)
+            return value
+
+    def _local_set(self, key, value, ttl):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._local[key] = (value, expires_at)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_items:
+                self._local.popitem(last=False)
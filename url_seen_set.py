@@ -0,0 +1,156 @@
+import hashlib
+import math
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+
+# Bloom 文件头：魔数 + 比特数 + 哈希函数个数 + 最近一次提交时的URL数
+_BLOOM_HEADER = struct.Struct('<8sQIQ')
+_BLOOM_MAGIC = b'URLBLOM2'
+
+class SeenURLSet:
+    """持久化的已处理URL集合
+
+    前端是内存映射的 Bloom 过滤器，未见过的URL无需访问磁盘即可快速判定；
+    后端是 SQLite 中保存的URL摘要（16字节），用于排除 Bloom 过滤器的误判。
+    内存占用由 Bloom 过滤器大小和 SQLite 页缓存决定，与URL数量无关；
+    启动时只需映射文件，不需要重新加载全部URL；Bloom 文件缺失、损坏或与 SQLite 中的数量不一致
+    （例如两者之间崩溃）时从 SQLite 重建。
+    """
+
+    def __init__(self, path='seen_urls', expected_items=10000000, false_positive_rate=0.01, commit_every=10000):
+        os.makedirs(path, exist_ok=True)
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(path, 'seen.db'), check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS seen (digest BLOB PRIMARY KEY) WITHOUT ROWID')
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)')
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'count'").fetchone()
+        self._count = row[0] if row else 0
+        self._open_bloom(os.path.join(path, 'bloom.bin'), expected_items, false_positive_rate)
+
+    def _open_bloom(self, bloom_path, expected_items, false_positive_rate):
+        if os.path.exists(bloom_path) and os.path.getsize(bloom_path) >= _BLOOM_HEADER.size:
+            self._map_bloom(bloom_path)
+            magic, self._bits, self._hashes, count = _BLOOM_HEADER.unpack_from(self._bloom, 0)
+            if (magic == _BLOOM_MAGIC and count == self._count
+                    and len(self._bloom) == _BLOOM_HEADER.size + (self._bits + 7) // 8):
+                return
+            self._bloom.close()
+            self._bloom_file.close()
+        bits = max(8, int(-expected_items * math.log(false_positive_rate) / (math.log(2) ** 2)))
+        hashes = max(1, round(bits / expected_items * math.log(2)))
+        with open(bloom_path, 'wb') as f:
+            f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, bits, hashes, 0))
+            f.truncate(_BLOOM_HEADER.size + (bits + 7) // 8)
+        self._map_bloom(bloom_path)
+        self._bits, self._hashes = bits, hashes
+        # 从 SQLite 重建，使 Bloom 过滤器覆盖所有已保存的URL
+        for (digest,) in self.conn.execute('SELECT digest FROM seen'):
+            self._bloom_add(self._positions(digest))
+        self._count = self.conn.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+        self._commit()
+
+    def _map_bloom(self, bloom_path):
+        self._bloom_file = open(bloom_path, 'r+b')
+        self._bloom = mmap.mmap(self._bloom_file.fileno(), 0)
+
+    def _positions(self, digest):
+        # 双重哈希生成 k 个比特位置
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self._bits for i in range(self._hashes)]
+
+    def _bloom_contains(self, positions):
+        bloom, offset = self._bloom, _BLOOM_HEADER.size
+        for position in positions:
+            if not bloom[offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def _bloom_add(self, positions):
+        bloom, offset = self._bloom, _BLOOM_HEADER.size
+        for position in positions:
+            index = offset + (position >> 3)
+            bloom[index] = bloom[index] | (1 << (position & 7))
+
+    @staticmethod
+    def _digest(url):
+        return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+    def __contains__(self, url):
+        digest = self._digest(url)
+        positions = self._positions(digest)
+        with self._lock:
+            if not self._bloom_contains(positions):
+                return False
+            return self.conn.execute('SELECT 1 FROM seen WHERE digest = ?', (digest,)).fetchone() is not None
+
+    def add(self, url):
+        """添加URL，此前未见过时返回 True"""
+        digest = self._digest(url)
+        positions = self._positions(digest)
+        with self._lock:
+            # Bloom 过滤器判定为未见过时也用 INSERT OR IGNORE：即使过滤器落后于 SQLite 也不会因重复键出错
+            cursor = self.conn.execute('INSERT OR IGNORE INTO seen (digest) VALUES (?)', (digest,))
+            self._bloom_add(positions)
+            if cursor.rowcount != 1:
+                return False
+            self._count += 1
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._commit()
+            return True
+
+    def add_many(self, urls):
+        """批量添加URL，返回其中新URL的数量"""
+        rows = []
+        batch = set()
+        with self._lock:
+            for url in urls:
+                digest = self._digest(url)
+                if digest in batch:
+                    continue
+                positions = self._positions(digest)
+                if self._bloom_contains(positions) and self.conn.execute(
+                        'SELECT 1 FROM seen WHERE digest = ?', (digest,)).fetchone() is not None:
+                    continue
+                batch.add(digest)
+                rows.append((digest,))
+                self._bloom_add(positions)
+            changes = self.conn.total_changes
+            self.conn.executemany('INSERT OR IGNORE INTO seen (digest) VALUES (?)', rows)
+            added = self.conn.total_changes - changes
+            self._count += added
+            self._pending += added
+            if self._pending >= self.commit_every:
+                self._commit()
+        return added
+
+    def __len__(self):
+        return self._count
+
+    def _commit(self):
+        # 先落盘 Bloom 过滤器再提交 SQLite：过滤器只会领先（多出的误判由 SQLite 排除），不会落后；
+        # 两者之间崩溃时文件头中的数量与 SQLite 不一致，下次打开时重建
+        _BLOOM_HEADER.pack_into(self._bloom, 0, _BLOOM_MAGIC, self._bits, self._hashes, self._count)
+        self._bloom.flush()
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('count', ?)", (self._count,))
+        self.conn.commit()
+        self._pending = 0
+
+    def flush(self):
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            self._commit()
+            self.conn.close()
+            self._bloom.close()
+            self._bloom_file.close()